@@ -11,7 +11,26 @@ from typing import Any
 import discord
 from discord.ext import commands
 
-from lib.inventory import fetch_inventory_data_periodically, whohas, UpdateInterval
+from lib.auction_log import AuctionEventLog
+from lib.bidbook import BidBook
+from lib.deadlines import DeadlineScheduler
+from lib.inventory import (
+    fetch_inventory_data_periodically,
+    inventory_http_client,
+    Freshness,
+    InventoryGroups,
+    WhohasFormatSeconds,
+)
+from lib.inventory_client import ServiceUrl, inventory_service_client
+from lib.metrics import start_metrics_server
+
+# with INVENTORY_SERVICE_ADDRESS set, whohas is answered by the shared inventory service
+# (python -m HAL9666.lib.inventory_service) instead of a cache in this process
+if ServiceUrl:
+    from lib.inventory_client import cx_exchanges, whohas, whohas_batch, whohas_query, worth
+else:
+    from lib.inventory import cx_exchanges, whohas, whohas_batch, whohas_query, worth
+from lib.valuation import PriceFields
 
 # from keep_alive_flask import keep_alive
 intents = discord.Intents.default()
@@ -29,7 +48,8 @@ ValidChannels = ("auction", "auction-bot-sandbox")
 ShortenHoursToMinutes = False
 
 
-currentAuction = None
+# channel id -> the auction running in that channel
+Auctions = {}
 Log = logging.getLogger(__name__)
 
 
@@ -40,6 +60,14 @@ def numberToMilSuffixed(number):
     return "{value}mil".format(value=mils)
 
 
+def formatPrice(value):
+    if abs(value) >= 1000000:
+        return f"{value / 1000000:.2f}mil"
+    if abs(value) >= 1000:
+        return f"{value / 1000:.1f}k"
+    return f"{value:.0f}"
+
+
 class Auction:
     def __init__(
         self,
@@ -51,8 +79,12 @@ class Auction:
         duration,
         extension,
         shipCount=1,
+        restored=None,
     ):
+        """restored is the AuctionState of an auction replayed from AuctionLog, ctx is then its channel"""
         self.ctx = ctx
+        # one auction per channel
+        self.key = restored.key if restored else ctx.channel.id
         self.creator = creator
         self.name = name
         self.shipCount = shipCount
@@ -66,20 +98,43 @@ class Auction:
             else timedelta(hours=self.duration)
         )
         self.endTime = datetime.now() + delta
-        self.timerStopped = False
-        self.endTimer = asyncio.create_task(Auction.endTimerTick(self))
         # bid is the following tuple: (bidValue, bidder)
-        self.bidHistory = []
+        self.bidBook = BidBook(shipCount)
+        if restored:
+            self.endTime = datetime.fromtimestamp(restored.endTime)
+            for bidValue, bidder in restored.bids:
+                self.bidBook.add(bidValue, bidder)
+        else:
+            AuctionLog.append(
+                [
+                    "start", self.key, name, creator.id, creator.display_name, initialPrice,
+                    increments, duration, extension, shipCount, self.endTime.timestamp(),
+                ]
+            )
+        AuctionDeadlines.schedule(self.key, self.endTime)
+
+    @classmethod
+    def restore(cls, channel, state):
+        return cls(
+            channel, state.creator, state.name, state.initialPrice, state.increments,
+            state.duration, state.extension, state.shipCount, restored=state,
+        )
+
+    @property
+    def bidHistory(self):
+        """Every bid, lowest first"""
+        return self.bidBook.bids
 
     def currentBid(self):
-        if not self.bidHistory:
-            return None
-        return self.bidHistory[-1]
+        return self.bidBook.best()
 
     def prevBid(self):
-        if not self.bidHistory or len(self.bidHistory) < self.shipCount + 1:
-            return None
-        return self.bidHistory[-1 - self.shipCount]
+        """The bid the last bid pushed out of the winners, if any"""
+        return self.bidBook.outbid
+
+    def currentWinners(self):
+        """The shipCount highest bids, may be less, highest first"""
+        return self.bidBook.winners[::-1]
 
     def tryBid(self, ctx, bidValue):
         minBid = self.getMinBid()
@@ -96,26 +151,26 @@ class Auction:
             else timedelta(hours=self.extension)
         )
         newEndTime = datetime.now() + delta
+        newBid = self.bidBook.add(bidValue, ctx.author)
+        AuctionLog.append(["bid", self.key, bidValue, ctx.author.id, ctx.author.display_name])
         if newEndTime > self.endTime:
             self.endTime = newEndTime
-        newBid = (bidValue, ctx.author)
-        self.bidHistory.append(newBid)
-        self.bidHistory = sorted(self.bidHistory, key=lambda b: b[0])
+            AuctionDeadlines.schedule(self.key, self.endTime)
+            AuctionLog.append(["extend", self.key, self.endTime.timestamp()])
         print(newBid)
         return newBid
 
     def getMinBid(self):
-        minBid = self.initialPrice
-        if len(self.bidHistory) >= self.shipCount:
-            minBid = self.bidHistory[-self.shipCount][0] + self.increments
-        return minBid
+        return self.bidBook.min_bid(self.initialPrice, self.increments)
 
     async def finishAuction(self):
         print("Auction finishing...")
+        # logged before announcing, so an announcement that fails isn't repeated on every restart
+        Auctions.pop(self.key, None)
+        AuctionLog.append(["finish", self.key])
+        await AuctionLog.commit()
         if self.currentBid():
-            for bid in self.bidHistory[
-                : -1 - self.shipCount : -1
-            ]:  # list slicing magic - last shipCount bids, may be less
+            for bid in self.currentWinners():
                 await self.ctx.send(
                     "{name} sold to {mentionBidder} for {finalPrice}! Congratulations!".format(
                         name=self.name,
@@ -132,25 +187,24 @@ class Auction:
         await self.ctx.send(
             "{mentionCreator}".format(mentionCreator=self.creator.mention)
         )
-        global currentAuction
-        currentAuction = None
 
     def stopAuction(self):
-        self.timerStopped = True
-        global currentAuction
-        currentAuction = None
-
-    async def endTimerTick(self):
-        # print("endTimerTick", self)
-        if self.timerStopped:
-            print("Auction timer has stopped!")
-            return
-        if datetime.now() < self.endTime:
-            await asyncio.sleep(60)
-            self.endTimer = asyncio.create_task(Auction.endTimerTick(self))
-        else:
-            self.timerStopped = True
-            await self.finishAuction()
+        AuctionDeadlines.cancel(self.key)
+        Auctions.pop(self.key, None)
+        AuctionLog.append(["stop", self.key])
+
+
+async def finishDueAuction(key):
+    # no more bids while the results are announced
+    auction = Auctions.pop(key, None)
+    if auction is not None:
+        await auction.finishAuction()
+
+
+# every auction's end, a bid that extends one moves its deadline
+AuctionDeadlines = DeadlineScheduler(finishDueAuction)
+# every auction event, replayed on startup so a restart doesn't lose running auctions
+AuctionLog = AuctionEventLog()
 
 
 def isPriviledgedRole(member):
@@ -208,7 +262,7 @@ async def createAuction(
     )
 
 
-def getEndTimeMsg():
+def getEndTimeMsg(currentAuction):
     if not currentAuction:
         return ""
     return "The auction for {name} ends on <t:{endTime}:f>".format(
@@ -219,11 +273,20 @@ def getEndTimeMsg():
 @bot.event
 async def on_ready():
     print("We have logged in as {0.user}".format(bot))
+    # on_ready fires again after reconnects, only restore once
+    for key, state in list(AuctionLog.auctions.items()):
+        if key in Auctions:
+            continue
+        channel = bot.get_channel(key)
+        if channel is None:
+            Log.warning(f"Channel {key} of restored auction {state.name} is gone")
+            continue
+        Auctions[key] = Auction.restore(channel, state)
+        print("Restored auction", state.name, "with", len(state.bids), "bids")
 
 
 @bot.command()
 async def auctionstart(ctx, name, initialPrice, increments, duration=48, extension=24):
-    global currentAuction
     if ctx.author == bot.user or ctx.author.bot:
         return
     if ctx.channel.name not in ValidChannels:
@@ -232,10 +295,10 @@ async def auctionstart(ctx, name, initialPrice, increments, duration=48, extensi
         await ctx.reply("You don't have permissions to create an auction!")
         return
 
-    if currentAuction:
+    if ctx.channel.id in Auctions:
         await ctx.reply(
             "Auction {name} is already running! Stop it first with $auctionstop".format(
-                name=currentAuction.name
+                name=Auctions[ctx.channel.id].name
             )
         )
         return
@@ -246,6 +309,7 @@ async def auctionstart(ctx, name, initialPrice, increments, duration=48, extensi
     )
     if not currentAuction:
         return
+    Auctions[currentAuction.key] = currentAuction
     print("currentAuction:", currentAuction)
     await ctx.reply(
         "Starting auction: {name}, min. bid is {initialPrice}. Min. bid increments: {increments}. Auction will last for {duration}h, or {extension}h after last bid\n{mentionBidders}".format(
@@ -263,7 +327,6 @@ async def auctionstart(ctx, name, initialPrice, increments, duration=48, extensi
 async def auctionmultistart(
     ctx, name, shipCount, initialPrice, increments, duration=48, extension=24
 ):
-    global currentAuction
     if ctx.author == bot.user or ctx.author.bot:
         return
     if ctx.channel.name not in ValidChannels:
@@ -271,10 +334,10 @@ async def auctionmultistart(
     if not isPriviledgedRole(ctx.author):
         await ctx.reply("You don't have permissions to create an auction!")
         return
-    if currentAuction:
+    if ctx.channel.id in Auctions:
         await ctx.reply(
             "Auction {name} is already running! Stop it first with $auctionstop".format(
-                name=currentAuction.name
+                name=Auctions[ctx.channel.id].name
             )
         )
         return
@@ -300,6 +363,7 @@ async def auctionmultistart(
     )
     if not currentAuction:
         return
+    Auctions[currentAuction.key] = currentAuction
     print("currentAuction:", currentAuction)
     await ctx.reply(
         "Starting auction: {name}. {shipCount} ships are available, and **{shipCount} highest bids win!**\nMin. bid is {initialPrice}. Min. bid increments: {increments}. Auction will last for {duration}h, or {extension}h after last bid.\nYou **can** buy multiple ships!\n{mentionBidders}".format(
@@ -320,6 +384,7 @@ async def bid(ctx, bid):
         return
     if ctx.channel.name not in ValidChannels:
         return
+    currentAuction = Auctions.get(ctx.channel.id)
     if not currentAuction:
         await ctx.reply("There's no auction running currently!")
         return
@@ -330,6 +395,8 @@ async def bid(ctx, bid):
             return
         newBid = currentAuction.tryBid(ctx, bid)
         previousBid = currentAuction.prevBid()
+        # only acknowledge bids that survive a restart
+        await AuctionLog.commit()
         await ctx.message.add_reaction("\N{THUMBS UP SIGN}")
         if previousBid:
             await ctx.send(
@@ -349,7 +416,7 @@ async def bid(ctx, bid):
                     name=currentAuction.name,
                     bid=numberToMilSuffixed(newBid[0]),
                     amount=numberToMilSuffixed(currentAuction.getMinBid()),
-                    endTime = getEndTimeMsg(),
+                    endTime = getEndTimeMsg(currentAuction),
                 )
             )
         #try to assign bidder role
@@ -370,6 +437,7 @@ async def status(ctx):
         return
     if ctx.channel.name not in ValidChannels:
         return
+    currentAuction = Auctions.get(ctx.channel.id)
     if not currentAuction:
         await ctx.reply("There's no auction running!")
         return
@@ -389,23 +457,21 @@ async def status(ctx):
     if currentAuction.shipCount > 1:
         msgStr += "\nCurrent winners:\n"
         winnersMsgs = []
-        for bid in currentAuction.bidHistory[
-            : -1 - currentAuction.shipCount : -1
-        ]:  # list slicing magic - last shipCount bids, may be less
+        for bid in currentAuction.currentWinners():
             winnersMsgs.append("{bidder} at {bid}".format(
                 bidder=bid[1].display_name, bid=numberToMilSuffixed(bid[0])
             ))
         msgStr += "\n".join(winnersMsgs)
-    await ctx.send(msgStr + "\n" + getEndTimeMsg())
+    await ctx.send(msgStr + "\n" + getEndTimeMsg(currentAuction))
 
 
 @bot.command()
 async def auctionstop(ctx):
-    global currentAuction
     if ctx.author == bot.user or ctx.author.bot:
         return
     if ctx.channel.name not in ValidChannels:
         return
+    currentAuction = Auctions.get(ctx.channel.id)
     if not currentAuction:
         await ctx.reply("There's no auction running currently!")
         return
@@ -415,7 +481,6 @@ async def auctionstop(ctx):
 
     await ctx.send("Stopping {name} auction".format(name=currentAuction.name))
     currentAuction.stopAuction()
-    currentAuction = None
 
 
 @bot.command()
@@ -435,7 +500,8 @@ async def help(ctx):
 
 
 @bot.command(name="whohas")
-async def whohas_command(ctx: Any, ticker: str, all: str = "", force: str = ""):
+async def whohas_command(ctx: Any, ticker: str, *options: str):
+    """$whohas TICKER [all] [force] [to DESTINATION]"""
     if ctx.author == bot.user or ctx.author.bot:
         return
     if ctx.channel.name not in ValidChannels:
@@ -444,39 +510,194 @@ async def whohas_command(ctx: Any, ticker: str, all: str = "", force: str = ""):
         await ctx.reply("You don't have permissions to run this command!")
         return
 
-    shouldReturnAll = all.lower() == "all"
-    forceUpdate = (
-        force.lower() == "force" or all.lower() == "force"
-    )  #  force ends up in "all" if "$whohas FE force"
+    words = [option.lower() for option in options]
+    shouldReturnAll = "all" in words
+    forceUpdate = "force" in words
+    # anything else is where the material is needed, "to" is optional: $whohas FE to Katoa
+    destination = " ".join(
+        option for option in options if option.lower() not in ("all", "force", "to")
+    ) or None
 
-    result, last_updated = await whohas(
-        ctx=ctx,
-        ticker=ticker.upper(),
-        shouldReturnAll=shouldReturnAll,
-        forceUpdate=forceUpdate,
-    )
+    try:
+        if InventoryGroups.is_multi_ticker(ticker):
+            await whohasManyReply(ctx, ticker, shouldReturnAll, forceUpdate, destination)
+            return
+
+        answer = await whohas(
+            ctx=ctx,
+            ticker=ticker.upper(),
+            shouldReturnAll=shouldReturnAll,
+            forceUpdate=forceUpdate,
+            destination=destination,
+        )
+    except ValueError as e:
+        await ctx.reply(str(e))
+        return
+    result, last_updated = answer
 
     if last_updated is not None:
         age = int((datetime.now() - last_updated).total_seconds())
-        seconds_til_refresh = UpdateInterval - age
 
     if len(result) == 0:
         await ctx.reply(f"As far as I know, nobody has {ticker}")
         return
 
-    formattedResult = [
-        userInv.toStr() for userInv in result
-    ]
+    with WhohasFormatSeconds.time():
+        formattedResult = [
+            userInv.toStr() for userInv in result
+        ]
 
     print("Filtered:", str(formattedResult))
-    last_updated_text = (
-        f"(updated {age} seconds ago, refresh in {seconds_til_refresh}s)"
-        if last_updated is not None
-        else ("There is no data currently. Try adding 'force' to the command")
-    )
+    if last_updated is None:
+        last_updated_text = "There is no data currently, FIO could not be reached"
+    elif answer.freshness == Freshness.REFRESHED:
+        last_updated_text = f"(refreshed from FIO {age} seconds ago)"
+    elif answer.freshness == Freshness.REVALIDATING:
+        last_updated_text = f"(updated {age} seconds ago, refreshing from FIO in the background)"
+    elif answer.freshness == Freshness.REFRESH_FAILED:
+        last_updated_text = f"(refreshing from FIO failed, showing data from {age} seconds ago)"
+    else:
+        last_updated_text = f"(updated {age} seconds ago)"
+    if answer.stale:
+        last_updated_text += " - saved before the bot restarted"
     await ctx.reply(f"{last_updated_text}\n" + "\n".join(formattedResult))
 
 
+@bot.command(name="whohasbatch")
+async def whohasbatch_command(ctx: Any, *queries: str):
+    if ctx.author == bot.user or ctx.author.bot:
+        return
+    if ctx.channel.name not in ValidChannels:
+        return
+    if not isPriviledgedRole(ctx.author):
+        await ctx.reply("You don't have permissions to run this command!")
+        return
+
+    words = [query.lower() for query in queries]
+    shouldReturnAll = "all" in words
+    forceUpdate = "force" in words
+    queries = tuple(query for query in queries if query.lower() not in ("all", "force"))
+    if not queries:
+        await ctx.reply("Usage: $whohasbatch <tickers, patterns, categories or ship> [all] [force]\nExample: $whohasbatch BR1 CQ* cargo_bays")
+        return
+
+    answer = await whohas_batch(ctx, list(queries), shouldReturnAll=shouldReturnAll, forceUpdate=forceUpdate)
+    if not answer.tickers:
+        await ctx.reply(f"As far as I know, nobody has a ticker matching {' '.join(queries)}")
+        return
+    if not answer.holdings:
+        await ctx.reply(f"As far as I know, nobody has any of {', '.join(answer.tickers)}")
+        return
+
+    with WhohasFormatSeconds.time():
+        blocks = answer.format_matrix()
+    if answer.last_updated is not None:
+        age = int((datetime.now() - answer.last_updated).total_seconds())
+        header = f"(oldest data updated {age} seconds ago"
+        if answer.freshness == Freshness.REVALIDATING:
+            header += ", refreshing from FIO in the background"
+        elif answer.freshness == Freshness.REFRESH_FAILED:
+            header += ", refreshing from FIO failed"
+        blocks.insert(0, header + ")")
+    for block in blocks:
+        await ctx.reply(block)
+
+
+@bot.command(name="worth")
+async def worth_command(ctx: Any, *words: str):
+    """$worth [user, ticker or location] [CX] [bid|ask|average]: the group stock valued at CX prices"""
+    if ctx.author == bot.user or ctx.author.bot:
+        return
+    if ctx.channel.name not in ValidChannels:
+        return
+    if not isPriviledgedRole(ctx.author):
+        await ctx.reply("You don't have permissions to run this command!")
+        return
+
+    cx = kind = None
+    subject = []
+    exchanges = await cx_exchanges()
+    for word in words:
+        if word.lower() in PriceFields:
+            kind = word.lower()
+        elif word.upper() in exchanges:
+            cx = word.upper()
+        else:
+            subject.append(word)
+
+    valuation = await worth(ctx, cx, kind)
+    priceText = f"{valuation.cx} {valuation.kind} prices"
+    if not valuation.by_ticker:
+        await ctx.reply(f"I have no inventory or no {priceText} to value it at")
+        return
+
+    if subject:
+        name = " ".join(subject)
+        found = valuation.lookup(name)
+        if found is None:
+            await ctx.reply(f"As far as I know, {name} holds nothing with a price on {valuation.cx}")
+            return
+        kindOfSubject, name, value = found
+        if kindOfSubject == "user":
+            await ctx.reply(f"{name}'s stock is worth {formatPrice(value)} at {priceText}")
+        elif kindOfSubject == "ticker":
+            await ctx.reply(f"All {name} in stock is worth {formatPrice(value)} at {priceText}")
+        else:
+            await ctx.reply(f"The stock at {name} is worth {formatPrice(value)} at {priceText}")
+        return
+
+    lines = [f"The group stock is worth {formatPrice(valuation.total)} at {priceText}"]
+    for title, values in (("users", valuation.by_user), ("locations", valuation.by_location), ("tickers", valuation.by_ticker)):
+        top = ", ".join(f"{name} {formatPrice(value)}" for name, value in valuation.top(values, 5))
+        lines.append(f"**Top {title}**: {top}")
+    if valuation.unpriced:
+        lines.append(f"Not counted, no {valuation.cx} {valuation.kind} price: {', '.join(valuation.unpriced)}")
+    await replyInChunks(ctx, lines)
+
+
+async def replyInChunks(ctx, lines, limit=2000):
+    """Discord rejects messages over 2000 characters"""
+    chunk = ""
+    for line in lines:
+        if chunk and len(chunk) + len(line) + 1 > limit:
+            await ctx.reply(chunk)
+            chunk = ""
+        chunk = f"{chunk}\n{line}" if chunk else line[:limit]
+    if chunk:
+        await ctx.reply(chunk)
+
+
+def holderSummary(userInv):
+    jumps = userInv.nearestJumps()
+    return f"{userInv.user} {userInv.getTotal()}" + (f" ({jumps} jumps)" if jumps is not None else "")
+
+
+async def whohasManyReply(ctx, query, shouldReturnAll, forceUpdate, destination=None):
+    """$whohas for a category (crew_quarters) or a pattern (CQ*, *FE): one line per ticker anyone has"""
+    answers = await whohas_query(
+        ctx, query, shouldReturnAll=shouldReturnAll, forceUpdate=forceUpdate, destination=destination
+    )
+    if not answers:
+        await ctx.reply(f"As far as I know, nobody has a ticker matching {query}")
+        return
+
+    with WhohasFormatSeconds.time():
+        lines = [
+            f"**{ticker}**: " + ", ".join(holderSummary(userInv) for userInv in result)
+            for ticker, (result, _) in answers
+            if result
+        ]
+    if not lines:
+        await ctx.reply(f"As far as I know, nobody has any of {', '.join(ticker for ticker, _ in answers)}")
+        return
+
+    updates = [last_updated for _, (_, last_updated) in answers if last_updated is not None]
+    if updates:
+        age = int((datetime.now() - min(updates)).total_seconds())
+        lines.insert(0, f"(oldest data updated {age} seconds ago)")
+    await replyInChunks(ctx, lines)
+
+
 @bot.command()
 async def clearchannel(ctx):
     if ctx.channel.name != "auction":
@@ -488,8 +709,21 @@ async def clearchannel(ctx):
 
 
 async def main():
-    await fetch_inventory_data_periodically()
-    await bot.start(os.getenv("DISCORD_TOKEN"))
+    AuctionLog.open()
+    AuctionDeadlines.start()
+    try:
+        if ServiceUrl:
+            async with inventory_service_client():
+                await bot.start(os.getenv("DISCORD_TOKEN"))
+            return
+        async with inventory_http_client():
+            await start_metrics_server()
+            await fetch_inventory_data_periodically()
+            await bot.start(os.getenv("DISCORD_TOKEN"))
+    finally:
+        await AuctionDeadlines.stop()
+        # writes out the events still queued
+        await AuctionLog.close()
 
 
 # keep_alive()
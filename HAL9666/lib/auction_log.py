@@ -0,0 +1,229 @@
+"""Crash safe auction state: every auction event appended to a local log, replayed on startup.
+
+Events are JSON lists, one per line, numbered: [seq, "start", key, name, creator id, creator name,
+initial price, increments, duration, extension, ship count, end time], [seq, "bid", key, value,
+bidder id, bidder name], [seq, "extend", key, end time], [seq, "stop", key] and [seq, "finish", key].
+Appends are written and fsynced in batches. Every SnapshotEvery events the running auctions are
+saved as a compact snapshot and the log starts over, so a replay never reads more than that.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+Log = logging.getLogger(__name__)
+
+# set AUCTION_LOG_DIR to an empty string to keep auctions in memory only
+AuctionLogDir = os.getenv(
+    "AUCTION_LOG_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "auction_log")
+)
+# extra wait before writing a batch. Without it, batches still form: everything appended while
+# the previous write and fsync run goes out together in the next one.
+FlushInterval = 0.0
+SnapshotEvery = 10000
+
+
+@dataclass(frozen=True)
+class LoggedUser:
+    """A bidder or creator as the log remembers them, enough to mention them in Discord again"""
+
+    id: int
+    display_name: str
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+@dataclass
+class AuctionState:
+    key: int
+    name: str
+    creator: LoggedUser
+    initialPrice: int
+    increments: int
+    duration: int
+    extension: int
+    shipCount: int
+    # POSIX timestamp
+    endTime: float
+    # (value, bidder) in the order they were placed
+    bids: list[tuple[int, LoggedUser]] = field(default_factory=list)
+
+    def to_list(self) -> list[Any]:
+        return [
+            self.key, self.name, self.creator.id, self.creator.display_name, self.initialPrice, self.increments,
+            self.duration, self.extension, self.shipCount, self.endTime,
+            [[value, bidder.id, bidder.display_name] for value, bidder in self.bids],
+        ]
+
+    @classmethod
+    def from_list(cls, values: list[Any]) -> "AuctionState":
+        key, name, creator_id, creator_name, *settings, end_time, bids = values
+        return cls(
+            key, name, LoggedUser(creator_id, creator_name), *settings, end_time,
+            [(value, LoggedUser(bidder_id, bidder_name)) for value, bidder_id, bidder_name in bids],
+        )
+
+
+def apply_event(auctions: dict[int, AuctionState], event: list[Any]) -> None:
+    """Applies one event, without its sequence number, to the running auctions"""
+    kind, key = event[0], event[1]
+    if kind == "bid":
+        auction = auctions.get(key)
+        if auction is not None:
+            auction.bids.append((event[2], LoggedUser(event[3], event[4])))
+    elif kind == "extend":
+        auction = auctions.get(key)
+        if auction is not None:
+            auction.endTime = event[2]
+    elif kind == "start":
+        _, key, name, creator_id, creator_name, *settings, end_time = event
+        auctions[key] = AuctionState(key, name, LoggedUser(creator_id, creator_name), *settings, end_time)
+    elif kind in ("stop", "finish"):
+        auctions.pop(key, None)
+    else:
+        raise ValueError(f"Unknown auction event {kind}")
+
+
+def _fsync_replace(directory: str, name: str, data: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class AuctionEventLog:
+    """The append-only log, and the running auctions it describes (see apply_event).
+
+    append applies an event right away and queues it. Queued events are written and fsynced
+    together, one batch at a time, and commit waits for that, so a bid can be acknowledged once
+    it is durable.
+    """
+
+    def __init__(
+        self, directory: str = AuctionLogDir, flush_interval: float = FlushInterval, snapshot_every: int = SnapshotEvery
+    ) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.auctions: dict[int, AuctionState] = {}
+        self.seq = 0
+        self._events_since_snapshot = 0
+        self._pending: list[str] = []
+        # the batch taking appends, and the last one started, which is done once everything before is
+        self._batch: Optional["asyncio.Future[None]"] = None
+        self._latest: Optional["asyncio.Future[None]"] = None
+        self._flushes: set["asyncio.Task[None]"] = set()
+        self._write_lock = asyncio.Lock()
+        self._file: Any = None
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, "auctions.log")
+
+    def open(self) -> dict[int, AuctionState]:
+        """Replays the snapshot and the log after it, and returns the auctions still running"""
+        if not self.directory:
+            return self.auctions
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(os.path.join(self.directory, "auctions.snapshot")) as f:
+                snapshot = json.load(f)
+            self.seq = snapshot["seq"]
+            self.auctions = {state[0]: AuctionState.from_list(state) for state in snapshot["auctions"]}
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self._log_path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            content = b""
+        complete = content.rfind(b"\n") + 1
+        if complete < len(content):
+            # the tail of a write cut short by a crash, it was never committed. Cut off, so the
+            # next append starts on a line of its own.
+            Log.warning("Dropping the unfinished last line of the auction log")
+            with open(self._log_path, "r+b") as f:
+                f.truncate(complete)
+                os.fsync(f.fileno())
+        lines = content[:complete].decode().splitlines()
+        for number, line in enumerate(lines):
+            try:
+                seq, *event = json.loads(line)
+            except ValueError:
+                Log.warning(f"Skipping unreadable auction log line {number + 1}")
+                continue
+            # left over when a crash hit between saving a snapshot and truncating the log
+            if seq <= self.seq:
+                continue
+            apply_event(self.auctions, event)
+            self.seq = seq
+        self._events_since_snapshot = len(lines)
+        self._file = open(self._log_path, "a")
+        Log.info(f"Replayed {len(lines)} auction events, {len(self.auctions)} auctions running")
+        return self.auctions
+
+    def append(self, event: list[Any]) -> None:
+        apply_event(self.auctions, event)
+        if self._file is None:
+            return
+        self.seq += 1
+        self._pending.append(json.dumps([self.seq] + event))
+        if self._batch is None:
+            self._batch = self._latest = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(self._flush_after(self._batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def commit(self) -> None:
+        """Waits until everything appended so far is on disk"""
+        if self._latest is not None:
+            await asyncio.shield(self._latest)
+
+    async def _flush_after(self, batch: "asyncio.Future[None]") -> None:
+        await asyncio.sleep(self.flush_interval)
+        # batches are written in the order they were started
+        async with self._write_lock:
+            lines, self._pending, self._batch = self._pending, [], None
+            self._events_since_snapshot += len(lines)
+            snapshot = None
+            if self._events_since_snapshot >= self.snapshot_every:
+                # taken together with lines, so it matches the log exactly up to self.seq
+                snapshot = json.dumps({"seq": self.seq, "auctions": [a.to_list() for a in self.auctions.values()]})
+                self._events_since_snapshot = 0
+            try:
+                await asyncio.to_thread(self._write, lines, snapshot)
+                batch.set_result(None)
+            except Exception as e:
+                Log.exception("Unable to write the auction log")
+                batch.set_exception(e)
+                # nobody may be waiting on it
+                batch.exception()
+
+    def _write(self, lines: list[str], snapshot: Optional[str]) -> None:
+        self._file.write("".join(f"{line}\n" for line in lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if snapshot is not None:
+            _fsync_replace(self.directory, "auctions.snapshot", snapshot)
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+
+    async def close(self) -> None:
+        """Writes out the events still queued, then closes the log"""
+        try:
+            await self.commit()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
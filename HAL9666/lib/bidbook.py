@@ -0,0 +1,46 @@
+from bisect import insort
+from typing import Any, Optional
+
+# (value, bidder)
+Bid = tuple[int, Any]
+
+
+def _value(bid: Bid) -> int:
+    return bid[0]
+
+
+class BidBook:
+    """The bids of an auction for count items, where the count highest bids win.
+
+    bids stays sorted by value with bisect inserts, equal bids in the order they came in, and
+    the current winners are kept apart as the count highest of them. A valid bid always beats
+    the lowest winner (see min_bid), so it joins the winners and pushes at most that one bid out.
+    Winners, the minimum bid and who was just outbid are then all O(1) lookups.
+    """
+
+    def __init__(self, count: int = 1) -> None:
+        self.count = count
+        self.bids: list[Bid] = []
+        # the count highest bids, lowest first
+        self.winners: list[Bid] = []
+        # the bid the last add pushed out of the winners
+        self.outbid: Optional[Bid] = None
+
+    def __len__(self) -> int:
+        return len(self.bids)
+
+    def add(self, value: int, bidder: Any) -> Bid:
+        bid = (value, bidder)
+        insort(self.bids, bid, key=_value)
+        insort(self.winners, bid, key=_value)
+        self.outbid = self.winners.pop(0) if len(self.winners) > self.count else None
+        return bid
+
+    def best(self) -> Optional[Bid]:
+        return self.winners[-1] if self.winners else None
+
+    def min_bid(self, initial_price: int, increments: int) -> int:
+        """The initial price while items are left, then increments over the lowest winning bid"""
+        if len(self.winners) < self.count:
+            return initial_price
+        return self.winners[0][0] + increments
@@ -0,0 +1,147 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+from .inventory_store import InventoryStore
+
+Log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InventoryChange:
+    """The amount of one (user, ticker, location) key changed between two refreshes of a group"""
+
+    group_id: str
+    user: str
+    ticker: str
+    location: str
+    before: int
+    after: int
+    at: datetime
+
+    @property
+    def delta(self) -> int:
+        return self.after - self.before
+
+    @property
+    def appeared(self) -> bool:
+        return self.before <= 0 < self.after
+
+    @property
+    def ran_out(self) -> bool:
+        return self.before > 0 >= self.after
+
+    def is_notable(self, min_delta: int = 0) -> bool:
+        """Stock appeared, ran out, or changed by more than min_delta"""
+        return self.appeared or self.ran_out or abs(self.delta) > min_delta
+
+
+def _rows(store: InventoryStore, holdings: range) -> slice:
+    return slice(store.holding_start[holdings.start], store.holding_start[holdings.stop])
+
+
+def _same_rows(previous: InventoryStore, prev: slice, current: InventoryStore, cur: slice) -> bool:
+    """Whether two row ranges hold the same rows, assuming both stores share their string ids.
+
+    Compares whole array slices, which runs at memcmp speed, so unchanged tickers cost next to nothing.
+    """
+    return (
+        previous.row_amount[prev] == current.row_amount[cur]
+        and previous.row_location[prev] == current.row_location[cur]
+        and previous.row_user[prev] == current.row_user[cur]
+    )
+
+
+def _amounts(store: InventoryStore, rows: slice) -> dict[tuple[int, int], int]:
+    """(user id, location id) -> amount. Built by zipping the columns, without a Python level loop."""
+    keys = zip(store.row_user[rows], store.row_location[rows])
+    amounts = dict(zip(keys, store.row_amount[rows]))
+    if len(amounts) < rows.stop - rows.start:
+        # the same base listed under two storages, sum them up
+        amounts = {}
+        for key, amount in zip(zip(store.row_user[rows], store.row_location[rows]), store.row_amount[rows]):
+            amounts[key] = amounts.get(key, 0) + amount
+    return amounts
+
+
+def _by_name(store: InventoryStore, amounts: dict[tuple[int, int], int]) -> dict[tuple[str, str], int]:
+    strings = store.strings
+    return {(strings[user], strings[location]): amount for (user, location), amount in amounts.items()}
+
+
+def diff_inventories(
+    previous: InventoryStore, current: InventoryStore
+) -> list[tuple[str, str, str, int, int]]:
+    """Returns (user, ticker, location, before, after) for every key whose amount changed.
+
+    Keys missing on one side count as 0. A store built from the previous one shares its string ids,
+    which lets unchanged tickers be skipped with a few slice comparisons. Changed tickers are
+    compared as {key: amount} item sets, and only the keys that differ are turned into names.
+    """
+    shared_ids = current.strings[: len(previous.strings)] == previous.strings
+    strings = current.strings
+    changes: list[tuple[str, str, str, int, int]] = []
+    tickers = dict.fromkeys(previous.tickers())
+    tickers.update(dict.fromkeys(current.tickers()))
+    for ticker in tickers:
+        prev, cur = _rows(previous, previous.holdings(ticker)), _rows(current, current.holdings(ticker))
+        before: dict[Any, int]
+        after: dict[Any, int]
+        if shared_ids:
+            if _same_rows(previous, prev, current, cur):
+                continue
+            before, after = _amounts(previous, prev), _amounts(current, cur)
+        else:
+            before = _by_name(previous, _amounts(previous, prev))
+            after = _by_name(current, _amounts(current, cur))
+        for key in sorted({key for key, _ in before.items() ^ after.items()}):
+            old, new = before.get(key, 0), after.get(key, 0)
+            if old == new:
+                continue
+            user, location = (strings[key[0]], strings[key[1]]) if shared_ids else key
+            changes.append((user, ticker, location, old, new))
+    return changes
+
+
+ChangeHook = Callable[[list[InventoryChange]], None]
+
+
+class ChangeLog:
+    """The most recent inventory changes of every group, and hooks to be told about new ones.
+
+    Hooks run synchronously on the event loop right after a refresh lands, so anything slow (like
+    a Discord message) should be scheduled as a task from the hook.
+    """
+
+    def __init__(self, maxlen: int = 10000) -> None:
+        self.changes: deque[InventoryChange] = deque(maxlen=maxlen)
+        self._hooks: list[tuple[ChangeHook, Optional[frozenset[str]], int]] = []
+
+    def subscribe(
+        self, hook: ChangeHook, tickers: Optional[Iterable[str]] = None, min_delta: int = 0
+    ) -> Callable[[], None]:
+        """Calls hook with every batch of notable changes (see InventoryChange.is_notable) to the tickers,
+        or to any ticker if tickers is None. Returns a function that unsubscribes the hook."""
+        entry = (hook, frozenset(tickers) if tickers is not None else None, min_delta)
+        self._hooks.append(entry)
+        return lambda: self._hooks.remove(entry)
+
+    def publish(self, changes: list[InventoryChange]) -> None:
+        self.changes.extend(changes)
+        for hook, tickers, min_delta in list(self._hooks):
+            matching = [
+                change
+                for change in changes
+                if (tickers is None or change.ticker in tickers) and change.is_notable(min_delta)
+            ]
+            if not matching:
+                continue
+            try:
+                hook(matching)
+            except Exception:
+                Log.exception(f"Inventory change hook {hook} failed")
+
+    def since(self, when: datetime) -> list[InventoryChange]:
+        return [change for change in self.changes if change.at > when]
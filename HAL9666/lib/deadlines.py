@@ -0,0 +1,105 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+Log = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """Calls on_deadline(key) when the deadline of key passes, for any number of keys, from one task.
+
+    Deadlines sit in a heap, and the task sleeps exactly until the earliest one, or until an
+    earlier deadline is scheduled. Moving a deadline pushes a new heap entry, O(log n), and the
+    entry it replaces is skipped when it comes up, so nothing ever scans every key.
+    """
+
+    def __init__(self, on_deadline: Callable[[Hashable], Awaitable[Any]]) -> None:
+        self.on_deadline = on_deadline
+        # (deadline, sequence number, key), may hold entries that were moved or cancelled since
+        self._heap: list[tuple[datetime, int, Hashable]] = []
+        # key -> its current deadline
+        self._deadlines: dict[Hashable, datetime] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        # strong references to the callbacks still running
+        self._running: set["asyncio.Task[Any]"] = set()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+    def deadline(self, key: Hashable) -> Optional[datetime]:
+        return self._deadlines.get(key)
+
+    def schedule(self, key: Hashable, deadline: datetime) -> None:
+        """Sets or moves the deadline of key"""
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+        if self._heap[0][2] == key:
+            # the task may be sleeping until a later deadline
+            self._wakeup.set()
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._compact()
+
+    def cancel(self, key: Hashable) -> None:
+        self._deadlines.pop(key, None)
+
+    def _compact(self) -> None:
+        self._heap = [entry for entry in self._heap if self._deadlines.get(entry[2]) == entry[0]]
+        heapq.heapify(self._heap)
+
+    def _next_due(self) -> Optional[tuple[datetime, Hashable]]:
+        """The earliest live (deadline, key), dropping moved and cancelled entries on the way"""
+        while self._heap:
+            deadline, _, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return deadline, key
+            heapq.heappop(self._heap)
+        return None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            due = self._next_due()
+            if due is None:
+                await self._wakeup.wait()
+                continue
+            deadline, key = due
+            delay = (deadline - datetime.now()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                # woken up early, or the deadline may have moved while sleeping
+                continue
+            heapq.heappop(self._heap)
+            del self._deadlines[key]
+            task = asyncio.create_task(self._call(key))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _call(self, key: Hashable) -> None:
+        try:
+            await self.on_deadline(key)
+        except Exception:
+            Log.exception(f"Deadline handler for {key} failed")
@@ -1,21 +1,120 @@
 import asyncio
+import codecs
 import csv
+import hashlib
 import logging
-import os
 import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Optional
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 
-from httpx import AsyncClient
-from periodic import Periodic
+from httpx import AsyncClient, Limits
+
+from .changefeed import ChangeLog, InventoryChange, diff_inventories
+from .inventory_store import InventoryStore, InventoryStoreBuilder
+from .jumps import JumpTable, load_jump_table
+from .metrics import Counter, Gauge, Histogram
+from .ratelimit import RateLimiter, backoff_delay, parse_retry_after
+from .registry import InventoryConfig, load_inventory_config
+from .scheduler import AdaptiveInterval, RefreshScheduler
+from .singleflight import SingleFlight
+from .snapshot import load_snapshot, save_snapshot
+from .ticker_index import TickerIndex, is_pattern
+from .valuation import PriceTable, Valuation, value_inventories
 
 logging.basicConfig(
     stream=sys.stdout, level=logging.INFO, format="%(asctime)s (%(levelname)s) : %(message)s"
 )
 Log = logging.getLogger(__name__)
 
-http_client = AsyncClient()
+# FIO throttles per API key, so every FIO request made from here goes through the same limiter
+FioRateLimiter = RateLimiter(rate=2, capacity=4, min_rate=0.2)
+MaxFioRetries = 10
+RetryBaseDelay = 0.2
+RetryMaxDelay = 30
+# refreshes within this many seconds of the last successful one don't reach FIO or the sheet
+MinRefreshInterval = 30
+
+FioBaseUrl = "https://rest.fnar.net"
+
+# what every group refresh changed, with hooks for alerts
+InventoryChanges = ChangeLog()
+
+# Prometheus metrics, see metrics.start_metrics_server
+RefreshSeconds = Histogram(
+    "inventory_refresh_duration_seconds",
+    "Duration of group inventory updates, retries included",
+    ("group",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+RefreshesTotal = Counter(
+    "inventory_refreshes_total", "Group inventory updates by outcome: changed, unchanged, not_modified or error", ("group", "outcome")
+)
+ParsedBytes = Counter("inventory_parsed_bytes_total", "Bytes of FIO inventory CSV parsed", ("group",))
+ParsedRows = Counter("inventory_parsed_rows_total", "Rows of FIO inventory CSV parsed", ("group",))
+FioThrottled = Counter("fio_throttled_total", "HTTP 429 answers from FIO", ("group",))
+FioRetries = Counter("fio_retries_total", "FIO requests retried after a 429", ("group",))
+DataAge = Gauge("inventory_data_age_seconds", "Seconds since the served data was last fetched or confirmed", ("source",))
+ServingSnapshot = Gauge(
+    "inventory_serving_snapshot", "1 while the served data was loaded from a snapshot and no refresh confirmed it yet", ("source",)
+)
+RefreshInterval = Gauge("inventory_refresh_interval_seconds", "Current adaptive refresh interval", ("group",))
+WhohasStageSeconds = Histogram(
+    "whohas_stage_duration_seconds",
+    "whohas latency by stage: fetch (cache check, and any refresh it waited for), filter and format",
+    ("stage",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.1, 1, 5),
+)
+ValuationSeconds = Histogram(
+    "inventory_valuation_duration_seconds",
+    "Duration of valuing every group's stock at one CX price",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+# looked up once, whohas is the hot path
+WhohasFetchSeconds = WhohasStageSeconds.labels("fetch")
+WhohasFilterSeconds = WhohasStageSeconds.labels("filter")
+WhohasFormatSeconds = WhohasStageSeconds.labels("format")
+
+# one long-lived client for FIO and the seller sheet, so refreshes reuse pooled keep-alive connections
+http_client: Optional[AsyncClient] = None
+HttpLimits = Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60)
+
+
+def _http2_available() -> bool:
+    # httpx only speaks HTTP/2 with the optional h2 package installed (httpx[http2])
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> AsyncClient:
+    """Returns the shared client, creating it on first use"""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = AsyncClient(limits=HttpLimits, http2=_http2_available())
+    return http_client
+
+
+async def close_http_client() -> None:
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+@asynccontextmanager
+async def inventory_http_client() -> AsyncIterator[AsyncClient]:
+    """Opens the shared client for the lifetime of the bot, and closes its connections on the way out"""
+    try:
+        yield get_http_client()
+    finally:
+        await close_http_client()
 
 
 @dataclass
@@ -23,6 +122,8 @@ class UserTickerInventory:
     user: str
     ticker: str
     inventory: list[tuple[str, int]] = field(default_factory=list) # e.g [("UV-351a", 500), ("BEN", 1000)]
+    # location -> jumps to the destination whohas was asked about, None if unknown or unreachable
+    jumps: dict[str, Optional[int]] = field(default_factory=dict)
 
     def __post_init__(self) -> None:
         self.hasBeenFiltered: bool = False
@@ -37,109 +138,368 @@ class UserTickerInventory:
             result += x[1]
         return result
 
+    def nearestJumps(self) -> Optional[int]:
+        known = [jumps for jumps in self.jumps.values() if jumps is not None]
+        return min(known) if known else None
+
+    def sortByJumps(self, jumps: dict[str, Optional[int]]):
+        """Nearest locations first, unknown and unreachable ones last, then the largest amounts"""
+        self.jumps = {location: jumps.get(location) for location, _ in self.inventory}
+        self.inventory.sort(key=lambda x: (jumps.get(x[0]) is None, jumps.get(x[0]) or 0, -x[1]))
+
+    def _jumpsText(self, location):
+        jumps = self.jumps.get(location)
+        return f" ({jumps} jumps)" if jumps is not None else ""
+
     def toStrDetailed(self):
-        locationDetailsList = [f"{amount} {self.ticker} at {location}" for location, amount in self.inventory]
+        locationDetailsList = [
+            f"{amount} {self.ticker} at {location}{self._jumpsText(location)}" for location, amount in self.inventory
+        ]
         details = ", ".join(locationDetailsList)
         return f"{self.user} has " + details
 
     def toStrSummed(self):
-        return "{user} has {total} {ticker}".format(user=self.user, total=self.getTotal(), ticker=self.ticker)
+        summed = "{user} has {total} {ticker}".format(user=self.user, total=self.getTotal(), ticker=self.ticker)
+        if self.nearestJumps() is not None:
+            # sorted by sortByJumps, the nearest location comes first
+            summed += f", nearest at {self.inventory[0][0]}{self._jumpsText(self.inventory[0][0])}"
+        return summed
 
     def toStr(self):
         return self.toStrDetailed() if self.hasBeenFiltered else self.toStrSummed()
 
 
+async def _read_inventory_csv(
+    chunks: AsyncIterator[bytes], previous: Optional[InventoryStore] = None, known_hash: Optional[bytes] = None
+) -> tuple[Optional[InventoryStore], bytes, int]:
+    """Parses a FIO inventory CSV as it streams in. Returns the inventory, a hash of the body and its size.
+
+    Given the hash of the body the inventory was last built from, the body is hashed before it is
+    parsed instead, and the inventory is None if the hash matches.
+    """
+    builder = InventoryStoreBuilder(previous)
+    hasher = hashlib.blake2b(digest_size=16)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    columns: Optional[tuple[int, int, int, int]] = None
+    pending = ""
+    size = 0
+    # the body held back until its hash is known, when there is one to compare against
+    held: Optional[list[bytes]] = [] if known_hash is not None else None
+
+    def add_rows(lines: list[str]) -> None:
+        nonlocal columns
+        # FIO fields never contain line breaks, so every complete line is a complete row
+        for row in csv.reader(lines):
+            if not row:
+                continue
+            if columns is None:
+                header = {name: i for i, name in enumerate(row)}
+                columns = (header["Username"], header["Ticker"], header["NaturalId"], header["Amount"])
+                continue
+            user, ticker, location, amount = (row[i] for i in columns)
+            builder.add(user, ticker, location, int(amount))
+
+    def parse(chunk: bytes) -> None:
+        nonlocal pending
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        add_rows(lines)
+
+    async for chunk in chunks:
+        hasher.update(chunk)
+        size += len(chunk)
+        if held is not None:
+            held.append(chunk)
+        else:
+            parse(chunk)
+    body_hash = hasher.digest()
+    if held is not None:
+        if body_hash == known_hash:
+            return None, body_hash, size
+        for chunk in held:
+            parse(chunk)
+    add_rows([pending + decoder.decode(b"", final=True)])
+
+    return builder.build(), body_hash, size
+
+
+class SnapshotCache(ABC):
+    """Data kept from upstream, that survives restarts.
+
+    refresh() runs update() coalesced with any update already in flight, and not at all within
+    MinRefreshInterval of the last successful one. Updates save a snapshot, which load_snapshot
+    serves after a restart, marked stale until the next successful update.
+    """
+
+    last_updated: Optional[datetime] = None
+
+    def __init__(self) -> None:
+        # serving data loaded from a snapshot, that no refresh has confirmed yet
+        self.stale: bool = False
+        self._refresh_flight = SingleFlight()
+
+    @abstractmethod
+    async def update(self, client: AsyncClient) -> Any:
+        ...
+
+    @abstractmethod
+    def _snapshot_name(self) -> str:
+        ...
+
+    @abstractmethod
+    def _snapshot_payload(self) -> dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def _restore(self, payload: dict[str, Any]) -> None:
+        """Swaps in the data of a snapshot payload, last_updated included"""
+
+    def _has_data(self) -> bool:
+        return self.last_updated is not None
+
+    async def refresh(self, client: AsyncClient) -> bool:
+        """update(), coalesced with any update already running and skipped if the data is recent enough"""
+        return await self._refresh_flight.run(lambda: self.update(client), MinRefreshInterval)
+
+    async def _save_snapshot(self) -> None:
+        # the saved structures are replaced, never mutated, so they can be pickled off the event loop
+        await asyncio.to_thread(save_snapshot, self._snapshot_name(), self._snapshot_payload())
+
+    def load_snapshot(self) -> bool:
+        """Serves the last saved data, marked stale until the next successful update"""
+        if self._has_data():
+            return False
+        payload = load_snapshot(self._snapshot_name())
+        if payload is None:
+            return False
+        self._restore(payload)
+        self.stale = True
+        Log.info(f"Loaded snapshot {self._snapshot_name()} from {self.last_updated}")
+        return True
+
+
 @dataclass
-class GroupInventory:
+class GroupInventory(SnapshotCache):
     group_id: str
     group_name: str
     api_key: str
     last_updated: Optional[datetime] = None
-    inventory: dict[str, dict[str, list[tuple[str, int]]]] = field(default_factory=dict)
+    inventory: InventoryStore = field(default_factory=InventoryStore)
 
     def __post_init__(self) -> None:
+        super().__init__()
         self._initialized: bool = False
-        self._fio_url = f"https://rest.fnar.net/csv/inventory?group={self.group_id}&apikey={self.api_key}"
+        # validators of the last successful fetch, for conditional requests and change detection
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._body_hash: Optional[bytes] = None
+        # whether the last successful update brought different data than the one before
+        self.changed: bool = False
+        self.last_changed: Optional[datetime] = None
+        # HTTP 429 retries of this group since startup
+        self.retries: int = 0
+        # ticker -> (the seller mapping it was computed with, {seller: total}), for the current inventory
+        self._seller_totals: dict[str, tuple[dict[str, list[str]], dict[str, int]]] = {}
+        self._seller_totals_of: Optional[InventoryStore] = None
+        self._fio_url = f"{FioBaseUrl}/csv/inventory?group={self.group_id}&apikey={self.api_key}"
 
     def is_initialized(self) -> bool:
         return self._initialized
 
-    async def update(self, client: AsyncClient, retries: int = 0):
-        response = await client.get(self._fio_url, timeout=5)
-        if retries < 1:
-            Log.info(f"Updating FIO inventory for group {self.group_name}")
-        elif retries > 10:
-            Log.error(f"Unable to update FIO data after {retries} retries.")
-            raise Exception(f"Retries exhausted. Failed to update inventory for group {self.group_name} (id:{self.group_id})")
-        else:
-            Log.info(f"Retrying fetch for group {self.group_name}")
-
-        if response.status_code == 200:
-            Log.info(f"Updated FIO inventory for group {self.group_name}")
-        elif response.status_code == 429:
-            Log.info(f"HTTP 429, Retrying in 200ms")
-            await asyncio.sleep(0.2)
-            await self.update(client, retries=retries+1)
-            #  if this call was a 429, we don't want to fall through to the actual update after this
-            #  That is handled by whatever retry call gets a 200 response
-            return
+    def _has_data(self) -> bool:
+        return self._initialized
+
+    def _conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        return headers
+
+    async def update(self, client: AsyncClient):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            outcome = await self._update(client)
+        finally:
+            RefreshSeconds.labels(self.group_name).observe(time.perf_counter() - start)
+            RefreshesTotal.labels(self.group_name, outcome).inc()
+
+    async def _update(self, client: AsyncClient) -> str:
+        """Returns the outcome: changed, unchanged or not_modified"""
+        Log.info(f"Updating FIO inventory for group {self.group_name}")
+        for attempt in range(MaxFioRetries + 1):
+            if attempt > 0:
+                FioRetries.labels(self.group_name).inc()
+                Log.info(f"Retrying fetch for group {self.group_name}")
+            await FioRateLimiter.acquire()
+            async with client.stream(
+                "GET", self._fio_url, headers=self._conditional_headers(), timeout=5
+            ) as response:
+                if response.status_code == 200:
+                    # the inventory is built while the body streams in, and only swapped in once complete
+                    # a body identical to the last one isn't parsed at all
+                    new_inventory, body_hash, body_size = await _read_inventory_csv(
+                        response.aiter_bytes(), self.inventory, self._body_hash if self._initialized else None
+                    )
+                    if new_inventory is not None:
+                        ParsedBytes.labels(self.group_name).inc(body_size)
+                        ParsedRows.labels(self.group_name).inc(len(new_inventory))
+                        Log.info(f"Updated FIO inventory for group {self.group_name}")
+                elif response.status_code == 304:
+                    Log.info(f"FIO inventory for group {self.group_name} not modified")
+                elif response.status_code == 429:
+                    FioThrottled.labels(self.group_name).inc()
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                else:
+                    raise Exception(
+                        f"Failed to update inventory for group {self.group_name} (id:{self.group_id})"
+                    )
+
+            if response.status_code != 429:
+                FioRateLimiter.succeeded()
+                break
+            self.retries += 1
+            FioRateLimiter.throttled(retry_after)
+            delay = backoff_delay(attempt, RetryBaseDelay, RetryMaxDelay, retry_after)
+            Log.info(f"HTTP 429, Retrying in {int(delay * 1000)}ms")
+            await asyncio.sleep(delay)
         else:
-            raise Exception(
-                f"Failed to update inventory for group {self.group_name} (id:{self.group_id})"
-            )
+            Log.error(f"Unable to update FIO data after {MaxFioRetries} retries.")
+            raise Exception(f"Retries exhausted. Failed to update inventory for group {self.group_name} (id:{self.group_id})")
 
-        csvData = csv.DictReader(response.text.split("\r\n"))
+        if response.status_code == 304:
+            self._mark_updated(changed=False)
+            await self._save_metadata()
+            return "not_modified"
 
-        new_inventory: dict[str, dict[str, list[tuple[str, int]]]] = {}
-        for row in csvData:
-            if row["Username"] not in new_inventory:
-                new_inventory[row["Username"]] = {}
-            if row["Ticker"] not in new_inventory[row["Username"]]:
-                new_inventory[row["Username"]][row["Ticker"]] = []
-            new_inventory[row["Username"]][row["Ticker"]].append(
-                (row["NaturalId"], int(row["Amount"]))
-            )
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        if new_inventory is None:
+            Log.info(f"FIO inventory for group {self.group_name} unchanged, skipping rebuild")
+            self._mark_updated(changed=False)
+            await self._save_metadata()
+            return "unchanged"
 
+        previous = self.inventory if self._initialized else None
+        # the batch whohas totals, materialized once per refresh and off the event loop
+        await asyncio.to_thread(new_inventory.aggregate)
         self.inventory = new_inventory
+        self._body_hash = body_hash
+        self._initialized = True
+        self._mark_updated(changed=True)
+        if previous is not None:
+            # both stores are immutable, so they can be diffed off the event loop
+            diff = await asyncio.to_thread(diff_inventories, previous, new_inventory)
+            InventoryChanges.publish(
+                [
+                    InventoryChange(self.group_id, user, ticker, location, before, after, self.last_updated)
+                    for user, ticker, location, before, after in diff
+                ]
+            )
+        await self._save_snapshot()
+        return "changed"
+
+    def _mark_updated(self, changed: bool) -> None:
+        self.changed = changed
+        self.stale = False
         self.last_updated = datetime.now()
+        if changed:
+            self.last_changed = self.last_updated
+
+    def _snapshot_name(self) -> str:
+        return f"group-{self.group_id}"
+
+    def _metadata_payload(self) -> dict[str, Any]:
+        return {
+            "last_updated": self.last_updated,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "body_hash": self._body_hash,
+        }
+
+    def _snapshot_payload(self) -> dict[str, Any]:
+        return {**self._metadata_payload(), "inventory": self.inventory}
+
+    async def _save_metadata(self) -> None:
+        """Records a refresh that confirmed the snapshotted inventory, without pickling the inventory again"""
+        await asyncio.to_thread(save_snapshot, f"{self._snapshot_name()}-meta", self._metadata_payload())
+
+    def _restore(self, payload: dict[str, Any]) -> None:
+        self.inventory = payload["inventory"]
+        self.last_changed = payload["last_updated"]
+        metadata = load_snapshot(f"{self._snapshot_name()}-meta")
+        # refreshes that found nothing new since the inventory was saved
+        if (
+            metadata is not None
+            and metadata["body_hash"] == payload["body_hash"]
+            and metadata["last_updated"] > payload["last_updated"]
+        ):
+            payload = metadata
+        self._etag = payload["etag"]
+        self._last_modified = payload["last_modified"]
+        self._body_hash = payload["body_hash"]
+        self.last_updated = payload["last_updated"]
         self._initialized = True
 
+    def seller_totals(self, ticker: str, sellerData: "SellerData") -> dict[str, int]:
+        """{seller: total after their POS filter}, what findInInventory would list.
+
+        Kept until the inventory or the ticker's seller sheet entries change, so repeated batch
+        queries are dict lookups.
+        """
+        if self._seller_totals_of is not self.inventory:
+            self._seller_totals = {}
+            self._seller_totals_of = self.inventory
+        sellers = sellerData.get_sellers_for_ticker(ticker)
+        cached = self._seller_totals.get(ticker)
+        if cached is not None and cached[0] is sellers:
+            return cached[1]
+        totals = {userInv.user: userInv.getTotal() for userInv in self.findInInventory(ticker, sellerData)}
+        self._seller_totals[ticker] = (sellers, totals)
+        return totals
+
     def findInInventory(
         self,
         ticker: str,
         sellerData: "SellerData",
         shouldReturnAll: bool = False,
     ) -> list[UserTickerInventory]:
+        store = self.inventory
+        if shouldReturnAll:
+            return [UserTickerInventory(user, ticker, locations) for user, locations, _ in store.holders(ticker)]
+
+        sellersData = sellerData.get_sellers_for_ticker(ticker)
+        Log.debug("Sellers: %s", list(sellersData.keys()))
+        # compare interned ids while walking the holdings, sellers absent from the group can't match anyway
+        seller_ids = {store.ids[seller]: seller for seller in sellersData if seller in store.ids}
+        holding_user = store.holding_user
         result: list[UserTickerInventory] = []
-        # filter for only ticker we want
-        for user, inv in self.inventory.items():
-            if ticker in inv:
-                result.append(UserTickerInventory(user, ticker, inv[ticker]))
-
-        if not shouldReturnAll:
-            sellersData = sellerData.get_sellers_for_ticker(ticker)
-            sellers = list(sellersData.keys())
-            print("Sellers:", str(sellers))
-            seller_filtered_result = [x for x in result if x.user in sellers]
-
-            #filter by POS, remove UserTickerInventory if empty after filtering
-            for userInv in seller_filtered_result.copy():
-                if len(sellersData[userInv.user]) > 0:
-                    userInv.filterLocations(sellersData[userInv.user])
-                    if userInv.getTotal() <= 0:
-                        seller_filtered_result.remove(userInv)
-            result = seller_filtered_result
+        for holding in store.holdings(ticker):
+            user = seller_ids.get(holding_user[holding])
+            if user is None:
+                continue
+            userInv = UserTickerInventory(user, ticker, store.locations(holding))
+            #filter by POS, skip the user if nothing is left after filtering
+            if len(sellersData[user]) > 0:
+                userInv.filterLocations(sellersData[user])
+                if userInv.getTotal() <= 0:
+                    continue
+            result.append(userInv)
 
         return sorted(result, key=lambda x: x.getTotal())[::-1]
 
 
-class SellerData:
-    last_updated: Optional[datetime] = None
+class SellerData(SnapshotCache):
     data: list[dict[str, str]]
     _seller_sheet_url = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTU0PDYV0CYk5LObZAFcxIXZNshT27WHvy1CZNmm8paC7eMVmTlCk3rxIFyEY6Tbiz0uiIDG8CxGuCm/pub?gid=0&single=true&output=csv"
 
     def __init__(self):
+        super().__init__()
         self.data = []
+        # ticker -> {SELLER: [POS locations]}, compiled once per update
+        self._sellers_by_ticker: dict[str, dict[str, list[str]]] = {}
 
     async def update(self, client: AsyncClient):
         response = await client.get(
@@ -148,145 +508,546 @@ class SellerData:
         if response.status_code == 307:
             Log.info(f"Got a temporary redirect")
         elif response.status_code == 200:
-            self.data = list(csv.DictReader(response.text.split("\r\n")))
+            data = list(csv.DictReader(response.text.split("\r\n")))
+            sellers_by_ticker = self._compile(data)
+            # only swap in a sheet that parsed completely
+            self.data = data
+            self._sellers_by_ticker = sellers_by_ticker
             self.last_updated = datetime.now()
+            self.stale = False
             Log.info(
                 f"Updated seller data from Google Sheet, got response code {response.status_code}"
             )
             if len(self.data) < 1:
                 Log.warning(f"It appears that we got an empty response from the sheet")
+            await self._save_snapshot()
+
+    def _snapshot_name(self) -> str:
+        return "sellers"
+
+    def _snapshot_payload(self) -> dict[str, Any]:
+        return {"last_updated": self.last_updated, "data": self.data, "sellers_by_ticker": self._sellers_by_ticker}
+
+    def _restore(self, payload: dict[str, Any]) -> None:
+        self.data = payload["data"]
+        self._sellers_by_ticker = payload["sellers_by_ticker"]
+        self.last_updated = payload["last_updated"]
+
+    @staticmethod
+    def _compile(data: list[dict[str, str]]) -> dict[str, dict[str, list[str]]]:
+        sellers_by_ticker: dict[str, dict[str, list[str]]] = {}
+        malformed: list[int] = []
+        for line, row in enumerate(data, start=2):  # line 1 is the header
+            ticker = (row.get("MAT") or "").strip()
+            seller = (row.get("Seller") or "").strip()
+            if not ticker or not seller:
+                malformed.append(line)
+                continue
+            pos_list = [x.strip() for x in (row.get("POS") or "").split(",") if x.strip() != ""]
+            sellers_by_ticker.setdefault(ticker, {})[seller.upper()] = pos_list
+
+        if malformed:
+            Log.warning(
+                f"Skipped {len(malformed)} seller sheet rows without MAT or Seller, lines: {malformed}"
+            )
+        return sellers_by_ticker
 
     def get_sellers_for_ticker(self, ticker: str) -> dict[str, list[str]]:
-        result: dict[str, list[str]] = {}
-        for row in self.data:
-            if row["MAT"] == ticker:
-                pos_list = [x.strip() for x in row.get("POS", "").split(",") if x != ""]
-                result[row["Seller"].upper()] = pos_list
+        """Returns the compiled {SELLER: [POS]} mapping for the ticker, callers must not modify it"""
+        return self._sellers_by_ticker.get(ticker, {})
 
-        return result
 
+class CxPrices(SnapshotCache):
+    """Prices of every material on every CX, from FIO's /exchange/all"""
 
-UpdateInterval = 300
-CachedSellersData: SellerData = SellerData()
+    def __init__(self) -> None:
+        super().__init__()
+        self.table = PriceTable()
 
+    async def update(self, client: AsyncClient) -> None:
+        await FioRateLimiter.acquire()
+        response = await client.get(f"{FioBaseUrl}/exchange/all", timeout=10)
+        if response.status_code == 429:
+            FioRateLimiter.throttled(parse_retry_after(response.headers.get("Retry-After")))
+            raise Exception("Failed to update CX prices, throttled by FIO")
+        if response.status_code != 200:
+            raise Exception(f"Failed to update CX prices, got response code {response.status_code}")
+        FioRateLimiter.succeeded()
+        last_updated = datetime.now()
+        table = await asyncio.to_thread(lambda: PriceTable(response.json(), last_updated))
+        # only swap in a table that parsed completely
+        self.table = table
+        self.last_updated = last_updated
+        self.stale = False
+        Log.info(f"Updated CX prices, {len(table)} price lists")
+        await self._save_snapshot()
 
-CachedShipyardInventories = GroupInventory(
-    group_id="41707164", group_name="Shipyard Group", api_key=os.getenv("FIO_API_KEY", "")
-)
-CachedEv1lInventories = GroupInventory(
-    group_id="83373923",
-    group_name="Ev1l Group",
-    api_key=os.getenv("FIO_API_KEY", ""),
-)
-ShipPartTickers = (
-    "BR1",
-    "BR2",  # bridges
-    "CQT",
-    "CQS",
-    "CQM",
-    "CQL",  # crew q
-    "FFC",
-    "SFE",
-    "MFE",
-    "LFE",  # FFC, emitters
-    "GEN",
-    "ENG",
-    "FSE",
-    "AEN",
-    "HTE",  # STL engines
-    "RCT",
-    "QCR",
-    "HPR",
-    "HYR",  # FTL engines
-    "SSL",
-    "MSL",
-    "LSL",  # STL fuel tanks
-    "SFL",
-    "MFL",
-    "LFL",  # FTL fuel tanks
-    "TCB",
-    "VSC",
-    "SCB",
-    "MCB",
-    "LCB",
-    "WCB",
-    "VCB",  # cargo bays
-    "SSC",
-    "LHB",
-    "BHP",
-    "RHP",
-    "HHP",
-    "AHP",  # hull plates, SSC
-    "BGS",
-    "AGS",
-    "STS",  # misc
-    "BPT",
-    "APT",
-    "BWH",
-    "AWH",  # whipple shields and thermal protection
-    "RDS",
-    "RDL",  # repair drones
-    "BRP",
-    "ARP",
-    "SRP",  # anti-radiation plates
-)
+    def _snapshot_name(self) -> str:
+        return "prices"
 
+    def _snapshot_payload(self) -> dict[str, Any]:
+        return {"table": self.table}
 
-async def updateInventories():
-    global CachedShipyardInventories
-    global CachedEv1lInventories
-    global CachedSellersData
+    def _restore(self, payload: dict[str, Any]) -> None:
+        self.table = payload["table"]
+        self.last_updated = self.table.last_updated
 
-    Log.info("Updating inventories")
 
-    try:
-        async with AsyncClient() as client:
-            await asyncio.gather(
-                CachedShipyardInventories.update(client),
-                CachedEv1lInventories.update(client),
-                CachedSellersData.update(client),
-                return_exceptions=True,
+class InventoryRegistry:
+    """The FIO groups from the inventory config, and which of them answers for each ticker"""
+
+    def __init__(self, config: InventoryConfig) -> None:
+        self.config = config
+        self.groups: list[GroupInventory] = []
+        self.refresh_intervals: dict[str, float] = {}
+        # group id -> (soft TTL, hard TTL)
+        self.ttls: dict[str, tuple[float, float]] = {}
+        # group id -> scheduled refresh interval, adapted to queries and changes
+        self.schedules: dict[str, AdaptiveInterval] = {}
+        self._routes: dict[str, GroupInventory] = {}
+        self._ticker_index = TickerIndex(())
+        self._indexed_stores: tuple[InventoryStore, ...] = ()
+        for group_config in config.groups:
+            group = GroupInventory(
+                group_id=group_config.group_id,
+                group_name=group_config.group_name,
+                api_key=group_config.api_key,
+            )
+            self.groups.append(group)
+            self.refresh_intervals[group.group_id] = group_config.refresh_interval
+            self.ttls[group.group_id] = (group_config.soft_ttl, group_config.hard_ttl)
+            self.schedules[group.group_id] = AdaptiveInterval(
+                group_config.refresh_interval,
+                group_config.min_refresh_interval,
+                group_config.max_refresh_interval,
+                group_config.refresh_jitter,
+            )
+            for ticker in group_config.tickers:
+                self._routes[ticker] = group
+            if group_config.default:
+                self.default = group
+            DataAge.labels(group.group_name).set_function(lambda group=group: _age(group.last_updated))
+            ServingSnapshot.labels(group.group_name).set_function(lambda group=group: float(group.stale))
+            RefreshInterval.labels(group.group_name).set_function(
+                lambda schedule=self.schedules[group.group_id]: schedule.interval
             )
-    except Exception:
-        pass
 
+    def route(self, ticker: str) -> GroupInventory:
+        return self._routes.get(ticker, self.default)
+
+    def ticker_index(self) -> TickerIndex:
+        """Index of the tickers held in any group, rebuilt only once a refresh swapped in a new inventory"""
+        stores = tuple(group.inventory for group in self.groups)
+        if len(stores) != len(self._indexed_stores) or any(a is not b for a, b in zip(stores, self._indexed_stores)):
+            self._ticker_index = TickerIndex(ticker for store in stores for ticker in store.tickers())
+            self._indexed_stores = stores
+        return self._ticker_index
+
+    def is_multi_ticker(self, query: str) -> bool:
+        return query.lower() in self.config.categories or query.lower() == "ship" or is_pattern(query)
+
+    def resolve(self, query: str) -> list[str]:
+        """The tickers a query stands for: "ship" for every ship part, a category name from the config,
+        a pattern like CQ* or *FE matched against the tickers anyone holds, or just the one ticker"""
+        if query.lower() == "ship":
+            return [ticker for tickers in self.config.categories.values() for ticker in tickers]
+        category = self.config.categories.get(query.lower())
+        if category is not None:
+            return list(category)
+        if is_pattern(query):
+            return self.ticker_index().match(query.upper())
+        return [query.upper()]
+
+
+CachedSellersData: SellerData = SellerData()
+CachedPrices = CxPrices()
+InventoryGroups = InventoryRegistry(load_inventory_config())
+ShipPartTickers = tuple(
+    ticker for tickers in InventoryGroups.config.categories.values() for ticker in tickers
+)
+RefreshSchedule: Optional[RefreshScheduler] = None
+DataAge.labels("seller sheet").set_function(lambda: _age(CachedSellersData.last_updated))
+ServingSnapshot.labels("seller sheet").set_function(lambda: float(CachedSellersData.stale))
+DataAge.labels("cx prices").set_function(lambda: _age(CachedPrices.last_updated))
+ServingSnapshot.labels("cx prices").set_function(lambda: float(CachedPrices.stale))
+
+
+class Freshness(Enum):
+    """How whohas got the data it answered from"""
+
+    # younger than the soft TTL
+    FRESH = "fresh"
+    # older than the soft TTL, served as is while a background refresh runs
+    REVALIDATING = "revalidating"
+    # missing, older than the hard TTL or forced, so it was refreshed before answering
+    REFRESHED = "refreshed"
+    # had to be refreshed but FIO failed, whatever was cached is served
+    REFRESH_FAILED = "refresh failed"
+
+
+class WhohasResult(tuple):
+    """The (holders, last_updated) pair whohas returns, and still unpacks as one.
+
+    stale is set when the holders come from a snapshot saved before the last restart.
+    """
+
+    stale: bool
+    freshness: Freshness
+
+    def __new__(
+        cls,
+        holders: list[UserTickerInventory],
+        last_updated: Optional[datetime],
+        stale: bool = False,
+        freshness: Freshness = Freshness.FRESH,
+    ) -> "WhohasResult":
+        result = super().__new__(cls, (holders, last_updated))
+        result.stale = stale
+        result.freshness = freshness
+        return result
+
+
+_jump_table: Optional[JumpTable] = None
+_jump_table_loaded = False
+
+
+def jump_table() -> Optional[JumpTable]:
+    """The table built by python -m HAL9666.lib.jumps, loaded on first use. None if it wasn't built."""
+    global _jump_table, _jump_table_loaded
+    if not _jump_table_loaded:
+        _jump_table = load_jump_table()
+        _jump_table_loaded = True
+    return _jump_table
 
-async def whohas(
-    ctx: Any, ticker: str, shouldReturnAll: bool = False, forceUpdate: bool = False
-) -> tuple[list[UserTickerInventory], datetime | None]:
-    Log.info(f"whohas {ticker}")
 
-    # update relevant group inventory
-    isShipPartTicker = ticker in ShipPartTickers
+def rank_by_jumps(holders: list[UserTickerInventory], destination: str) -> list[UserTickerInventory]:
+    """Sorts every holder's locations, and the holders, nearest to the destination first.
 
-    inventory = CachedShipyardInventories if isShipPartTicker else CachedEv1lInventories
-    if forceUpdate or not inventory.is_initialized():
+    Raises ValueError if there is no jump table or it doesn't know the destination.
+    """
+    table = jump_table()
+    if table is None:
+        raise ValueError("There is no jump table, build one with python -m HAL9666.lib.jumps")
+    row = table.distances_to(destination)
+    if row is None:
+        raise ValueError(f"Unknown destination {destination}")
+    # one table lookup per distinct location, however many holders share it
+    jumps: dict[str, Optional[int]] = {}
+    for userInv in holders:
+        for location, _ in userInv.inventory:
+            if location not in jumps:
+                jumps[location] = table.jumps(location, row)
+        userInv.sortByJumps(jumps)
+    return sorted(
+        holders, key=lambda x: (x.nearestJumps() is None, x.nearestJumps() or 0, -x.getTotal())
+    )
+
+
+# strong references to the refreshes whohas started, so they aren't garbage collected mid-flight
+_background_refreshes: set["asyncio.Future[Any]"] = set()
+
+
+def _refresh_in_background(name: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+    task = asyncio.ensure_future(refresh())
+    _background_refreshes.add(task)
+
+    def finished(task: "asyncio.Future[Any]") -> None:
+        _background_refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            Log.error(f"Background refresh of {name} failed: {task.exception()}")
+
+    task.add_done_callback(finished)
+
+
+def _age(last_updated: Optional[datetime]) -> float:
+    return float("inf") if last_updated is None else (datetime.now() - last_updated).total_seconds()
+
+
+async def _revalidate(inventory: GroupInventory, forceUpdate: bool) -> Freshness:
+    """Refreshes the group first if it has to, or in the background if it should"""
+    InventoryGroups.schedules[inventory.group_id].record_query()
+    soft_ttl, hard_ttl = InventoryGroups.ttls[inventory.group_id]
+    age = _age(inventory.last_updated)
+    client = get_http_client()
+    # snapshot data is served right away after a restart, however old, while it is refreshed
+    if forceUpdate or not inventory.is_initialized() or (age >= hard_ttl and not inventory.stale):
         try:
-            async with AsyncClient() as client:
-                await inventory.update(client)
+            refreshed = await inventory.refresh(client)
+            # skipped, because the last refresh is only MinRefreshInterval old
+            return Freshness.REFRESHED if refreshed else Freshness.FRESH
         except Exception as e:
-            await ctx.reply(
-                "Error updating inventory from FIO. Falling back to cached data"
-            )
+            Log.error(f"Refreshing {inventory.group_name} for whohas failed: {e}")
+            return Freshness.REFRESH_FAILED
+    elif age >= soft_ttl:
+        _refresh_in_background(inventory.group_name, lambda: inventory.refresh(client))
+        return Freshness.REVALIDATING
+    return Freshness.FRESH
+
 
+async def _revalidate_sellers(forceUpdate: bool) -> None:
+    # the seller sheet only filters the answer, it never holds the reply up unless forced
+    client = get_http_client()
     if forceUpdate:
-        async with AsyncClient() as client:
-            await CachedSellersData.update(client)
-
-    result = (
-        inventory.findInInventory(
-            ticker=ticker,
-            sellerData = CachedSellersData,
-            shouldReturnAll=shouldReturnAll,
-        ),
+        await CachedSellersData.refresh(client)
+    elif _age(CachedSellersData.last_updated) >= 2 * InventoryGroups.config.seller_refresh_interval:
+        _refresh_in_background("seller sheet", lambda: CachedSellersData.refresh(client))
+
+
+def _whohas_answer(
+    inventory: GroupInventory,
+    ticker: str,
+    shouldReturnAll: bool,
+    destination: Optional[str],
+    freshness: Freshness,
+) -> WhohasResult:
+    holders = inventory.findInInventory(
+        ticker=ticker,
+        sellerData = CachedSellersData,
+        shouldReturnAll=shouldReturnAll,
+    )
+    if destination:
+        holders = rank_by_jumps(holders, destination)
+    return WhohasResult(
+        holders,
         inventory.last_updated,
+        inventory.stale,
+        freshness,
     )
+
+
+async def whohas(
+    ctx: Any,
+    ticker: str,
+    shouldReturnAll: bool = False,
+    forceUpdate: bool = False,
+    destination: Optional[str] = None,
+) -> WhohasResult:
+    """Answers from cached data, stale-while-revalidate style.
+
+    Data younger than the group's soft TTL is served as is. Older data is served right away
+    while a refresh runs in the background, and only data past the hard TTL (or a forced update)
+    waits for FIO, unless it was just loaded from a snapshot. The result's freshness says which of
+    these happened.
+
+    With a destination, holders are ranked by jumps to it instead of by amount (see rank_by_jumps).
+    """
+    Log.info(f"whohas {ticker}")
+    start = time.perf_counter()
+
+    inventory = InventoryGroups.route(ticker)
+    freshness = await _revalidate(inventory, forceUpdate)
+    await _revalidate_sellers(forceUpdate)
+
+    fetched = time.perf_counter()
+    WhohasFetchSeconds.observe(fetched - start)
+    result = _whohas_answer(inventory, ticker, shouldReturnAll, destination, freshness)
+    WhohasFilterSeconds.observe(time.perf_counter() - fetched)
     # print(str(result))
     print("Full:", str(result))
 
     return result
 
 
+async def whohas_query(
+    ctx: Any,
+    query: str,
+    shouldReturnAll: bool = False,
+    forceUpdate: bool = False,
+    destination: Optional[str] = None,
+) -> list[tuple[str, WhohasResult]]:
+    """whohas for every ticker the query resolves to (see InventoryRegistry.resolve), in ticker order.
+    Each group is revalidated once, then the tickers are looked up in its index one after another."""
+    Log.info(f"whohas {query}")
+    start = time.perf_counter()
+    groups = {ticker: InventoryGroups.route(ticker) for ticker in InventoryGroups.resolve(query)}
+    involved = {group.group_id: group for group in groups.values()}
+    freshness = {group_id: await _revalidate(group, forceUpdate) for group_id, group in involved.items()}
+    await _revalidate_sellers(forceUpdate)
+    fetched = time.perf_counter()
+    WhohasFetchSeconds.observe(fetched - start)
+
+    answers = [
+        (ticker, _whohas_answer(group, ticker, shouldReturnAll, destination, freshness[group.group_id]))
+        for ticker, group in groups.items()
+    ]
+    WhohasFilterSeconds.observe(time.perf_counter() - fetched)
+    return answers
+
+
+# worst first, a batch reports the worst freshness of its groups
+_FreshnessSeverity = [Freshness.REFRESH_FAILED, Freshness.REVALIDATING, Freshness.REFRESHED, Freshness.FRESH]
+
+
+@dataclass
+class BatchAnswer:
+    """Who holds what, for several tickers at once"""
+
+    tickers: list[str]
+    # user -> ticker -> amount, only users holding at least one of the tickers
+    holdings: dict[str, dict[str, int]]
+    # ticker -> amount held by everyone in its group, seller or not
+    totals: dict[str, int]
+    # ticker -> (location, amount) of the location holding the most of it
+    top_locations: dict[str, tuple[str, int]]
+    # of the least recently updated group
+    last_updated: Optional[datetime]
+    freshness: Freshness
+
+    def users(self) -> list[str]:
+        """Users holding the most of the tickers first, then the largest amounts"""
+        return sorted(self.holdings, key=lambda user: (-len(self.holdings[user]), -sum(self.holdings[user].values()), user))
+
+    def format_matrix(self, columns: int = 8, limit: int = 2000) -> list[str]:
+        """The holdings as code block tables of at most columns tickers, each under limit characters"""
+        blocks = []
+        users = self.users()
+        for first in range(0, len(self.tickers), columns):
+            tickers = self.tickers[first : first + columns]
+            rows = [(user, [self.holdings[user].get(t, 0) for t in tickers]) for user in users]
+            rows = [(user, amounts) for user, amounts in rows if any(amounts)]
+            rows.append(("Total", [self.totals.get(t, 0) for t in tickers]))
+            name_width = max(len(user) for user, _ in rows)
+            widths = [max([len(t)] + [len(str(amounts[i])) for _, amounts in rows]) for i, t in enumerate(tickers)]
+            header = " " * name_width + "".join(f" {t:>{w}}" for t, w in zip(tickers, widths))
+            lines = [
+                f"{user:<{name_width}}" + "".join(f" {amount or '.':>{w}}" for amount, w in zip(amounts, widths))
+                for user, amounts in rows
+            ]
+            block = [header]
+            for line in lines:
+                if len("\n".join(block + [line])) + 8 > limit:
+                    blocks.append("```\n" + "\n".join(block) + "\n```")
+                    block = [header]
+                block.append(line)
+            blocks.append("```\n" + "\n".join(block) + "\n```")
+        return blocks
+
+
+async def whohas_batch(
+    ctx: Any, queries: list[str], shouldReturnAll: bool = False, forceUpdate: bool = False
+) -> BatchAnswer:
+    """whohas for many tickers at once. Every query is a ticker, a pattern, a category or "ship" for every
+    ship part. Each group is revalidated once, and the totals come from the aggregates materialized at refresh."""
+    Log.info(f"whohas batch {queries}")
+    start = time.perf_counter()
+    tickers = list(dict.fromkeys(ticker for query in queries for ticker in InventoryGroups.resolve(query)))
+    groups = {ticker: InventoryGroups.route(ticker) for ticker in tickers}
+    involved = list({group.group_id: group for group in groups.values()}.values())
+    freshness = [await _revalidate(group, forceUpdate) for group in involved]
+    await _revalidate_sellers(forceUpdate)
+    fetched = time.perf_counter()
+    WhohasFetchSeconds.observe(fetched - start)
+
+    holdings: dict[str, dict[str, int]] = {}
+    totals: dict[str, int] = {}
+    top_locations: dict[str, tuple[str, int]] = {}
+    for ticker, group in groups.items():
+        store = group.inventory
+        held = store.user_totals(ticker) if shouldReturnAll else group.seller_totals(ticker, CachedSellersData)
+        for user, amount in held.items():
+            holdings.setdefault(user, {})[ticker] = amount
+        totals[ticker] = store.ticker_total(ticker)
+        top_location = store.top_location(ticker)
+        if top_location is not None:
+            top_locations[ticker] = top_location
+    WhohasFilterSeconds.observe(time.perf_counter() - fetched)
+
+    updates = [group.last_updated for group in involved]
+    return BatchAnswer(
+        tickers=tickers,
+        holdings=holdings,
+        totals=totals,
+        top_locations=top_locations,
+        last_updated=min(updates) if updates and None not in updates else None,  # type: ignore[type-var]
+        freshness=min(freshness, key=_FreshnessSeverity.index, default=Freshness.FRESH),
+    )
+
+
+# (cx, kind) -> (the stores and price table it was computed from, valuation)
+_valuations: dict[tuple[str, str], tuple[tuple[Any, ...], Valuation]] = {}
+
+
+def valuation(cx: Optional[str] = None, kind: Optional[str] = None) -> Valuation:
+    """Every group's stock valued at a CX price, the configured ones by default.
+
+    Stores and price tables are never modified, only replaced, so a valuation is cached until
+    one of them is. Recomputing takes milliseconds, and refreshes do it ahead of the next query.
+    """
+    cx = (cx or InventoryGroups.config.valuation_cx).upper()
+    kind = kind or InventoryGroups.config.valuation_price
+    stores = tuple(group.inventory for group in InventoryGroups.groups if group.is_initialized())
+    source = (CachedPrices.table,) + stores
+    cached = _valuations.get((cx, kind))
+    if cached is not None and len(cached[0]) == len(source) and all(a is b for a, b in zip(cached[0], source)):
+        return cached[1]
+    with ValuationSeconds.labels().time():
+        prices = CachedPrices.table.price_list(cx, kind)
+        # each ticker from the group whohas answers it from
+        result = value_inventories(stores, prices, cx, kind, lambda ticker: InventoryGroups.route(ticker).inventory)
+    _valuations[(cx, kind)] = (source, result)
+    return result
+
+
+async def revalue() -> None:
+    """Recomputes the default valuation off the event loop, so $worth answers from cache"""
+    await asyncio.to_thread(valuation)
+
+
+async def worth(ctx: Any, cx: Optional[str] = None, kind: Optional[str] = None) -> Valuation:
+    """The valuation $worth answers from, fetching the prices first if there are none yet"""
+    if CachedPrices.last_updated is None:
+        try:
+            await CachedPrices.refresh(get_http_client())
+        except Exception as e:
+            Log.error(f"Unable to fetch CX prices: {e}")
+    return valuation(cx, kind)
+
+
+async def cx_exchanges() -> list[str]:
+    """The CX codes $worth can value stock at"""
+    return CachedPrices.table.exchanges()
+
+
+def load_snapshots() -> None:
+    """Warm start: serve the data saved before the last restart until the first refresh lands"""
+    for group in InventoryGroups.groups:
+        group.load_snapshot()
+    CachedSellersData.load_snapshot()
+    CachedPrices.load_snapshot()
+
+
+async def _scheduled_refresh(group: GroupInventory) -> None:
+    if await group.refresh(get_http_client()):
+        InventoryGroups.schedules[group.group_id].record_refresh(group.changed)
+        if group.changed:
+            await revalue()
+
+
+async def _scheduled_price_refresh() -> None:
+    if await CachedPrices.refresh(get_http_client()):
+        await revalue()
+
+
 async def fetch_inventory_data_periodically():
-    p = Periodic(UpdateInterval, updateInventories)
-    await p.start(delay=0)
+    """Starts refreshing every group and the seller sheet in the background, each on its own timer.
+
+    Group timers adapt: they speed up while a group is queried or changing, and back off while it
+    is idle and unchanged (see AdaptiveInterval).
+    """
+    global RefreshSchedule
+    load_snapshots()
+    RefreshSchedule = RefreshScheduler()
+    for group in InventoryGroups.groups:
+        RefreshSchedule.add(
+            group.group_name,
+            lambda group=group: _scheduled_refresh(group),
+            InventoryGroups.refresh_intervals[group.group_id],
+            InventoryGroups.schedules[group.group_id].next,
+        )
+    RefreshSchedule.add(
+        "seller sheet",
+        lambda: CachedSellersData.refresh(get_http_client()),
+        InventoryGroups.config.seller_refresh_interval,
+    )
+    RefreshSchedule.add("cx prices", _scheduled_price_refresh, InventoryGroups.config.price_refresh_interval)
+    RefreshSchedule.start()
@@ -0,0 +1,127 @@
+"""Drop-in replacements for the inventory query functions, answered by the inventory service.
+
+Same signatures and return types as whohas, whohas_query, whohas_batch, worth and cx_exchanges
+in inventory.py, so a bot switches by importing them from here. Nothing is fetched from FIO or
+cached in the calling process.
+"""
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from httpx import AsyncClient, AsyncHTTPTransport
+
+from .inventory import BatchAnswer, Freshness, UserTickerInventory, WhohasResult
+from .inventory_service import ServiceAddress, parse_address
+from .valuation import Valuation
+
+# the service to ask, from the same INVENTORY_SERVICE_ADDRESS it listens on (see
+# inventory_service.ServiceAddress). Unset means the bot answers in-process instead.
+ServiceUrl = os.getenv("INVENTORY_SERVICE_ADDRESS", "")
+
+service_client: Optional[AsyncClient] = None
+
+
+def get_service_client(address: Optional[str] = None) -> AsyncClient:
+    global service_client
+    if service_client is None:
+        kind, where = parse_address(address or ServiceUrl or ServiceAddress)
+        if kind == "unix":
+            assert isinstance(where, str)
+            service_client = AsyncClient(transport=AsyncHTTPTransport(uds=where), base_url="http://inventory")
+        else:
+            host, port = where
+            service_client = AsyncClient(base_url=f"http://{host}:{port}")
+    return service_client
+
+
+async def close_service_client() -> None:
+    global service_client
+    if service_client is not None:
+        await service_client.aclose()
+        service_client = None
+
+
+@asynccontextmanager
+async def inventory_service_client(address: Optional[str] = None) -> AsyncIterator[AsyncClient]:
+    """Keeps one keep-alive connection pool to the service for the lifetime of the bot"""
+    try:
+        yield get_service_client(address)
+    finally:
+        await close_service_client()
+
+
+async def _get(path: str, **params: Any) -> Any:
+    query = {name: value for name, value in params.items() if value not in (None, False)}
+    # whohas may wait for a FIO refresh, which has its own retries
+    response = await get_service_client().get(path, params=query, timeout=60)
+    if response.status_code == 400:
+        raise ValueError(response.json()["error"])
+    if response.status_code != 200:
+        raise Exception(f"Inventory service answered {path} with {response.status_code}")
+    return response.json()
+
+
+def _time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def decode_whohas(encoded: dict[str, Any]) -> WhohasResult:
+    holders = []
+    for holder in encoded["holders"]:
+        userInv = UserTickerInventory(
+            holder["user"],
+            holder["ticker"],
+            [(location, amount) for location, amount in holder["inventory"]],
+            holder["jumps"],
+        )
+        userInv.hasBeenFiltered = holder["filtered"]
+        holders.append(userInv)
+    return WhohasResult(
+        holders, _time(encoded["last_updated"]), encoded["stale"], Freshness(encoded["freshness"])
+    )
+
+
+async def whohas(
+    ctx: Any,
+    ticker: str,
+    shouldReturnAll: bool = False,
+    forceUpdate: bool = False,
+    destination: Optional[str] = None,
+) -> WhohasResult:
+    return decode_whohas(
+        await _get("/whohas", ticker=ticker, all=shouldReturnAll, force=forceUpdate, destination=destination)
+    )
+
+
+async def whohas_query(
+    ctx: Any,
+    query: str,
+    shouldReturnAll: bool = False,
+    forceUpdate: bool = False,
+    destination: Optional[str] = None,
+) -> list[tuple[str, WhohasResult]]:
+    answers = await _get("/query", q=query, all=shouldReturnAll, force=forceUpdate, destination=destination)
+    return [(ticker, decode_whohas(answer)) for ticker, answer in answers]
+
+
+async def whohas_batch(
+    ctx: Any, queries: list[str], shouldReturnAll: bool = False, forceUpdate: bool = False
+) -> BatchAnswer:
+    encoded = await _get("/batch", q=queries, all=shouldReturnAll, force=forceUpdate)
+    return BatchAnswer(
+        tickers=encoded["tickers"],
+        holdings=encoded["holdings"],
+        totals=encoded["totals"],
+        top_locations={ticker: (location, amount) for ticker, (location, amount) in encoded["top_locations"].items()},
+        last_updated=_time(encoded["last_updated"]),
+        freshness=Freshness(encoded["freshness"]),
+    )
+
+
+async def worth(ctx: Any, cx: Optional[str] = None, kind: Optional[str] = None) -> Valuation:
+    return Valuation(**await _get("/worth", cx=cx, price=kind))
+
+
+async def cx_exchanges() -> list[str]:
+    return await _get("/exchanges")
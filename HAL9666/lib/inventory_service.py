@@ -0,0 +1,164 @@
+"""The inventory cache as a local service, so several bots and scripts share one copy and one FIO refresh loop.
+
+python -m HAL9666.lib.inventory_service
+
+refreshes every group like the bot does, and answers whohas, whohas_query, whohas_batch and
+worth as JSON over localhost HTTP or a Unix socket (see ServiceAddress). inventory_client
+has the same functions, talking to this service instead of FIO.
+"""
+import asyncio
+import json
+import logging
+import os
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Optional, Union
+from urllib.parse import parse_qs, urlsplit
+
+from . import inventory
+from .metrics import start_metrics_server
+
+Log = logging.getLogger(__name__)
+
+# where the service listens: http://host:port, or unix:///path/to/socket. Setting it for a bot
+# too makes the bot ask this service instead of keeping its own cache (see inventory_client).
+ServiceAddress = os.getenv("INVENTORY_SERVICE_ADDRESS", "http://127.0.0.1:9467")
+
+
+def parse_address(address: str) -> tuple[str, Union[str, tuple[str, int]]]:
+    """("unix", socket path) or ("tcp", (host, port)) of a service address"""
+    parts = urlsplit(address)
+    if parts.scheme == "unix":
+        return "unix", parts.path
+    if parts.scheme == "http" and parts.hostname and parts.port is not None:
+        return "tcp", (parts.hostname, parts.port)
+    raise ValueError(f"Inventory service address must be http://host:port or unix:///path, got {address}")
+
+
+def _time(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def encode_whohas(answer: inventory.WhohasResult) -> dict[str, Any]:
+    holders, last_updated = answer
+    return {
+        "holders": [
+            {
+                "user": userInv.user,
+                "ticker": userInv.ticker,
+                "inventory": userInv.inventory,
+                "filtered": userInv.hasBeenFiltered,
+                "jumps": userInv.jumps,
+            }
+            for userInv in holders
+        ],
+        "last_updated": _time(last_updated),
+        "stale": answer.stale,
+        "freshness": answer.freshness.value,
+    }
+
+
+def _flag(params: dict[str, list[str]], name: str) -> bool:
+    return params.get(name, [""])[0].lower() in ("1", "true", "yes")
+
+
+async def handle(path: str, params: dict[str, list[str]]) -> Any:
+    """The JSON answer to one request. Raises ValueError for bad requests."""
+    shouldReturnAll, forceUpdate = _flag(params, "all"), _flag(params, "force")
+    destination = params.get("destination", [None])[0]
+    if path == "/whohas":
+        if "ticker" not in params:
+            raise ValueError("whohas needs a ticker")
+        answer = await inventory.whohas(None, params["ticker"][0], shouldReturnAll, forceUpdate, destination)
+        return encode_whohas(answer)
+    if path == "/query":
+        if "q" not in params:
+            raise ValueError("query needs a q")
+        answers = await inventory.whohas_query(None, params["q"][0], shouldReturnAll, forceUpdate, destination)
+        return [[ticker, encode_whohas(answer)] for ticker, answer in answers]
+    if path == "/batch":
+        batch = await inventory.whohas_batch(None, params.get("q", []), shouldReturnAll, forceUpdate)
+        encoded = asdict(batch)
+        encoded["last_updated"] = _time(batch.last_updated)
+        encoded["freshness"] = batch.freshness.value
+        return encoded
+    if path == "/worth":
+        valuation = await inventory.worth(None, params.get("cx", [None])[0], params.get("price", [None])[0])
+        return asdict(valuation)
+    if path == "/exchanges":
+        return await inventory.cx_exchanges()
+    if path == "/health":
+        return {group.group_name: _time(group.last_updated) for group in inventory.InventoryGroups.groups}
+    raise LookupError(path)
+
+
+def _response(status: str, body: bytes, keep_alive: bool) -> bytes:
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    ).encode() + body
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """HTTP/1.1 GETs on a keep-alive connection, one at a time"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            headers = {}
+            while (line := await reader.readline()).strip():
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip().lower()
+            keep_alive = headers.get("connection") != "close"
+            method, target = request_line.decode("latin-1").split(" ")[:2]
+            if method != "GET":
+                writer.write(_response("405 Method Not Allowed", b"", keep_alive))
+            else:
+                target_parts = urlsplit(target)
+                try:
+                    answer = await handle(target_parts.path, parse_qs(target_parts.query))
+                    writer.write(_response("200 OK", json.dumps(answer).encode(), keep_alive))
+                except ValueError as e:
+                    writer.write(_response("400 Bad Request", json.dumps({"error": str(e)}).encode(), keep_alive))
+                except LookupError:
+                    writer.write(_response("404 Not Found", b"", keep_alive))
+                except Exception as e:
+                    Log.exception(f"Inventory service request {target} failed")
+                    writer.write(_response("500 Internal Server Error", json.dumps({"error": str(e)}).encode(), keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_inventory_service(address: str = ServiceAddress) -> asyncio.AbstractServer:
+    """Serves the in-process inventory cache at address in the background"""
+    kind, where = parse_address(address)
+    if kind == "unix":
+        assert isinstance(where, str)
+        if os.path.exists(where):
+            # left behind by a previous run
+            os.unlink(where)
+        server = await asyncio.start_unix_server(_serve, where)
+    else:
+        host, port = where
+        server = await asyncio.start_server(_serve, host, port)
+    Log.info(f"Serving the inventory cache on {address}")
+    return server
+
+
+async def main() -> None:
+    async with inventory.inventory_http_client():
+        await start_metrics_server()
+        await inventory.fetch_inventory_data_periodically()
+        server = await start_inventory_service()
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
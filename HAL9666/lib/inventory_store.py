@@ -0,0 +1,200 @@
+from array import array
+from typing import Iterator, Optional
+
+# share of the string table no row uses any more above which a build drops them
+MaxDeadStrings = 0.25
+
+
+class InventoryStore:
+    """Read-only, column oriented group inventory.
+
+    Usernames, tickers and locations are interned into integer ids (indexes into strings).
+    Each (user, ticker) holding is one entry in the holding columns. Its rows, one per
+    location, are the contiguous slice rows[holding_start[h]:holding_start[h + 1]] of the
+    row columns, which also repeat the user of every row. Holdings of a ticker are contiguous
+    as well, largest total first, so a ticker lookup is a dict access plus a walk over a slice
+    of arrays.
+    """
+
+    def __init__(self) -> None:
+        self.strings: list[str] = []
+        self.ids: dict[str, int] = {}
+        self.holding_user = array("i")
+        self.holding_start = array("i", [0])
+        self.holding_total = array("q")
+        self.row_user = array("i")
+        self.row_location = array("i")
+        self.row_amount = array("i")
+        # ticker id -> (first holding, last holding + 1)
+        self.ticker_holdings: dict[int, tuple[int, int]] = {}
+        # ticker id -> (total, [(location id, total)] largest first), see aggregate()
+        self._aggregates: Optional[dict[int, tuple[int, list[tuple[int, int]]]]] = None
+        # ticker -> {user: total}, filled in as user_totals is asked for
+        self._user_totals: dict[str, dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.row_amount)
+
+    def __getstate__(self) -> dict:
+        # ids and the aggregates are derived from the rest, no need to pickle them
+        state = self.__dict__.copy()
+        del state["ids"]
+        del state["_aggregates"]
+        del state["_user_totals"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.ids = {s: i for i, s in enumerate(self.strings)}
+        self._aggregates = None
+        self._user_totals = {}
+
+    def tickers(self) -> list[str]:
+        return [self.strings[t] for t in self.ticker_holdings]
+
+    def user(self, holding: int) -> str:
+        return self.strings[self.holding_user[holding]]
+
+    def locations(self, holding: int) -> list[tuple[str, int]]:
+        strings = self.strings
+        start, end = self.holding_start[holding], self.holding_start[holding + 1]
+        return [
+            (strings[location], amount)
+            for location, amount in zip(self.row_location[start:end], self.row_amount[start:end])
+        ]
+
+    def holdings(self, ticker: str) -> range:
+        """Holding numbers of the ticker, largest total first"""
+        ticker_id = self.ids.get(ticker)
+        start, end = self.ticker_holdings.get(ticker_id, (0, 0)) if ticker_id is not None else (0, 0)
+        return range(start, end)
+
+    def holders(self, ticker: str) -> Iterator[tuple[str, list[tuple[str, int]], int]]:
+        """Yields (user, [(location, amount)], total) for everyone holding the ticker, largest total first"""
+        strings = self.strings
+        for h in self.holdings(ticker):
+            yield strings[self.holding_user[h]], self.locations(h), self.holding_total[h]
+
+    def aggregate(self) -> None:
+        """Materializes per-ticker and per-location totals in one pass over the rows. The store never
+        changes, so this runs once per refresh; ticker_total and location_totals call it on demand."""
+        if self._aggregates is not None:
+            return
+        aggregates: dict[int, tuple[int, list[tuple[int, int]]]] = {}
+        for ticker_id, (first, last) in self.ticker_holdings.items():
+            rows = slice(self.holding_start[first], self.holding_start[last])
+            by_location: dict[int, int] = {}
+            for location, amount in zip(self.row_location[rows], self.row_amount[rows]):
+                by_location[location] = by_location.get(location, 0) + amount
+            locations = sorted(by_location.items(), key=lambda x: x[1], reverse=True)
+            aggregates[ticker_id] = (sum(self.holding_total[first:last]), locations)
+        self._aggregates = aggregates
+
+    def _aggregate_of(self, ticker: str) -> tuple[int, list[tuple[int, int]]]:
+        self.aggregate()
+        assert self._aggregates is not None
+        ticker_id = self.ids.get(ticker)
+        return self._aggregates.get(ticker_id, (0, [])) if ticker_id is not None else (0, [])
+
+    def ticker_total(self, ticker: str) -> int:
+        return self._aggregate_of(ticker)[0]
+
+    def location_totals(self, ticker: str) -> list[tuple[str, int]]:
+        """(location, amount everyone holds there) for the ticker, largest first"""
+        return [(self.strings[location], total) for location, total in self._aggregate_of(ticker)[1]]
+
+    def top_location(self, ticker: str) -> Optional[tuple[str, int]]:
+        """(location, amount) of the location holding the most of the ticker"""
+        locations = self._aggregate_of(ticker)[1]
+        return (self.strings[locations[0][0]], locations[0][1]) if locations else None
+
+    def user_totals(self, ticker: str) -> dict[str, int]:
+        """{user: total} of everyone holding the ticker, callers must not modify it"""
+        cached = self._user_totals.get(ticker)
+        if cached is not None:
+            return cached
+        holdings = self.holdings(ticker)
+        strings = self.strings
+        totals = self._user_totals[ticker] = {
+            strings[user]: total
+            for user, total in zip(
+                self.holding_user[holdings.start : holdings.stop], self.holding_total[holdings.start : holdings.stop]
+            )
+        }
+        return totals
+
+    def to_dict(self) -> dict[str, dict[str, list[tuple[str, int]]]]:
+        """The plain {user: {ticker: [(location, amount)]}} structure, for debugging and tests"""
+        result: dict[str, dict[str, list[tuple[str, int]]]] = {}
+        for ticker in self.tickers():
+            for user, locations, _ in self.holders(ticker):
+                result.setdefault(user, {})[ticker] = locations
+        return result
+
+
+class InventoryStoreBuilder:
+    """Collects rows as they are parsed, and packs them into an InventoryStore.
+
+    Passing the previous store keeps string ids stable between refreshes. Strings only the
+    previous store used (departed users, tickers and locations) are carried over until they
+    make up MaxDeadStrings of the table, then the next build renumbers the live ones.
+    """
+
+    def __init__(self, previous: Optional[InventoryStore] = None) -> None:
+        self._strings: list[str] = list(previous.strings) if previous else []
+        self._ids: dict[str, int] = dict(previous.ids) if previous else {}
+        # ticker id -> user id -> [location id, amount, location id, amount, ...]
+        self._holdings: dict[int, dict[int, list[int]]] = {}
+
+    def _intern(self, value: str) -> int:
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self._strings)
+            self._strings.append(value)
+        return i
+
+    def add(self, user: str, ticker: str, location: str, amount: int) -> None:
+        ticker_id = self._intern(ticker)
+        by_user = self._holdings.get(ticker_id)
+        if by_user is None:
+            by_user = self._holdings[ticker_id] = {}
+        user_id = self._intern(user)
+        rows = by_user.get(user_id)
+        if rows is None:
+            rows = by_user[user_id] = []
+        rows.append(self._intern(location))
+        rows.append(amount)
+
+    def build(self) -> InventoryStore:
+        store = InventoryStore()
+        store.strings = self._strings
+        store.ids = self._ids
+        for ticker_id, by_user in self._holdings.items():
+            first = len(store.holding_user)
+            totals = [(user_id, rows, sum(rows[1::2])) for user_id, rows in by_user.items()]
+            for user_id, rows, total in sorted(totals, key=lambda x: x[2])[::-1]:
+                store.row_user.extend([user_id] * (len(rows) // 2))
+                store.row_location.extend(rows[0::2])
+                store.row_amount.extend(rows[1::2])
+                store.holding_user.append(user_id)
+                store.holding_total.append(total)
+                store.holding_start.append(len(store.row_amount))
+            store.ticker_holdings[ticker_id] = (first, len(store.holding_user))
+        self._holdings = {}
+        live = set(store.ticker_holdings).union(store.holding_user, store.row_location)
+        if len(store.strings) - len(live) > MaxDeadStrings * len(store.strings):
+            _compact(store, sorted(live))
+        return store
+
+
+def _compact(store: InventoryStore, live: list[int]) -> None:
+    """Renumbers the live string ids of a freshly built store, in their old order, dropping the rest"""
+    renumber = [0] * len(store.strings)
+    for new_id, old_id in enumerate(live):
+        renumber[old_id] = new_id
+    store.strings = [store.strings[i] for i in live]
+    store.ids = {string: i for i, string in enumerate(store.strings)}
+    store.holding_user = array("i", map(renumber.__getitem__, store.holding_user))
+    store.row_user = array("i", map(renumber.__getitem__, store.row_user))
+    store.row_location = array("i", map(renumber.__getitem__, store.row_location))
+    store.ticker_holdings = {renumber[ticker_id]: holdings for ticker_id, holdings in store.ticker_holdings.items()}
@@ -0,0 +1,162 @@
+"""All-pairs jump distances between star systems, built offline from FIO dumps.
+
+python -m HAL9666.lib.jumps systemstars.json --planets allplanets.json --stations station.json
+
+builds the table from the JSON of FIO's /systemstars, /planet/allplanets and /exchange/station
+and saves it to JumpTablePath, where whohas loads it from.
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+from array import array
+from collections import deque
+from typing import Any, Iterable, Optional
+
+Log = logging.getLogger(__name__)
+
+JumpTablePath = os.getenv(
+    "INVENTORY_JUMP_TABLE", os.path.join(os.path.dirname(os.path.dirname(__file__)), "jump_table.pickle")
+)
+# matrix entry of systems with no route between them
+Unreachable = 0xFFFF
+
+
+class JumpTable:
+    """Jump counts between every pair of systems, as one flat n * n array.
+
+    Systems, planets and stations are all looked up by natural id or name, case insensitively, so
+    a location from an inventory row and a destination typed in Discord cost a dict access each,
+    and their distance one array index.
+    """
+
+    def __init__(self, systems: list[str], names: dict[str, int], matrix: array) -> None:
+        self.systems = systems
+        # casefolded name of a system, planet or station -> system index
+        self.names = names
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        return len(self.systems)
+
+    def system_of(self, location: str) -> Optional[int]:
+        return self.names.get(location.casefold())
+
+    def distances_to(self, destination: str) -> Optional[memoryview]:
+        """The matrix row of the destination's system, indexed by system, or None if it is unknown"""
+        system = self.system_of(destination)
+        if system is None:
+            return None
+        n = len(self.systems)
+        return memoryview(self.matrix)[system * n : (system + 1) * n]
+
+    def jumps(self, location: str, row: memoryview) -> Optional[int]:
+        """Jumps from location to the destination of row (see distances_to), None if unknown or unreachable"""
+        system = self.names.get(location.casefold())
+        if system is None:
+            return None
+        jumps = row[system]
+        return jumps if jumps != Unreachable else None
+
+
+def _system_key(entry: dict[str, Any], by_id: dict[str, int], by_natural_id: dict[str, int]) -> Optional[int]:
+    if entry.get("SystemId") in by_id:
+        return by_id[entry["SystemId"]]
+    natural_id = entry.get("SystemNaturalId") or ""
+    if not natural_id and entry.get("PlanetNaturalId"):
+        # planets are named after their system plus a letter, UV-351a is in UV-351
+        natural_id = entry["PlanetNaturalId"][:-1]
+    return by_natural_id.get(natural_id.casefold())
+
+
+def build_jump_table(
+    systems: list[dict[str, Any]], planets: Iterable[dict[str, Any]] = (), stations: Iterable[dict[str, Any]] = ()
+) -> JumpTable:
+    """One breadth first search per system over the jump connections of /systemstars"""
+    natural_ids = [system["NaturalId"] for system in systems]
+    by_id = {system["SystemId"]: i for i, system in enumerate(systems)}
+    by_natural_id = {natural_id.casefold(): i for i, natural_id in enumerate(natural_ids)}
+    neighbours = [
+        [by_id[c["ConnectingId"]] for c in system.get("Connections", []) if c.get("ConnectingId") in by_id]
+        for system in systems
+    ]
+
+    names: dict[str, int] = {}
+    for i, system in enumerate(systems):
+        names[system["NaturalId"].casefold()] = i
+        if system.get("Name"):
+            names.setdefault(system["Name"].casefold(), i)
+    for planet in planets:
+        system = _system_key(planet, by_id, by_natural_id)
+        if system is None:
+            continue
+        for key in ("PlanetNaturalId", "PlanetName"):
+            if planet.get(key):
+                names.setdefault(planet[key].casefold(), system)
+    for station in stations:
+        system = _system_key(station, by_id, by_natural_id)
+        if system is None:
+            continue
+        for key in ("NaturalId", "Name", "ComexCode"):
+            if station.get(key):
+                names.setdefault(station[key].casefold(), system)
+
+    n = len(systems)
+    matrix = array("H", [Unreachable]) * (n * n)
+    for source in range(n):
+        row = source * n
+        matrix[row + source] = 0
+        queue = deque([source])
+        while queue:
+            system = queue.popleft()
+            jumps = matrix[row + system] + 1
+            for neighbour in neighbours[system]:
+                if matrix[row + neighbour] == Unreachable:
+                    matrix[row + neighbour] = jumps
+                    queue.append(neighbour)
+    return JumpTable(natural_ids, names, matrix)
+
+
+def save_jump_table(table: JumpTable, path: str = JumpTablePath) -> None:
+    with open(path, "wb") as f:
+        pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_jump_table(path: str = JumpTablePath) -> Optional[JumpTable]:
+    """The table saved by save_jump_table, or None if it hasn't been built"""
+    try:
+        with open(path, "rb") as f:
+            table = pickle.load(f)
+    except FileNotFoundError:
+        Log.info(f"No jump table at {path}, whohas can't rank by distance")
+        return None
+    except Exception as e:
+        Log.warning(f"Ignoring unreadable jump table {path}: {e}")
+        return None
+    Log.info(f"Loaded jump table of {len(table)} systems from {path}")
+    return table
+
+
+def _load_json(path: Optional[str]) -> list[dict[str, Any]]:
+    if not path:
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the jump distance table whohas ranks locations with")
+    parser.add_argument("systems", help="JSON of FIO's /systemstars")
+    parser.add_argument("--planets", help="JSON of FIO's /planet/allplanets")
+    parser.add_argument("--stations", help="JSON of FIO's /exchange/station")
+    parser.add_argument("--output", default=JumpTablePath, help=f"default {JumpTablePath}")
+    args = parser.parse_args()
+
+    table = build_jump_table(_load_json(args.systems), _load_json(args.planets), _load_json(args.stations))
+    save_jump_table(table, args.output)
+    print(f"Saved {len(table)} systems and {len(table.names)} names to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
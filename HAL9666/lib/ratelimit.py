@@ -0,0 +1,86 @@
+import asyncio
+import math
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# longest Retry-After honoured, whatever upstream asks for
+MaxRetryAfter = 300.0
+
+
+class RateLimiter:
+    """Token bucket shared by everything that calls the same upstream.
+
+    Callers reserve a token and sleep until their slot, so waiting callers are served in order
+    without a lock. The rate adapts AIMD style: it is halved when upstream throttles us and
+    creeps back up with every successful request, so it settles just below what upstream allows.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float = 0.1, max_rate: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self._tokens = capacity
+        # tokens accrue from here on, which is in the future while upstream asked us to hold back
+        self._last_refill = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self._last_refill:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1
+        # queued behind any pause, then behind everyone who reserved before at the current rate
+        wait = self._last_refill - now
+        return wait - self._tokens / self.rate if self._tokens < 0 else wait
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """Upstream answered 429. Slows everyone down, and holds everyone back for Retry-After."""
+        self.rate = max(self.min_rate, self.rate / 2)
+        if not retry_after:
+            return
+        now = time.monotonic()
+        resume = now + retry_after
+        if resume <= self._last_refill:
+            return
+        self._refill(now)
+        # one request when the pause ends, the rest spaced out after it instead of all at once
+        self._tokens = min(self._tokens, 1.0)
+        self._last_refill = resume
+
+    def succeeded(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.min_rate)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay seconds or an HTTP date. Capped at MaxRetryAfter."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    if not math.isfinite(seconds):
+        return None
+    return min(MaxRetryAfter, max(0.0, seconds))
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter, never shorter than what upstream asked for"""
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,117 @@
+import json
+import os
+from dataclasses import dataclass, field
+
+from .valuation import PriceFields
+
+# JSON config with the FIO groups whohas can answer from, see HAL9666/inventory_groups.json
+InventoryConfigPath = os.getenv(
+    "INVENTORY_GROUPS_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "inventory_groups.json"),
+)
+# whohas never answers from data older than this without trying FIO first
+DefaultHardTTL = 3600
+
+
+@dataclass
+class GroupConfig:
+    group_id: str
+    group_name: str
+    api_key: str
+    # tickers routed to this group, from the "tickers" and "categories" entries
+    tickers: tuple[str, ...] = ()
+    refresh_interval: float = 300
+    # the adaptive interval stays within these bounds, and every delay is jittered by +-refresh_jitter
+    min_refresh_interval: float = 75
+    max_refresh_interval: float = 1800
+    refresh_jitter: float = 0.1
+    # data older than soft_ttl is served while it is refreshed in the background,
+    # data older than hard_ttl is refreshed before answering
+    soft_ttl: float = 600
+    hard_ttl: float = DefaultHardTTL
+    # answers every ticker no other group claims
+    default: bool = False
+
+
+@dataclass
+class InventoryConfig:
+    groups: list[GroupConfig]
+    categories: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    seller_refresh_interval: float = 300
+    price_refresh_interval: float = 900
+    # what $worth values stock at unless asked otherwise
+    valuation_cx: str = "AI1"
+    valuation_price: str = "average"
+
+
+def parse_inventory_config(raw: dict) -> InventoryConfig:
+    # looked up case insensitively, like tickers
+    categories = {
+        name.lower(): tuple(t.upper() for t in tickers) for name, tickers in raw.get("categories", {}).items()
+    }
+    groups = []
+    claimed: dict[str, str] = {}
+    for entry in raw.get("groups", []):
+        try:
+            group_id = str(entry["id"])
+            name = entry.get("name", group_id)
+        except KeyError:
+            raise ValueError(f"Inventory group config without an id: {entry}")
+        tickers = [t.upper() for t in entry.get("tickers", [])]
+        for category in entry.get("categories", []):
+            if category.lower() not in categories:
+                raise ValueError(f"Inventory group {name} uses unknown category {category}")
+            tickers.extend(categories[category.lower()])
+        for ticker in tickers:
+            if ticker in claimed and claimed[ticker] != group_id:
+                raise ValueError(f"Ticker {ticker} is routed to both group {claimed[ticker]} and {group_id}")
+            claimed[ticker] = group_id
+        refresh_interval = float(entry.get("refresh_interval", 300))
+        min_refresh_interval = float(entry.get("min_refresh_interval", refresh_interval / 4))
+        max_refresh_interval = float(entry.get("max_refresh_interval", refresh_interval * 6))
+        if not min_refresh_interval <= refresh_interval <= max_refresh_interval:
+            raise ValueError(
+                f"Inventory group {name} needs min_refresh_interval <= refresh_interval <= max_refresh_interval"
+            )
+        # by default, only revalidate when the scheduled refresh has missed a tick
+        soft_ttl = float(entry.get("soft_ttl", 2 * refresh_interval))
+        # an idle group may go max_refresh_interval without a refresh, which shouldn't block whohas
+        hard_ttl = float(entry.get("hard_ttl", max(DefaultHardTTL, soft_ttl, max_refresh_interval)))
+        if hard_ttl < soft_ttl:
+            raise ValueError(f"Inventory group {name} has a hard_ttl shorter than its soft_ttl")
+        api_key = entry["api_key"] if "api_key" in entry else os.getenv(entry.get("api_key_env", "FIO_API_KEY"), "")
+        groups.append(
+            GroupConfig(
+                group_id=group_id,
+                group_name=name,
+                api_key=api_key,
+                tickers=tuple(dict.fromkeys(tickers)),
+                refresh_interval=refresh_interval,
+                min_refresh_interval=min_refresh_interval,
+                max_refresh_interval=max_refresh_interval,
+                refresh_jitter=float(entry.get("refresh_jitter", 0.1)),
+                soft_ttl=soft_ttl,
+                hard_ttl=hard_ttl,
+                default=bool(entry.get("default", False)),
+            )
+        )
+
+    defaults = [g for g in groups if g.default]
+    if len(defaults) != 1:
+        raise ValueError(f"Exactly one inventory group must be the default, got {len(defaults)}")
+    valuation_price = raw.get("valuation_price", "average")
+    if valuation_price not in PriceFields:
+        raise ValueError(f"valuation_price must be one of {', '.join(PriceFields)}, got {valuation_price}")
+    return InventoryConfig(
+        groups=groups,
+        categories=categories,
+        seller_refresh_interval=float(raw.get("seller_refresh_interval", 300)),
+        price_refresh_interval=float(raw.get("price_refresh_interval", 900)),
+        valuation_cx=raw.get("valuation_cx", "AI1").upper(),
+        valuation_price=valuation_price,
+    )
+
+
+def load_inventory_config(path: str = InventoryConfigPath) -> InventoryConfig:
+    with open(path) as f:
+        return parse_inventory_config(json.load(f))
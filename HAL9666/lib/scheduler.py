@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+Log = logging.getLogger(__name__)
+
+# seconds between the first refreshes of consecutive jobs at startup
+StartupStagger = 1.0
+
+
+class AdaptiveInterval:
+    """Delay between refreshes of one group, adapted to how much it is used and how often it changes.
+
+    After every refresh the interval is halved if the refresh brought changes, and grown by half if
+    it didn't; the same goes for whether anyone queried the group since the previous refresh. So a
+    busy, changing group converges to min_interval, and an idle, unchanged one to max_interval.
+    Every delay is jittered by +-jitter, so groups that adapt the same way drift apart.
+    """
+
+    def __init__(
+        self, interval: float, min_interval: float, max_interval: float, jitter: float = 0.1, busy_queries: int = 1
+    ) -> None:
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.busy_queries = busy_queries
+        self.queries = 0
+
+    def record_query(self) -> None:
+        self.queries += 1
+
+    def record_refresh(self, changed: bool) -> None:
+        factor = 0.5 if changed else 1.5
+        factor *= 0.5 if self.queries >= self.busy_queries else 1.5
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval * factor))
+        self.queries = 0
+
+    def next(self) -> float:
+        delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(self.max_interval, max(self.min_interval, delay))
+
+
+@dataclass
+class RefreshJob:
+    name: str
+    refresh: Callable[[], Awaitable[object]]
+    interval: float
+    # the delay before each refresh after the first, the fixed interval if None
+    next_interval: Optional[Callable[[], float]] = None
+
+
+class RefreshScheduler:
+    """Runs every job on its own timer, in parallel.
+
+    Jobs start StartupStagger seconds apart, and from then on their ticks are spread evenly
+    over their interval, so dozens of groups with the same interval don't hit FIO in one burst.
+    """
+
+    def __init__(self, sleep: Callable[[float], Awaitable[object]] = asyncio.sleep) -> None:
+        self.jobs: list[RefreshJob] = []
+        self._tasks: list[asyncio.Task[None]] = []
+        self._sleep = sleep
+
+    def add(
+        self,
+        name: str,
+        refresh: Callable[[], Awaitable[object]],
+        interval: float,
+        next_interval: Optional[Callable[[], float]] = None,
+    ) -> None:
+        self.jobs.append(RefreshJob(name, refresh, interval, next_interval))
+
+    def start(self) -> None:
+        count = len(self.jobs)
+        for i, job in enumerate(self.jobs):
+            startup_delay = i * StartupStagger
+            phase = job.interval * i / count
+            self._tasks.append(asyncio.create_task(self._run(job, startup_delay, phase)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, job: RefreshJob, startup_delay: float, phase: float) -> None:
+        await self._sleep(startup_delay)
+        await self._refresh(job)
+        # shift to this job's slot in the interval
+        await self._sleep(job.interval + max(0.0, phase - startup_delay))
+        while True:
+            await self._refresh(job)
+            await self._sleep(job.next_interval() if job.next_interval is not None else job.interval)
+
+    @staticmethod
+    async def _refresh(job: RefreshJob) -> None:
+        try:
+            await job.refresh()
+        except Exception:
+            Log.exception(f"Scheduled refresh of {job.name} failed")
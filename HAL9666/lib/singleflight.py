@@ -0,0 +1,35 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+
+class SingleFlight:
+    """Coalesces concurrent runs of the same refresh into one in-flight call.
+
+    Callers arriving while a refresh runs await that refresh instead of starting their own,
+    and get its result or exception. Calls within min_interval seconds of the last successful
+    refresh return right away without running anything.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Optional[asyncio.Task[None]] = None
+        self._last_success: Optional[float] = None
+
+    def in_flight(self) -> bool:
+        return self._in_flight is not None
+
+    async def run(self, refresh: Callable[[], Awaitable[None]], min_interval: float = 0) -> bool:
+        """Returns False if the refresh was skipped because the last one is recent enough"""
+        if self._in_flight is None:
+            if self._last_success is not None and time.monotonic() - self._last_success < min_interval:
+                return False
+            self._in_flight = asyncio.ensure_future(refresh())
+            self._in_flight.add_done_callback(self._finished)
+        # shielded, so a caller that gets cancelled doesn't cancel the refresh for everyone else
+        await asyncio.shield(self._in_flight)
+        return True
+
+    def _finished(self, task: "asyncio.Task[None]") -> None:
+        self._in_flight = None
+        if not task.cancelled() and task.exception() is None:
+            self._last_success = time.monotonic()
@@ -0,0 +1,59 @@
+import gc
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Optional
+
+Log = logging.getLogger(__name__)
+
+# set INVENTORY_SNAPSHOT_DIR to an empty string to disable snapshots
+SnapshotDir = os.getenv(
+    "INVENTORY_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "snapshots")
+)
+# bump whenever the pickled payload changes shape, older snapshots are then ignored
+SnapshotVersion = 3
+
+
+def save_snapshot(name: str, payload: dict[str, Any]) -> None:
+    """Pickles payload to <SnapshotDir>/<name>.pickle. The file is replaced atomically, so a crash
+    mid-write leaves the previous snapshot intact. Failures are logged, never raised."""
+    if not SnapshotDir:
+        return
+    try:
+        os.makedirs(SnapshotDir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SnapshotDir, prefix=f".{name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"version": SnapshotVersion, **payload}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, os.path.join(SnapshotDir, f"{name}.pickle"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        Log.warning(f"Unable to save snapshot {name}: {e}")
+
+
+def load_snapshot(name: str) -> Optional[dict[str, Any]]:
+    """Returns the payload saved under name, or None if there is no usable snapshot"""
+    if not SnapshotDir:
+        return None
+    path = os.path.join(SnapshotDir, f"{name}.pickle")
+    # unpickling allocates lots of small containers, which keeps triggering the cyclic GC for nothing
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        Log.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if not isinstance(payload, dict) or payload.get("version") != SnapshotVersion:
+        Log.info(f"Ignoring snapshot {path} from an older version")
+        return None
+    return payload
@@ -0,0 +1,59 @@
+import re
+from bisect import bisect_left
+from fnmatch import translate
+from typing import Iterable
+
+WildcardChars = "*?["
+
+
+def is_pattern(query: str) -> bool:
+    return any(c in query for c in WildcardChars)
+
+
+class TickerIndex:
+    """Sorted index of tickers, answering prefix and wildcard queries with bisect.
+
+    Tickers are kept sorted both as is and reversed, so the literal head of a pattern ("CQ*") or
+    its literal tail ("*FE") narrows the candidates to one contiguous range. Only patterns with
+    wildcards on both ends look at every ticker.
+    """
+
+    def __init__(self, tickers: Iterable[str]) -> None:
+        self.tickers = sorted(set(tickers))
+        self._reversed = sorted(ticker[::-1] for ticker in self.tickers)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        i = bisect_left(self.tickers, ticker)
+        return i < len(self.tickers) and self.tickers[i] == ticker
+
+    @staticmethod
+    def _range(keys: list[str], prefix: str) -> list[str]:
+        # every key starting with prefix sorts between prefix and prefix + the highest code point
+        return keys[bisect_left(keys, prefix) : bisect_left(keys, prefix + "\U0010ffff")]
+
+    def prefix(self, prefix: str) -> list[str]:
+        return self._range(self.tickers, prefix)
+
+    def suffix(self, suffix: str) -> list[str]:
+        return sorted(ticker[::-1] for ticker in self._range(self._reversed, suffix[::-1]))
+
+    def match(self, pattern: str) -> list[str]:
+        """Tickers matching a shell style pattern (*, ? and [...]), sorted"""
+        if not is_pattern(pattern):
+            return [pattern] if pattern in self else []
+        first = min(pattern.find(c) for c in WildcardChars if c in pattern)
+        last = max([pattern.rfind(c) for c in WildcardChars] + [pattern.rfind("]")])
+        head, tail = pattern[:first], pattern[last + 1 :]
+        if pattern == head + "*":
+            return self.prefix(head)
+        if head:
+            candidates = self.prefix(head)
+        elif tail:
+            candidates = self.suffix(tail)
+        else:
+            candidates = self.tickers
+        regex = re.compile(translate(pattern))
+        return [ticker for ticker in candidates if regex.match(ticker)]
@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+from .inventory_store import InventoryStore
+
+# price kind -> field of an /exchange/all entry
+PriceFields = {"bid": "Bid", "ask": "Ask", "average": "PriceAverage"}
+
+
+class PriceTable:
+    """CX prices from FIO's /exchange/all, as {(cx, kind): {ticker: price}} for every kind in PriceFields.
+
+    A new table is built on every refresh and never changed afterwards, so valuations can cache on it.
+    """
+
+    def __init__(self, offers: Iterable[dict[str, Any]] = (), last_updated: Optional[datetime] = None) -> None:
+        self.last_updated = last_updated
+        self.prices: dict[tuple[str, str], dict[str, float]] = {}
+        for offer in offers:
+            ticker, cx = offer.get("MaterialTicker"), offer.get("ExchangeCode")
+            if not ticker or not cx:
+                continue
+            for kind, name in PriceFields.items():
+                price = offer.get(name)
+                # FIO reports missing bids and asks as null or 0
+                if price:
+                    self.prices.setdefault((cx, kind), {})[ticker] = float(price)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def exchanges(self) -> list[str]:
+        return sorted({cx for cx, _ in self.prices})
+
+    def price_list(self, cx: str, kind: str) -> dict[str, float]:
+        return self.prices.get((cx, kind), {})
+
+
+@dataclass
+class Valuation:
+    """Stock of one or more group inventories, valued at one CX price"""
+
+    cx: str
+    kind: str
+    by_user: dict[str, float] = field(default_factory=dict)
+    by_location: dict[str, float] = field(default_factory=dict)
+    by_ticker: dict[str, float] = field(default_factory=dict)
+    # held tickers without a price on this CX, valued at 0
+    unpriced: list[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> float:
+        return sum(self.by_ticker.values())
+
+    def lookup(self, name: str) -> Optional[tuple[str, str, float]]:
+        """(kind of subject, its name, value) of the user, ticker or location called name, case insensitively"""
+        folded = name.casefold()
+        for subject, values in (("user", self.by_user), ("ticker", self.by_ticker), ("location", self.by_location)):
+            for key, value in values.items():
+                if key.casefold() == folded:
+                    return subject, key, value
+        return None
+
+    @staticmethod
+    def top(values: dict[str, float], count: int) -> list[tuple[str, float]]:
+        return sorted(values.items(), key=lambda x: x[1], reverse=True)[:count]
+
+
+def value_inventories(
+    stores: Iterable[InventoryStore],
+    prices: dict[str, float],
+    cx: str,
+    kind: str,
+    owner: Optional[Callable[[str], InventoryStore]] = None,
+) -> Valuation:
+    """Joins every store with the ticker -> price list.
+
+    Members of several groups are in every group's CSV, so with owner, the store that answers
+    for a ticker, each ticker is only counted from that store. Prices are looked up once per
+    ticker, not per row. Ticker and location values come from the totals the stores materialize
+    at refresh, and user values from one pass over the holding totals of each priced ticker.
+    """
+    valuation = Valuation(cx, kind)
+    by_user, by_location, by_ticker = valuation.by_user, valuation.by_location, valuation.by_ticker
+    unpriced = set()
+    for store in stores:
+        store.aggregate()
+        strings = store.strings
+        user_values: dict[int, float] = {}
+        for ticker_id, (first, last) in store.ticker_holdings.items():
+            ticker = strings[ticker_id]
+            if owner is not None and owner(ticker) is not store:
+                continue
+            price = prices.get(ticker)
+            if price is None:
+                unpriced.add(ticker)
+                continue
+            by_ticker[ticker] = by_ticker.get(ticker, 0.0) + store.ticker_total(ticker) * price
+            for location, amount in store.location_totals(ticker):
+                by_location[location] = by_location.get(location, 0.0) + amount * price
+            for user, total in zip(store.holding_user[first:last], store.holding_total[first:last]):
+                user_values[user] = user_values.get(user, 0.0) + total * price
+        for user, value in user_values.items():
+            by_user[strings[user]] = by_user.get(strings[user], 0.0) + value
+    valuation.unpriced = sorted(unpriced)
+    return valuation
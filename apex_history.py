@@ -0,0 +1,161 @@
+import argparse
+import csv
+import os.path
+import sqlite3
+import sys
+import time
+
+HISTORY_DB_PATH = os.path.join(os.path.dirname(__file__), "baseinv.sqlite")
+CSV_FIELDS = ["Username", "NaturalId", "Name", "StorageType", "Ticker", "Amount"]
+
+#Stock is stored as run-length intervals: a row covers every scrape between firstSeen and lastSeen
+#in which the amount did not change. Only the newest interval of each (base, ticker) is open.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bases (
+    baseId TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    timestamp REAL PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS stock (
+    baseId TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    firstSeen REAL NOT NULL,
+    lastSeen REAL NOT NULL,
+    open INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS stock_base_ticker_time ON stock (baseId, ticker, firstSeen);
+CREATE INDEX IF NOT EXISTS stock_open ON stock (baseId, ticker) WHERE open = 1;
+"""
+
+
+class InventoryHistory:
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def record(self, baseInventories, timestamp=None):
+        """Appends one scrape (apex_scraper baseinv.json format) to the history"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO runs (timestamp) VALUES (?)", (timestamp,))
+            for baseId, base in baseInventories.items():
+                self.db.execute(
+                    "INSERT INTO bases (baseId, name) VALUES (?, ?) ON CONFLICT (baseId) DO UPDATE SET name = excluded.name",
+                    (baseId, base["name"]))
+                openIntervals = dict(self.db.execute(
+                    "SELECT ticker, amount FROM stock WHERE baseId = ? AND open = 1", (baseId,)))
+                tickers = dict(base["tickers"])
+                #tickers that vanished from the inventory have been used up
+                for ticker, amount in openIntervals.items():
+                    if ticker not in tickers and amount != 0:
+                        tickers[ticker] = 0
+
+                unchanged = []
+                changed = []
+                for ticker, amount in tickers.items():
+                    if openIntervals.get(ticker) == amount:
+                        unchanged.append((timestamp, baseId, ticker))
+                    else:
+                        changed.append((baseId, ticker, amount, timestamp, timestamp))
+                self.db.executemany(
+                    "UPDATE stock SET lastSeen = ? WHERE baseId = ? AND ticker = ? AND open = 1", unchanged)
+                self.db.executemany(
+                    "UPDATE stock SET open = 0 WHERE baseId = ? AND ticker = ? AND open = 1",
+                    [(c[0], c[1]) for c in changed])
+                self.db.executemany(
+                    "INSERT INTO stock (baseId, ticker, amount, firstSeen, lastSeen) VALUES (?, ?, ?, ?, ?)", changed)
+            #bases missing from the scrape were demolished or renamed, their last stock is no longer current
+            goneBases = [
+                (baseId,) for (baseId,) in self.db.execute("SELECT DISTINCT baseId FROM stock WHERE open = 1")
+                if baseId not in baseInventories]
+            self.db.executemany("UPDATE stock SET open = 0 WHERE baseId = ? AND open = 1", goneBases)
+
+    def resolveBase(self, base):
+        """Accepts either a base ID or a base name"""
+        row = self.db.execute(
+            "SELECT baseId FROM bases WHERE baseId = ? OR name = ? COLLATE NOCASE", (base, base)).fetchone()
+        return row[0] if row else base
+
+    def history(self, base, ticker, since=0.0, until=None):
+        """Returns [(firstSeen, lastSeen, amount)] intervals overlapping the time range, oldest first"""
+        until = time.time() if until is None else until
+        baseId = self.resolveBase(base)
+        return self.db.execute(
+            "SELECT firstSeen, lastSeen, amount FROM stock WHERE baseId = ? AND ticker = ? AND firstSeen <= ? "
+            "AND firstSeen >= COALESCE((SELECT MAX(firstSeen) FROM stock WHERE baseId = ? AND ticker = ? AND firstSeen <= ?), 0) "
+            "ORDER BY firstSeen",
+            (baseId, ticker, until, baseId, ticker, since)).fetchall()
+
+    def consumptionRate(self, base, ticker, since, until=None):
+        """Average units consumed per day between since and until. Restocks are not counted as negative consumption."""
+        until = time.time() if until is None else until
+        intervals = self.history(base, ticker, since, until)
+        if len(intervals) < 2:
+            return 0.0
+        consumed = 0
+        for prev, cur in zip(intervals, intervals[1:]):
+            if cur[2] < prev[2]:
+                consumed += prev[2] - cur[2]
+        elapsed = min(until, intervals[-1][1]) - max(since, intervals[0][0])
+        if elapsed <= 0:
+            return 0.0
+        return consumed / (elapsed / 86400)
+
+    def exportCSV(self, csvFile, username):
+        """Writes the newest stock of every base in the same FIO compatible format as apex_scraper"""
+        writer = csv.DictWriter(csvFile, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        rows = self.db.execute(
+            "SELECT bases.name, stock.baseId, stock.ticker, stock.amount FROM stock JOIN bases USING (baseId) "
+            "WHERE stock.open = 1 AND stock.amount > 0 ORDER BY stock.baseId, stock.ticker")
+        for name, baseId, ticker, amount in rows:
+            writer.writerow({"Username": username, "NaturalId": name, "Name": baseId, "StorageType": "STORE", "Ticker": ticker, "Amount": str(amount)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query base inventory history recorded by apex_scraper")
+    parser.add_argument("--db", default=HISTORY_DB_PATH, help="history database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rateParser = commands.add_parser("rate", help="consumption rate per day")
+    rateParser.add_argument("base", help="base ID or name")
+    rateParser.add_argument("ticker")
+    rateParser.add_argument("--days", type=float, default=7)
+    historyParser = commands.add_parser("history", help="stock changes over time")
+    historyParser.add_argument("base", help="base ID or name")
+    historyParser.add_argument("ticker")
+    historyParser.add_argument("--days", type=float, default=7)
+    exportParser = commands.add_parser("export", help="newest stock as FIO compatible CSV")
+    exportParser.add_argument("username", help="APEX username written to the CSV")
+    exportParser.add_argument("output", nargs="?", help="output file, stdout if omitted")
+    args = parser.parse_args()
+
+    history = InventoryHistory(args.db)
+    try:
+        if args.command == "rate":
+            since = time.time() - args.days * 86400
+            rate = history.consumptionRate(args.base, args.ticker.upper(), since)
+            print("{ticker} at {base}: {rate:.1f}/day over the last {days} days".format(ticker=args.ticker.upper(), base=args.base, rate=rate, days=args.days))
+        elif args.command == "history":
+            since = time.time() - args.days * 86400
+            for firstSeen, lastSeen, amount in history.history(args.base, args.ticker.upper(), since):
+                print("{start} - {end}: {amount}".format(
+                    start=time.strftime("%Y-%m-%d %H:%M", time.localtime(firstSeen)),
+                    end=time.strftime("%Y-%m-%d %H:%M", time.localtime(lastSeen)),
+                    amount=amount))
+        elif args.output:
+            with open(args.output, "w", newline='') as csvFile:
+                history.exportCSV(csvFile, args.username)
+            print("Saved to", os.path.abspath(args.output))
+        else:
+            history.exportCSV(sys.stdout, args.username)
+    finally:
+        history.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
+import argparse
 import csv
 import json
 import os.path
 import time
+import traceback
 
 import selenium
 from selenium import webdriver
@@ -9,26 +11,83 @@ from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome import service
+from selenium.webdriver.support.ui import WebDriverWait
+
+from apex_history import HISTORY_DB_PATH, InventoryHistory
 
 chrome_driver_path = "path to chrome webdriver executable"
 APEX_URL="https://apex.prosperousuniverse.com/#/"
 APEX_LOGIN="your email"
 APEX_USERNAME="your apex username"
 APEX_PASSWORD="your apex password"
+IMPLICIT_WAIT = 10
+#Chrome keeps the APEX session (cookies, local storage) here between runs
+CHROME_PROFILE_DIR = os.path.join(os.path.dirname(__file__), "apex_profile")
+#fallback session cache, used when running without a persistent profile
+COOKIE_CACHE_PATH = os.path.join(os.path.dirname(__file__), "apex_cookies.json")
 
 class ApexUtils:
-    def __init__(self, driver):
+    def __init__(self, driver, cookieCachePath=None):
         self.driver = driver
-        self.__login()
+        self.cookieCachePath = cookieCachePath
+        self.driver.get(APEX_URL)
+        self.ensureSession()
+
+    def ensureSession(self):
+        if self.isLoggedIn():
+            print("Reusing existing APEX session")
+        elif self.__restoreCookies() and self.isLoggedIn():
+            print("Reusing APEX session from the cookie cache")
+        else:
+            self.__login()
+            self.__saveCookies()
 
     def __login(self):
-        self.driver.get(APEX_URL)
+        print("Logging in...")
         loginElement = self.driver.find_element(By.NAME, "login")
         loginElement.send_keys(APEX_LOGIN)
         passwordElement = self.driver.find_element(By.NAME, "password")
         passwordElement.send_keys(APEX_PASSWORD)
         self.driver.find_element(By.XPATH, "//button[@type='submit']").click()
-        
+        self.driver.find_element(By.ID, "TOUR_TARGET_BUTTON_BUFFER_NEW")
+
+    def isLoggedIn(self, timeout=IMPLICIT_WAIT):
+        #wait for whichever shows up first - the login form or the APEX UI.
+        #implicit wait is disabled meanwhile, otherwise every empty find_elements blocks for the full wait
+        self.driver.implicitly_wait(0)
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda d: d.find_elements(By.NAME, "login") or d.find_elements(By.ID, "TOUR_TARGET_BUTTON_BUFFER_NEW"))
+            return len(self.driver.find_elements(By.ID, "TOUR_TARGET_BUTTON_BUFFER_NEW")) > 0
+        except selenium.common.exceptions.TimeoutException:
+            return False
+        finally:
+            self.driver.implicitly_wait(IMPLICIT_WAIT)
+
+    def __restoreCookies(self):
+        if not self.cookieCachePath or not os.path.exists(self.cookieCachePath):
+            return False
+        with open(self.cookieCachePath) as cookieFile:
+            cookies = json.load(cookieFile)
+        for cookie in cookies:
+            #expiry must be an int, and stale cookies are rejected by Chrome anyway
+            if "expiry" in cookie:
+                if cookie["expiry"] < time.time():
+                    continue
+                cookie["expiry"] = int(cookie["expiry"])
+            try:
+                self.driver.add_cookie(cookie)
+            except selenium.common.exceptions.WebDriverException:
+                continue
+        self.driver.get(APEX_URL)
+        return True
+
+    def __saveCookies(self):
+        if not self.cookieCachePath:
+            return
+        with open(self.cookieCachePath, "w") as cookieFile:
+            json.dump(self.driver.get_cookies(), cookieFile)
+
     def saveBuffers(self):
         self.savedBuffers = self.driver.find_elements(By.CLASS_NAME, "Window__window___dAtRTy4")
 
@@ -58,64 +117,111 @@ class ApexUtils:
         ActionChains(self.driver).drag_and_drop_by_offset(
             scrollbar, 0, scrolldelta).perform()
 
-def main():
+def createDriver(profileDir):
     options = webdriver.ChromeOptions()
     #doesn't work well in headless mode...
     #options.add_argument("--headless")
     #options.add_argument("window-size=1920,1080")
+    if profileDir:
+        options.add_argument("--user-data-dir={path}".format(path=os.path.abspath(profileDir)))
     driver = webdriver.Chrome(chrome_driver_path, options=options)
-    try:
-        print("Logging in...")
-        driver.implicitly_wait(10)
-        apex = ApexUtils(driver)
+    driver.implicitly_wait(IMPLICIT_WAIT)
+    return driver
+
+def scrapeBaseInventories(apex, onFirstBase=None):
+    print("Opening BS buffer")
+    BSBuffer = apex.openNewBuffer("BS")
+    apex.saveBuffers()
 
-        print("Opening BS buffer")
-        BSBuffer = apex.openNewBuffer("BS")
+    baseButtons = BSBuffer.find_elements(By.XPATH, ".//button[text()='view base']")
+    baseInventories = {}
+    for btn in baseButtons:
+        try:
+            btn.click()
+        except selenium.common.exceptions.ElementClickInterceptedException:
+            #button is not visible - scroll the buffer down and try again
+            apex.scrollDownBuffer(BSBuffer)
+            btn.click()
+        base = apex.findNewBuffer()
         apex.saveBuffers()
+        baseName = base.find_element(By.XPATH, ".//div[contains (@class, 'TileFrame__title')]").text.split(":")[1].strip()
+        baseID = base.find_element(By.XPATH, ".//div[contains (@class, 'TileFrame__cmd')]").text.split(" ")[1]
+        print("Fetching inventory from", baseName)
+        base.find_element(By.XPATH, ".//button[text()='Inventory']").click()
+        inventory = apex.findNewBuffer()
+        items = inventory.find_elements(By.XPATH, ".//div[contains (@class, 'MaterialIcon__container')]")
+        baseInventories[baseID] = {}
+        baseInventories[baseID]["name"] = baseName or baseID
+        baseInventories[baseID]["tickers"] = {}
+        for i in items:
+            ticker = i.find_element(By.XPATH, ".//span[contains (@class, 'ColoredIcon__label')]").text
+            amount_str = i.find_element(By.XPATH, ".//div[contains (@class, 'MaterialIcon__indicator_')]").text
+            amount = int(amount_str) if amount_str else 0
+            if not ticker:
+                continue
+            baseInventories[baseID]["tickers"][ticker] = amount
+            #print(ticker, ":", amount)
+        apex.closeBuffer(inventory)
+        apex.closeBuffer(base)
+        if onFirstBase and len(baseInventories) == 1:
+            onFirstBase()
+    #keep the warm browser clean for the next daemon run
+    apex.closeBuffer(BSBuffer)
+    return baseInventories
 
-        baseButtons = BSBuffer.find_elements(By.XPATH, ".//button[text()='view base']")
-        baseInventories = {}
-        for btn in baseButtons:
+def saveBaseInventories(baseInventories):
+    with open(os.path.join(os.path.dirname(__file__), "baseinv.json"), "w") as jsonFile:
+        json.dump(baseInventories, jsonFile)
+        print("Saved to", os.path.abspath(jsonFile.name))
+
+    with open(os.path.join(os.path.dirname(__file__), "baseinv.csv"), "w", newline='') as csvFile:
+        writer = csv.DictWriter(csvFile, fieldnames=["Username","NaturalId","Name","StorageType","Ticker","Amount"])
+        writer.writeheader()
+        for b in baseInventories.keys():
+            for t in baseInventories[b]["tickers"].keys():
+                writer.writerow({"Username": APEX_USERNAME, "NaturalId": baseInventories[b]["name"], "Name": b, "StorageType": "STORE", "Ticker": t, "Amount": str(baseInventories[b]["tickers"][t])})
+        print("Saved to", os.path.abspath(csvFile.name))
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape base inventories from APEX into FIO compatible CSV")
+    parser.add_argument("--profile", default=CHROME_PROFILE_DIR, help="persistent Chrome user data dir, keeps the APEX session between runs")
+    parser.add_argument("--no-profile", action="store_true", help="start with a fresh Chrome profile")
+    parser.add_argument("--cookies", default=COOKIE_CACHE_PATH, help="cookie cache used to restore the APEX session")
+    parser.add_argument("--daemon", action="store_true", help="keep the browser open and rescrape periodically")
+    parser.add_argument("--interval", type=int, default=1800, help="seconds between scrapes in daemon mode")
+    parser.add_argument("--history", default=HISTORY_DB_PATH, help="database every scrape is appended to, see apex_history.py")
+    args = parser.parse_args()
+
+    startTime = time.perf_counter()
+    driver = createDriver(None if args.no_profile else args.profile)
+    history = InventoryHistory(args.history)
+    try:
+        apex = ApexUtils(driver, args.cookies)
+        firstRun = True
+        while True:
+            def reportFirstBase():
+                print("Startup to first base: {latency:.2f}s".format(latency=time.perf_counter() - startTime))
             try:
-                btn.click()
-            except selenium.common.exceptions.ElementClickInterceptedException:
-                #button is not visible - scroll the buffer down and try again
-                apex.scrollDownBuffer(BSBuffer)
-                btn.click()
-            base = apex.findNewBuffer()
-            apex.saveBuffers()
-            baseName = base.find_element(By.XPATH, ".//div[contains (@class, 'TileFrame__title')]").text.split(":")[1].strip()
-            baseID = base.find_element(By.XPATH, ".//div[contains (@class, 'TileFrame__cmd')]").text.split(" ")[1]
-            print("Fetching inventory from", baseName)
-            base.find_element(By.XPATH, ".//button[text()='Inventory']").click()
-            inventory = apex.findNewBuffer()
-            items = inventory.find_elements(By.XPATH, ".//div[contains (@class, 'MaterialIcon__container')]")
-            baseInventories[baseID] = {}
-            baseInventories[baseID]["name"] = baseName or baseID
-            baseInventories[baseID]["tickers"] = {}
-            for i in items:
-                ticker = i.find_element(By.XPATH, ".//span[contains (@class, 'ColoredIcon__label')]").text
-                amount_str = i.find_element(By.XPATH, ".//div[contains (@class, 'MaterialIcon__indicator_')]").text
-                amount = int(amount_str) if amount_str else 0
-                if not ticker:
-                    continue
-                baseInventories[baseID]["tickers"][ticker] = amount
-                #print(ticker, ":", amount)
-            apex.closeBuffer(inventory)
-            apex.closeBuffer(base)
-        with open(os.path.join(os.path.dirname(__file__), "baseinv.json"), "w") as jsonFile:
-            json.dump(baseInventories, jsonFile)
-            print("Saved to", os.path.abspath(jsonFile.name))
-
-        with open(os.path.join(os.path.dirname(__file__), "baseinv.csv"), "w", newline='') as csvFile:
-            writer = csv.DictWriter(csvFile, fieldnames=["Username","NaturalId","Name","StorageType","Ticker","Amount"])
-            writer.writeheader()
-            for b in baseInventories.keys():
-                for t in baseInventories[b]["tickers"].keys():
-                    writer.writerow({"Username": APEX_USERNAME, "NaturalId": baseInventories[b]["name"], "Name": b, "StorageType": "STORE", "Ticker": t, "Amount": str(baseInventories[b]["tickers"][t])})
-            print("Saved to", os.path.abspath(csvFile.name))
-            
+                if not firstRun:
+                    apex.ensureSession()
+                baseInventories = scrapeBaseInventories(apex, reportFirstBase)
+                saveBaseInventories(baseInventories)
+                history.record(baseInventories)
+            except Exception:
+                if not args.daemon:
+                    raise
+                #a failed run must not end the daemon, the next one starts from a fresh session check
+                print("Scrape failed:")
+                traceback.print_exc()
+            if not args.daemon:
+                break
+            print("Next scrape in {interval}s".format(interval=args.interval))
+            time.sleep(args.interval)
+            firstRun = False
+            #in daemon mode the browser is already warm, so latency is measured from the scrape start
+            startTime = time.perf_counter()
     finally:
+        history.close()
         driver.quit()
 
 if __name__ == "__main__":
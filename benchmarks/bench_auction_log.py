@@ -0,0 +1,84 @@
+"""Auction event log: replaying 100k events on startup, and what logging a bid costs.
+
+python -m benchmarks.bench_auction_log
+"""
+import asyncio
+import random
+import tempfile
+import time
+
+from HAL9666.lib.auction_log import AuctionEventLog
+from benchmarks.synthetic import bench_setup
+
+EVENTS = 100000
+AUCTIONS = 200
+# every bidder waits for each bid to be committed before placing the next
+BIDS_PER_BIDDER = 40
+
+
+def events(count: int, seed: int = 1) -> list[list]:
+    rng = random.Random(seed)
+    result: list[list] = [
+        ["start", key, f"Auction {key}", 7, "Kindling", 2000000, 50000, 48, 24, 3, 1e9 + key] for key in range(AUCTIONS)
+    ]
+    while len(result) < count:
+        key = rng.randrange(AUCTIONS)
+        result.append(["bid", key, 2000000 + len(result) * 50000, rng.randrange(1000), "Bidder"])
+        if rng.random() < 0.3:
+            result.append(["extend", key, 1e9 + len(result)])
+    return result[:count]
+
+
+async def replay(directory: str) -> float:
+    log = AuctionEventLog(directory, flush_interval=0, snapshot_every=10**9)
+    log.open()
+    for event in events(EVENTS):
+        log.append(event)
+    await log.close()
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        replayed = AuctionEventLog(directory)
+        replayed.open()
+        best = min(best, time.perf_counter() - start)
+        await replayed.close()
+    return best
+
+
+async def bids(directory: str, flush_interval: float, concurrent: int) -> tuple[float, float]:
+    """(us per append, bids committed per second) for concurrent bidders each waiting on commit"""
+    log = AuctionEventLog(directory, flush_interval=flush_interval)
+    log.open()
+    log.append(["start", 1, "Bench", 7, "Kindling", 1, 1, 48, 24, 1, 1e9])
+    append_s = 0.0
+
+    async def bidder(n: int) -> None:
+        nonlocal append_s
+        for value in range(BIDS_PER_BIDDER):
+            start = time.perf_counter()
+            log.append(["bid", 1, value, n, "Bidder"])
+            append_s += time.perf_counter() - start
+            await log.commit()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bidder(n) for n in range(concurrent)))
+    elapsed = time.perf_counter() - start
+    await log.close()
+    count = BIDS_PER_BIDDER * concurrent
+    return append_s / count * 1e6, count / elapsed
+
+
+async def main():
+    bench_setup()
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"replay {EVENTS} events: {await replay(directory) * 1000:.0f} ms")
+    print(f"{'flush interval':>15} {'bidders':>8} {'append us':>10} {'committed bids/s':>17}")
+    for flush_interval in (0, 0.005, 0.05):
+        for concurrent in (1, 50):
+            with tempfile.TemporaryDirectory() as directory:
+                append_us, rate = await bids(directory, flush_interval, concurrent)
+            print(f"{flush_interval:>15} {concurrent:>8} {append_us:>10.2f} {rate:>17.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
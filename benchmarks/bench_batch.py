@@ -0,0 +1,50 @@
+"""A 20 ticker BOM: one whohas_batch vs. 20 whohas calls vs. a single whohas.
+
+python -m benchmarks.bench_batch
+"""
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from HAL9666.lib import inventory
+from HAL9666.lib.inventory import InventoryRegistry, SellerData, whohas, whohas_batch
+from HAL9666.lib.registry import parse_inventory_config
+from benchmarks.synthetic import bench_setup, fio_client, inventory_csv, inventory_rows, seller_sheet_rows, tickers
+
+REPEAT = 50
+BOM = tickers(300)[::15]
+
+
+async def measure(query) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        await query()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+async def main():
+    bench_setup()
+    # print() in whohas would dominate the timings
+    inventory.print = lambda *args, **kwargs: None
+    ctx = MagicMock()
+    print(f"{'users':>6} {'1 whohas ms':>12} {f'{len(BOM)} whohas ms':>13} {'batch ms':>9} {'batch all ms':>13}")
+    for users in (500, 2000, 5000):
+        registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+        async with fio_client(inventory_csv(inventory_rows(users))) as client:
+            await registry.default.update(client)
+        sellers = SellerData()
+        sellers._sellers_by_ticker = SellerData._compile(seller_sheet_rows(users))
+        sellers.last_updated = datetime.now()
+        inventory.InventoryGroups = registry
+        inventory.CachedSellersData = sellers
+
+        single = await measure(lambda: whohas(ctx, BOM[0]))
+        sequential = await measure(lambda: asyncio.gather(*(whohas(ctx, ticker) for ticker in BOM)))
+        batch = await measure(lambda: whohas_batch(ctx, BOM))
+        batch_all = await measure(lambda: whohas_batch(ctx, BOM, shouldReturnAll=True))
+        print(f"{users:>6} {single:>12.3f} {sequential:>13.3f} {batch:>9.3f} {batch_all:>13.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
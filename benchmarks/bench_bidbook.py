@@ -0,0 +1,59 @@
+"""BidBook against sorting the whole bid history on every bid, for auctions with thousands of bids.
+
+python -m benchmarks.bench_bidbook
+"""
+import random
+import time
+
+from HAL9666.lib.bidbook import BidBook
+
+SIZES = (1000, 5000, 20000)
+SHIP_COUNT = 5
+INITIAL_PRICE, INCREMENTS = 1000000, 10000
+
+
+def sorted_history(values: list[int]) -> float:
+    """What Auction did before: append, sort everything, then slice for the minimum and the outbid bid"""
+    history: list = []
+    start = time.perf_counter()
+    for n, value in enumerate(values):
+        minBid = history[-SHIP_COUNT][0] + INCREMENTS if len(history) >= SHIP_COUNT else INITIAL_PRICE
+        assert value >= minBid
+        history.append((value, n))
+        history = sorted(history, key=lambda b: b[0])
+        history[-1 - SHIP_COUNT] if len(history) > SHIP_COUNT else None
+    return time.perf_counter() - start
+
+
+def bid_book(values: list[int]) -> float:
+    book = BidBook(SHIP_COUNT)
+    start = time.perf_counter()
+    for n, value in enumerate(values):
+        assert value >= book.min_bid(INITIAL_PRICE, INCREMENTS)
+        book.add(value, n)
+        book.outbid
+    return time.perf_counter() - start
+
+
+def bids(count: int, seed: int = 1) -> list[int]:
+    """Valid bids: each beats the lowest winner, some by a lot"""
+    rng = random.Random(seed)
+    book = BidBook(SHIP_COUNT)
+    values = []
+    for n in range(count):
+        value = book.min_bid(INITIAL_PRICE, INCREMENTS) + rng.choice([0, 0, INCREMENTS, 50 * INCREMENTS])
+        book.add(value, n)
+        values.append(value)
+    return values
+
+
+def main():
+    print(f"{'bids':>6} {'sorted us/bid':>14} {'BidBook us/bid':>15} {'speedup':>8}")
+    for count in SIZES:
+        values = bids(count)
+        before, after = sorted_history(values), bid_book(values)
+        print(f"{count:>6} {before / count * 1e6:>14.2f} {after / count * 1e6:>15.2f} {before / after:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Forced whohas refresh latency, with a new AsyncClient per call (as before) vs. the shared pool.
+
+Runs against a localhost stand-in, so this only captures TCP connection setup and client
+construction. Against FIO the per-call client also pays a TLS handshake every time.
+
+python -m benchmarks.bench_client
+"""
+import asyncio
+import statistics
+import time
+
+from httpx import AsyncClient
+
+from HAL9666.lib import inventory
+from HAL9666.lib.inventory import GroupInventory, SellerData, get_http_client
+from HAL9666.lib.ratelimit import RateLimiter
+from benchmarks.fio_server import StandInFio
+from benchmarks.synthetic import bench_setup, inventory_csv, inventory_rows
+
+REFRESHES = 50
+
+
+async def per_call_client(group: GroupInventory, sellers: SellerData) -> None:
+    async with AsyncClient() as client:
+        await group.update(client)
+    async with AsyncClient() as client:
+        await sellers.update(client)
+
+
+async def pooled_client(group: GroupInventory, sellers: SellerData) -> None:
+    await group.update(get_http_client())
+    await sellers.update(get_http_client())
+
+
+async def measure(refresh, group: GroupInventory, sellers: SellerData) -> list[float]:
+    latencies = []
+    for _ in range(REFRESHES):
+        start = time.perf_counter()
+        await refresh(group, sellers)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main():
+    bench_setup()
+    inventory.FioRateLimiter = RateLimiter(rate=1000, capacity=1000)
+    with StandInFio({"1": inventory_csv(inventory_rows(50))}) as fio:
+        inventory.FioBaseUrl = fio.base_url
+        group = GroupInventory(group_id="1", group_name="bench", api_key="")
+        sellers = SellerData()
+        sellers._seller_sheet_url = f"{fio.base_url}/sheet"
+
+        print(f"{'client':>10} {'median ms':>10} {'p95 ms':>8} {'connections':>12}")
+        for name, refresh in (("per call", per_call_client), ("pooled", pooled_client)):
+            connections = fio.connections
+            latencies = await measure(refresh, group, sellers)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(
+                f"{name:>10} {statistics.median(latencies):>10.2f} {p95:>8.2f} {fio.connections - connections:>12}"
+            )
+        await inventory.close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
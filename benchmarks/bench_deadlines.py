@@ -0,0 +1,60 @@
+"""Hundreds of open auctions on one DeadlineScheduler: how late each one closes, and what a bid
+that extends an auction costs.
+
+python -m benchmarks.bench_deadlines
+"""
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from HAL9666.lib.deadlines import DeadlineScheduler
+
+SIZES = (100, 500, 2000)
+SPREAD = 2.0
+EXTENSIONS = 5
+
+
+async def run(auctions: int, rng: random.Random) -> dict[str, float]:
+    deadlines: dict[int, datetime] = {}
+    lateness: list[float] = []
+
+    async def on_deadline(key: int) -> None:
+        lateness.append((datetime.now() - deadlines[key]).total_seconds() * 1000)
+
+    scheduler = DeadlineScheduler(on_deadline)
+    scheduler.start()
+    start = datetime.now()
+    for key in range(auctions):
+        deadlines[key] = start + timedelta(seconds=rng.uniform(0.5, SPREAD))
+        scheduler.schedule(key, deadlines[key])
+
+    # bids extending auctions while they run
+    schedule_us = []
+    for _ in range(EXTENSIONS):
+        await asyncio.sleep(0.05)
+        for key in rng.sample(range(auctions), auctions // 2):
+            if key in scheduler:
+                deadlines[key] += timedelta(milliseconds=rng.uniform(10, 200))
+                t = time.perf_counter()
+                scheduler.schedule(key, deadlines[key])
+                schedule_us.append((time.perf_counter() - t) * 1e6)
+
+    while len(lateness) < auctions:
+        await asyncio.sleep(0.05)
+    await scheduler.stop()
+    cuts = statistics.quantiles(lateness, n=100)
+    return {"p50": cuts[49], "p99": cuts[98], "max": max(lateness), "schedule_us": statistics.mean(schedule_us)}
+
+
+async def main():
+    rng = random.Random(2)
+    print(f"{'auctions':>9} {'late p50 ms':>12} {'p99 ms':>7} {'max ms':>7} {'extend us':>10}")
+    for auctions in SIZES:
+        r = await run(auctions, rng)
+        print(f"{auctions:>9} {r['p50']:>12.2f} {r['p99']:>7.2f} {r['max']:>7.2f} {r['schedule_us']:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
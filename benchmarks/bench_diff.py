@@ -0,0 +1,68 @@
+"""Cost of diffing two refreshes of a group, against a naive diff of the full {user: {ticker: rows}} dicts.
+
+python -m benchmarks.bench_diff
+"""
+import random
+import time
+
+from HAL9666.lib.changefeed import diff_inventories
+from HAL9666.lib.inventory_store import InventoryStore, InventoryStoreBuilder
+from benchmarks.synthetic import bench_setup, inventory_rows
+
+REPEAT = 5
+
+
+def build(rows: list[dict[str, str]], previous: InventoryStore = None) -> InventoryStore:
+    builder = InventoryStoreBuilder(previous)
+    for row in rows:
+        builder.add(row["Username"], row["Ticker"], row["NaturalId"], int(row["Amount"]))
+    return builder.build()
+
+
+def naive_diff(previous: InventoryStore, current: InventoryStore) -> list[tuple[str, str, str, int, int]]:
+    def flatten(store: InventoryStore) -> dict[tuple[str, str, str], int]:
+        return {
+            (user, ticker, location): amount
+            for user, tickers in store.to_dict().items()
+            for ticker, rows in tickers.items()
+            for location, amount in rows
+        }
+
+    before, after = flatten(previous), flatten(current)
+    changes = [(*key, before.get(key, 0), amount) for key, amount in after.items() if before.get(key, 0) != amount]
+    changes.extend((*key, amount, 0) for key, amount in before.items() if key not in after)
+    return changes
+
+
+def changed_rows(rows: list[dict[str, str]], fraction: float, rng: random.Random) -> list[dict[str, str]]:
+    rows = [dict(row) for row in rows]
+    for row in rng.sample(rows, int(len(rows) * fraction)):
+        row["Amount"] = str(rng.randint(1, 5000))
+    return rows
+
+
+def measure(diff, previous: InventoryStore, current: InventoryStore) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        changes = diff(previous, current)
+    return (time.perf_counter() - start) / REPEAT * 1000, len(changes)
+
+
+def main():
+    bench_setup()
+    rng = random.Random(3)
+    print(f"{'users':>6} {'rows':>8} {'changed':>8} {'changes':>8} {'naive ms':>9} {'diff ms':>8} {'speedup':>8}")
+    for users in (2000, 5000, 20000):
+        rows = inventory_rows(users)
+        previous = build(rows)
+        for fraction in (0.0, 0.001, 0.01, 0.1):
+            current = build(changed_rows(rows, fraction, rng), previous)
+            naive, _ = measure(naive_diff, previous, current)
+            diff, changes = measure(diff_inventories, previous, current)
+            print(
+                f"{users:>6} {len(rows):>8} {fraction:>7.1%} {changes:>8} {naive:>9.1f} {diff:>8.1f} {naive / diff:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
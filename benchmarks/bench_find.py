@@ -0,0 +1,66 @@
+"""findInInventory latency, ticker index vs. the old per-query scan of every user.
+
+python -m benchmarks.bench_find
+"""
+import asyncio
+import random
+import time
+
+from HAL9666.lib.inventory import GroupInventory, SellerData, UserTickerInventory
+from benchmarks.synthetic import bench_setup, fio_client, inventory_csv, inventory_rows, tickers
+
+QUERIES = 2000
+
+
+def scan_find(
+    inventory: dict[str, dict[str, list[tuple[str, int]]]], ticker: str, sellers: dict[str, list[str]]
+) -> list[UserTickerInventory]:
+    # findInInventory before the ticker index, over the old dict of dicts
+    result = [
+        UserTickerInventory(user, ticker, inv[ticker])
+        for user, inv in inventory.items()
+        if ticker in inv
+    ]
+    result = [x for x in result if x.user in sellers]
+    for userInv in result.copy():
+        if len(sellers[userInv.user]) > 0:
+            userInv.filterLocations(sellers[userInv.user])
+            if userInv.getTotal() <= 0:
+                result.remove(userInv)
+    return sorted(result, key=lambda x: x.getTotal())[::-1]
+
+
+async def load_group(users: int) -> GroupInventory:
+    group = GroupInventory(group_id="0", group_name="bench", api_key="")
+    async with fio_client(inventory_csv(inventory_rows(users))) as client:
+        await group.update(client)
+    return group
+
+
+def measure(find, queries: list[str]) -> float:
+    start = time.perf_counter()
+    for ticker in queries:
+        find(ticker)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+async def main():
+    bench_setup()
+    rng = random.Random(2)
+    queries = [rng.choice(tickers(300)) for _ in range(QUERIES)]
+    print(f"{'users':>6} {'scan us/query':>14} {'index us/query':>15} {'speedup':>8}")
+    for users in (500, 2000, 5000):
+        group = await load_group(users)
+        legacy_inventory = group.inventory.to_dict()
+        # every ticker is listed by a few dozen sellers, with no POS filter
+        members = list(legacy_inventory)
+        sellers = {ticker: {user: [] for user in rng.sample(members, 30)} for ticker in tickers(300)}
+        sellerData = SellerData()
+        sellerData.get_sellers_for_ticker = lambda ticker: sellers[ticker]
+        scan = measure(lambda t: scan_find(legacy_inventory, t, sellers[t]), queries)
+        index = measure(lambda t: group.findInInventory(t, sellerData), queries)
+        print(f"{users:>6} {scan:>14.1f} {index:>15.1f} {scan / index:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
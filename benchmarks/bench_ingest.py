@@ -0,0 +1,64 @@
+"""Parse time and peak memory of a group inventory refresh, streaming ingestion vs. the old
+read-everything path (response.text split into lines, then csv.DictReader).
+
+python -m benchmarks.bench_ingest
+"""
+import asyncio
+import csv
+import time
+import tracemalloc
+
+from HAL9666.lib.inventory import _read_inventory_csv
+from benchmarks.synthetic import bench_setup, fio_client, inventory_csv, inventory_rows
+
+
+async def buffered_ingest(body: str) -> dict:
+    async with fio_client(body) as client:
+        response = await client.get("https://rest.fnar.net/csv/inventory")
+        new_inventory: dict[str, dict[str, list[tuple[str, int]]]] = {}
+        for row in csv.DictReader(response.text.split("\r\n")):
+            if row["Username"] not in new_inventory:
+                new_inventory[row["Username"]] = {}
+            if row["Ticker"] not in new_inventory[row["Username"]]:
+                new_inventory[row["Username"]][row["Ticker"]] = []
+            new_inventory[row["Username"]][row["Ticker"]].append(
+                (row["NaturalId"], int(row["Amount"]))
+            )
+        return new_inventory
+
+
+async def streamed_ingest(body: str) -> dict:
+    async with fio_client(body) as client:
+        async with client.stream("GET", "https://rest.fnar.net/csv/inventory") as response:
+            inventory, _, _ = await _read_inventory_csv(response.aiter_bytes())
+            return inventory
+
+
+async def measure(ingest, body: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    await ingest(body)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    await ingest(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+async def main():
+    bench_setup()
+    print(f"{'rows':>8} {'MiB body':>9} {'buffered s':>11} {'MiB peak':>9} {'streamed s':>11} {'MiB peak':>9}")
+    for users in (500, 2000, 8000):
+        rows = inventory_rows(users)
+        body = inventory_csv(rows)
+        buffered_time, buffered_peak = await measure(buffered_ingest, body)
+        streamed_time, streamed_peak = await measure(streamed_ingest, body)
+        print(
+            f"{len(rows):>8} {len(body) / 2**20:>9.1f} {buffered_time:>11.3f} {buffered_peak:>9.1f}"
+            f" {streamed_time:>11.3f} {streamed_peak:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
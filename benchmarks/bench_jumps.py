@@ -0,0 +1,69 @@
+"""Building the jump table for a galaxy the size of the game's, and ranking whohas by distance with it.
+
+python -m benchmarks.bench_jumps
+"""
+import asyncio
+import random
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from HAL9666.lib import inventory
+from HAL9666.lib.inventory import InventoryRegistry, SellerData, whohas
+from HAL9666.lib.jumps import build_jump_table
+from HAL9666.lib.registry import parse_inventory_config
+from benchmarks.synthetic import bench_setup, fio_client, inventory_csv, inventory_rows, locations, tickers
+
+SYSTEMS = 800
+REPEAT = 50
+
+
+def galaxy(count: int, seed: int = 1) -> list[dict]:
+    """A connected graph of count systems, each linked to a few near ones like the game's jump gates"""
+    rng = random.Random(seed)
+    links: list[set[int]] = [set() for _ in range(count)]
+    for i in range(1, count):
+        for j in {rng.randrange(max(0, i - 20), i) for _ in range(rng.randint(1, 2))}:
+            links[i].add(j)
+            links[j].add(i)
+    return [
+        {"SystemId": str(i), "NaturalId": f"S{i}", "Connections": [{"ConnectingId": str(j)} for j in sorted(links[i])]}
+        for i in range(count)
+    ]
+
+
+async def main():
+    bench_setup()
+    inventory.print = lambda *args, **kwargs: None
+    systems = galaxy(SYSTEMS)
+    # every synthetic location gets a system, so every row has a distance
+    planets = [{"PlanetNaturalId": location, "SystemId": str(i % SYSTEMS)} for i, location in enumerate(locations(200))]
+    start = time.perf_counter()
+    table = build_jump_table(systems, planets)
+    print(
+        f"build {SYSTEMS} systems: {(time.perf_counter() - start) * 1000:.0f} ms,"
+        f" table {len(table.matrix) * table.matrix.itemsize / 2**20:.1f} MB"
+    )
+    inventory._jump_table, inventory._jump_table_loaded = table, True
+
+    print(f"{'users':>6} {'whohas all ms':>14} {'with destination ms':>20}")
+    for users in (500, 2000, 5000):
+        registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+        async with fio_client(inventory_csv(inventory_rows(users))) as client:
+            await registry.default.update(client)
+        sellers = SellerData()
+        sellers.last_updated = datetime.now()
+        inventory.InventoryGroups = registry
+        inventory.CachedSellersData = sellers
+        ticker, destination = tickers(300)[0], locations(200)[7]
+        timings = []
+        for kwargs in ({}, {"destination": destination}):
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                await whohas(MagicMock(), ticker, shouldReturnAll=True, **kwargs)
+            timings.append((time.perf_counter() - start) / REPEAT * 1000)
+        print(f"{users:>6} {timings[0]:>14.3f} {timings[1]:>20.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Memory held by a parsed group inventory: the old dict of dicts of (NaturalId, Amount) tuples
+vs. the interned, array backed InventoryStore. Also snapshot size and load time of each.
+
+python -m benchmarks.bench_memory
+"""
+import csv
+import gc
+import pickle
+import time
+import tracemalloc
+
+from HAL9666.lib.inventory_store import InventoryStoreBuilder
+from benchmarks.synthetic import bench_setup, inventory_csv, inventory_rows
+
+ROWS_PER_REPORT = 100_000
+
+
+def build_dicts(lines: list[str]) -> dict:
+    inventory: dict[str, dict[str, list[tuple[str, int]]]] = {}
+    for row in csv.DictReader(lines):
+        inventory.setdefault(row["Username"], {}).setdefault(row["Ticker"], []).append(
+            (row["NaturalId"], int(row["Amount"]))
+        )
+    return inventory
+
+
+def build_store(lines: list[str]):
+    reader = csv.reader(lines)
+    header = {name: i for i, name in enumerate(next(reader))}
+    columns = (header["Username"], header["Ticker"], header["NaturalId"], header["Amount"])
+    builder = InventoryStoreBuilder()
+    for row in reader:
+        if row:
+            user, ticker, location, amount = (row[i] for i in columns)
+            builder.add(user, ticker, location, int(amount))
+    return builder.build()
+
+
+def retained_mib(build, lines: list[str]):
+    gc.collect()
+    tracemalloc.start()
+    structure = build(lines)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, current / 2**20, peak / 2**20
+
+
+def snapshot_stats(structure) -> tuple[float, float]:
+    data = pickle.dumps(structure, protocol=pickle.HIGHEST_PROTOCOL)
+    gc.disable()
+    start = time.perf_counter()
+    pickle.loads(data)
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return len(data) / 2**20, elapsed * 1000
+
+
+def main():
+    bench_setup()
+    print(
+        f"{'rows':>8} {'structure':>10} {'MiB held':>9} {'MiB/100k':>9} {'MiB peak':>9}"
+        f" {'MiB pickle':>11} {'load ms':>8}"
+    )
+    for users in (1000, 5000):
+        rows = inventory_rows(users)
+        lines = inventory_csv(rows).split("\r\n")
+        for name, build in (("dicts", build_dicts), ("store", build_store)):
+            structure, held, peak = retained_mib(build, lines)
+            size, load_ms = snapshot_stats(structure)
+            per_100k = held / len(rows) * ROWS_PER_REPORT
+            print(
+                f"{len(rows):>8} {name:>10} {held:>9.1f} {per_100k:>9.1f} {peak:>9.1f}"
+                f" {size:>11.1f} {load_ms:>8.1f}"
+            )
+            del structure
+
+
+if __name__ == "__main__":
+    main()
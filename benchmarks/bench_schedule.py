@@ -0,0 +1,79 @@
+"""FIO calls and whohas answer staleness over a simulated day, fixed vs. adaptive refresh interval.
+
+The day has a busy evening (a query every ~2 minutes, data changing every ~10) and a quiet rest
+(a query every ~2 hours, data changing every ~hour). Staleness is how long before a query the
+answer's data stopped matching FIO. Queries also trigger the stale-while-revalidate refresh once
+the data is past the soft TTL, like whohas does.
+
+python -m benchmarks.bench_schedule
+"""
+import random
+from typing import Optional
+
+from HAL9666.lib.scheduler import AdaptiveInterval
+
+DAY = 24 * 3600
+BUSY = (18 * 3600, 22 * 3600)
+SOFT_TTL = 600
+
+
+def events(rng: random.Random, busy_every: float, quiet_every: float) -> list[float]:
+    t, times = 0.0, []
+    while t < DAY:
+        busy = BUSY[0] <= t < BUSY[1]
+        t += rng.expovariate(1 / (busy_every if busy else quiet_every))
+        times.append(t)
+    return times
+
+
+def simulate(seed: int, adaptive: Optional[AdaptiveInterval], interval: float = 300) -> tuple[int, float, float]:
+    rng = random.Random(seed)
+    queries = events(rng, 120, 7200)
+    changes = events(rng, 600, 3600)
+    # (time, kind), kinds sort refreshes before queries at the same instant
+    timeline = sorted([(t, 1) for t in queries] + [(t, 0) for t in changes])
+    calls, seen_change, last_refresh, changed_since_refresh = 0, 0.0, 0.0, False
+    latest_change = 0.0
+    next_refresh = interval
+    staleness = []
+
+    def refresh(now: float, scheduled: bool) -> None:
+        nonlocal calls, seen_change, last_refresh, changed_since_refresh, next_refresh
+        calls += 1
+        if adaptive is not None and scheduled:
+            adaptive.record_refresh(changed_since_refresh)
+        seen_change, last_refresh, changed_since_refresh = latest_change, now, False
+        if scheduled:
+            next_refresh = now + (adaptive.next() if adaptive is not None else interval)
+
+    for t, kind in timeline:
+        while next_refresh <= t:
+            refresh(next_refresh, scheduled=True)
+        if kind == 0:
+            latest_change, changed_since_refresh = t, True
+            continue
+        if adaptive is not None:
+            adaptive.record_query()
+            if t - last_refresh >= SOFT_TTL:
+                # answered from the old data, the background refresh lands afterwards
+                staleness.append(t - latest_change if latest_change > seen_change else 0.0)
+                refresh(t, scheduled=False)
+                continue
+        staleness.append(t - latest_change if latest_change > seen_change else 0.0)
+    busy_staleness = [s for s, q in zip(staleness, queries) if BUSY[0] <= q < BUSY[1]]
+    return calls, sum(staleness) / len(staleness), sum(busy_staleness) / max(1, len(busy_staleness))
+
+
+def main():
+    print(f"{'schedule':>10} {'FIO calls/day':>14} {'stale s/query':>14} {'busy stale s/query':>19}")
+    for name, make in (
+        ("fixed", lambda: None),
+        ("adaptive", lambda: AdaptiveInterval(300, min_interval=75, max_interval=1800)),
+    ):
+        results = [simulate(seed, make()) for seed in range(20)]
+        calls, stale, busy = (sum(r[i] for r in results) / len(results) for i in range(3))
+        print(f"{name:>10} {calls:>14.0f} {stale:>14.1f} {busy:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
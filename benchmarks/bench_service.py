@@ -0,0 +1,86 @@
+"""whohas answered in-process vs. by the inventory service over localhost HTTP and a Unix socket,
+with several consumers querying at once.
+
+python -m benchmarks.bench_service
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from HAL9666.lib import inventory, inventory_client
+from HAL9666.lib.inventory import InventoryRegistry, SellerData
+from HAL9666.lib.inventory_service import start_inventory_service
+from HAL9666.lib.registry import parse_inventory_config
+from benchmarks.synthetic import bench_setup, fio_client, inventory_csv, inventory_rows, seller_sheet_rows, tickers
+
+USERS = 2000
+QUERIES = 500
+CONSUMERS = (1, 4, 16)
+
+
+async def p50_us(whohas, ticker: str) -> float:
+    samples = []
+    for _ in range(QUERIES):
+        start = time.perf_counter()
+        await whohas(None, ticker)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+async def throughput(address: str, consumers: int, ticker: str) -> float:
+    """Queries per second of consumers, each with its own connection like separate bots would have"""
+    clients = []
+    for _ in range(consumers):
+        inventory_client.service_client = None
+        clients.append(inventory_client.get_service_client(address))
+
+    async def consume(client) -> None:
+        for _ in range(QUERIES // consumers):
+            response = await client.get("/whohas", params={"ticker": ticker})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(consume(client) for client in clients))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.aclose()
+    inventory_client.service_client = None
+    return consumers * (QUERIES // consumers) / elapsed
+
+
+async def main():
+    bench_setup()
+    inventory.print = lambda *args, **kwargs: None
+    registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+    async with fio_client(inventory_csv(inventory_rows(USERS))) as client:
+        await registry.default.update(client)
+    sellers = SellerData()
+    sellers._sellers_by_ticker = SellerData._compile(seller_sheet_rows(USERS))
+    sellers.last_updated = datetime.now()
+    inventory.InventoryGroups = registry
+    inventory.CachedSellersData = sellers
+    ticker = tickers(300)[0]
+
+    with tempfile.TemporaryDirectory() as directory:
+        addresses = {"http": "http://127.0.0.1:0", "unix": f"unix://{os.path.join(directory, 'inventory.sock')}"}
+        print(f"{USERS} users, whohas {ticker}: in-process p50 {await p50_us(inventory.whohas, ticker):.0f} us")
+        for name, address in addresses.items():
+            server = await start_inventory_service(address)
+            if name == "http":
+                address = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            async with server:
+                async with inventory_client.inventory_service_client(address):
+                    latency = await p50_us(inventory_client.whohas, ticker)
+                rates = [await throughput(address, consumers, ticker) for consumers in CONSUMERS]
+                print(
+                    f"{name:>5}: p50 {latency:.0f} us, "
+                    + ", ".join(f"{consumers} consumers {rate:.0f} q/s" for consumers, rate in zip(CONSUMERS, rates))
+                )
+                await asyncio.sleep(0.01)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+"""Valuing a group's stock at CX prices: parsing /exchange/all, and the join at several group sizes.
+
+python -m benchmarks.bench_valuation
+"""
+import asyncio
+import time
+
+from HAL9666.lib.inventory import InventoryRegistry
+from HAL9666.lib.registry import parse_inventory_config
+from HAL9666.lib.valuation import PriceTable, value_inventories
+from benchmarks.synthetic import bench_setup, exchange_offers, fio_client, inventory_csv, inventory_rows
+
+REPEAT = 20
+
+
+def best_ms(function) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def main():
+    bench_setup()
+    offers = exchange_offers()
+    print(f"PriceTable of {len(offers)} offers: {best_ms(lambda: PriceTable(offers)):.2f} ms")
+    prices = PriceTable(offers).price_list("AI1", "average")
+
+    print(f"{'users':>6} {'rows':>8} {'holdings':>9} {'value ms':>9}")
+    for users in (500, 2000, 5000):
+        registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+        rows = inventory_rows(users)
+        async with fio_client(inventory_csv(rows)) as client:
+            await registry.default.update(client)
+        store = registry.default.inventory
+        elapsed = best_ms(lambda: value_inventories([store], prices, "AI1", "average"))
+        print(f"{users:>6} {len(rows):>8} {len(store.holding_user):>9} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Stand-in for FIO and the seller sheet, served over plain HTTP on localhost"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StandInFio:
+    """Serves /csv/inventory?group=<id> from group_csvs and /sheet from seller_csv.
+
+    Use as a context manager. Point a GroupInventory at it with base_url.
+    """
+
+    def __init__(self, group_csvs: dict[str, str], seller_csv: str = "MAT,Seller,POS\r\nC,USER00000,\r\n"):
+        self.group_csvs = {group_id: body.encode() for group_id, body in group_csvs.items()}
+        self.seller_csv = seller_csv.encode()
+        self.requests = 0
+        self.connections = 0
+
+    def __enter__(self) -> "StandInFio":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def setup(self) -> None:
+                server.connections += 1
+                super().setup()
+
+            def do_GET(self) -> None:
+                server.requests += 1
+                url = urlparse(self.path)
+                if url.path == "/csv/inventory":
+                    body = server.group_csvs.get(parse_qs(url.query).get("group", [""])[0])
+                elif url.path == "/sheet":
+                    body = server.seller_csv
+                else:
+                    body = None
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
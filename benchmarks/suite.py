@@ -0,0 +1,202 @@
+"""End to end inventory pipeline benchmark at several group sizes, against the localhost stand-in.
+
+For every size it measures:
+- GroupInventory.update: parse throughput (rows/s, MB/s), peak memory while parsing, and the
+  memory the parsed inventory keeps
+- SellerData.update of a matching synthetic seller sheet
+- findInInventory (seller filtered and "all") and get_sellers_for_ticker latency percentiles
+
+Results are saved as JSON, and --compare prints the ratios against an earlier results file.
+
+python -m benchmarks.suite
+python -m benchmarks.suite --sizes 500 5000 --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from HAL9666.lib import inventory
+from HAL9666.lib.inventory import GroupInventory, SellerData, get_http_client
+from HAL9666.lib.ratelimit import RateLimiter
+from benchmarks.fio_server import StandInFio
+from benchmarks.synthetic import (
+    bench_setup,
+    inventory_csv,
+    inventory_rows,
+    seller_sheet_csv,
+    seller_sheet_rows,
+    tickers,
+)
+
+ResultsDir = os.path.join(os.path.dirname(__file__), "results")
+DefaultSizes = (500, 2000, 5000)
+UPDATES = 3
+QUERIES = 2000
+
+
+def percentiles(samples_us: list[float]) -> dict[str, float]:
+    cuts = statistics.quantiles(samples_us, n=100)
+    return {"p50_us": cuts[49], "p95_us": cuts[94], "p99_us": cuts[98], "max_us": max(samples_us)}
+
+
+def latencies(query: Callable[[str], object], queries: list[str]) -> dict[str, float]:
+    samples = []
+    for ticker in queries:
+        start = time.perf_counter_ns()
+        query(ticker)
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    return percentiles(samples)
+
+
+async def bench_update(group_id: str, rows: int, body_bytes: int) -> dict[str, float]:
+    durations = []
+    for _ in range(UPDATES):
+        # a new group every time, so the unchanged body isn't skipped
+        group = GroupInventory(group_id=group_id, group_name="bench", api_key="")
+        start = time.perf_counter()
+        await group.update(get_http_client())
+        durations.append(time.perf_counter() - start)
+    best = min(durations)
+
+    gc.collect()
+    tracemalloc.start()
+    group = GroupInventory(group_id=group_id, group_name="bench", api_key="")
+    await group.update(get_http_client())
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(durations) * 1000,
+        "best_ms": best * 1000,
+        "rows_per_s": rows / best,
+        "mb_per_s": body_bytes / best / 2**20,
+        "peak_mb": peak / 2**20,
+        "retained_mb": retained / 2**20,
+    }
+
+
+async def bench_size(users: int, rng: random.Random) -> dict:
+    rows = inventory_rows(users)
+    body = inventory_csv(rows)
+    sheet = seller_sheet_csv(seller_sheet_rows(users))
+    result: dict = {"users": users, "rows": len(rows), "body_mb": len(body) / 2**20}
+    with StandInFio({"1": body}, seller_csv=sheet) as fio:
+        inventory.FioBaseUrl = fio.base_url
+        result["update"] = await bench_update("1", len(rows), len(body.encode()))
+
+        sellers = SellerData()
+        sellers._seller_sheet_url = f"{fio.base_url}/sheet"
+        start = time.perf_counter()
+        await sellers.update(get_http_client())
+        result["seller_update_ms"] = (time.perf_counter() - start) * 1000
+
+        group = GroupInventory(group_id="1", group_name="bench", api_key="")
+        await group.update(get_http_client())
+        await inventory.close_http_client()
+
+    queries = [rng.choice(tickers(300)) for _ in range(QUERIES)]
+    result["find"] = latencies(lambda ticker: group.findInInventory(ticker, sellers), queries)
+    result["find_all"] = latencies(lambda ticker: group.findInInventory(ticker, sellers, shouldReturnAll=True), queries)
+    result["get_sellers"] = latencies(sellers.get_sellers_for_ticker, queries)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(result: dict, prefix: str = "") -> dict[str, float]:
+    flat: dict[str, float] = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def report(results: list[dict]) -> None:
+    print(
+        f"{'users':>6} {'rows':>8} {'rows/s':>9} {'MB/s':>6} {'peak MB':>8} {'kept MB':>8} {'sheet ms':>9}"
+        f" {'find p50/p99 us':>16} {'all p50/p99 us':>15} {'sellers p99 us':>15}"
+    )
+    for r in results:
+        u = r["update"]
+        print(
+            f"{r['users']:>6} {r['rows']:>8} {u['rows_per_s']:>9.0f} {u['mb_per_s']:>6.1f} {u['peak_mb']:>8.1f}"
+            f" {u['retained_mb']:>8.1f} {r['seller_update_ms']:>9.1f}"
+            f" {r['find']['p50_us']:>7.1f}/{r['find']['p99_us']:<8.1f}"
+            f" {r['find_all']['p50_us']:>7.1f}/{r['find_all']['p99_us']:<7.1f}"
+            f" {r['get_sellers']['p99_us']:>15.2f}"
+        )
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Prints current / baseline for every metric of the sizes both runs have. Below 1 is faster
+    (or smaller) for times and memory, and slower for the throughput figures."""
+    with open(baseline_path) as f:
+        baseline = {r["users"]: flatten(r) for r in json.load(f)["results"]}
+    print(f"\nCompared to {baseline_path}:")
+    for r in results:
+        before = baseline.get(r["users"])
+        if before is None:
+            continue
+        ratios = [
+            f"{key} {value / before[key]:.2f}x"
+            for key, value in flatten(r).items()
+            if key not in ("users", "rows", "body_mb") and before.get(key)
+        ]
+        print(f"{r['users']:>6} users: " + ", ".join(ratios))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Inventory pipeline benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DefaultSizes, help="group sizes, in users")
+    parser.add_argument("--output", help="results file, a timestamped file in benchmarks/results by default")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    bench_setup()
+    inventory.FioRateLimiter = RateLimiter(rate=1000, capacity=1000)
+    rng = random.Random(4)
+    results = [await bench_size(users, rng) for users in args.sizes]
+    report(results)
+
+    started = datetime.now(timezone.utc)
+    output = args.output or os.path.join(ResultsDir, f"{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "timestamp": started.isoformat(),
+                "commit": git_commit(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nSaved to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
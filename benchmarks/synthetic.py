@@ -0,0 +1,133 @@
+"""Synthetic FIO data for the benchmarks. Everything is seeded, so runs are comparable."""
+import csv
+import io
+import logging
+import random
+
+import httpx
+
+FIO_INVENTORY_FIELDS = ["Username", "NaturalId", "Name", "StorageType", "Ticker", "Amount"]
+SELLER_SHEET_FIELDS = ["MAT", "Seller", "POS", "Price/u"]
+
+
+def bench_setup() -> None:
+    """Keeps per-request info logs out of the output, and benchmark data out of the snapshot dir"""
+    from HAL9666.lib import snapshot
+
+    snapshot.SnapshotDir = ""
+    for name in ("httpx", "HAL9666.lib.inventory", "HAL9666.lib.inventory_service"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def tickers(count: int) -> list[str]:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return [
+        letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26] for i in range(count)
+    ]
+
+
+def locations(count: int) -> list[str]:
+    return [f"{chr(65 + i // 260 % 26)}{chr(65 + i // 10 % 26)}-{100 + i % 900}{'abcde'[i % 5]}" for i in range(count)]
+
+
+def inventory_rows(
+    users: int,
+    tickers_per_user: int = 40,
+    locations_per_user: int = 3,
+    ticker_count: int = 300,
+    location_count: int = 200,
+    seed: int = 1,
+) -> list[dict[str, str]]:
+    rng = random.Random(seed)
+    all_tickers = tickers(ticker_count)
+    all_locations = locations(location_count)
+    rows = []
+    for u in range(users):
+        user = f"USER{u:05d}"
+        for location in rng.sample(all_locations, locations_per_user):
+            for ticker in rng.sample(all_tickers, tickers_per_user // locations_per_user):
+                rows.append(
+                    {
+                        "Username": user,
+                        "NaturalId": location,
+                        "Name": location,
+                        "StorageType": "STORE",
+                        "Ticker": ticker,
+                        "Amount": str(rng.randint(1, 5000)),
+                    }
+                )
+    return rows
+
+
+def exchange_offers(
+    ticker_count: int = 300, exchanges: tuple[str, ...] = ("AI1", "CI1", "IC1", "NC1"), seed: int = 1
+) -> list[dict]:
+    """/exchange/all entries, a few of them without bids or asks like on the real CXs"""
+    rng = random.Random(seed)
+    offers = []
+    for ticker in tickers(ticker_count):
+        base = rng.uniform(10, 50000)
+        for cx in exchanges:
+            bid, ask = base * rng.uniform(0.8, 0.95), base * rng.uniform(1.05, 1.2)
+            offers.append(
+                {
+                    "MaterialTicker": ticker,
+                    "ExchangeCode": cx,
+                    "Bid": bid if rng.random() > 0.05 else None,
+                    "Ask": ask if rng.random() > 0.05 else None,
+                    "PriceAverage": base,
+                }
+            )
+    return offers
+
+
+def inventory_csv(rows: list[dict[str, str]]) -> str:
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, FIO_INVENTORY_FIELDS, lineterminator="\r\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return stream.getvalue()
+
+
+def seller_sheet_rows(
+    users: int,
+    sellers_per_ticker: int = 30,
+    pos_fraction: float = 0.3,
+    ticker_count: int = 300,
+    location_count: int = 200,
+    seed: int = 1,
+) -> list[dict[str, str]]:
+    """Sheet rows for members of an inventory_rows(users) group. pos_fraction of the rows list
+    one to three POS locations, the rest sell from anywhere."""
+    rng = random.Random(seed)
+    all_locations = locations(location_count)
+    members = [f"USER{u:05d}" for u in range(users)]
+    rows = []
+    for ticker in tickers(ticker_count):
+        for seller in rng.sample(members, min(sellers_per_ticker, users)):
+            pos = rng.sample(all_locations, rng.randint(1, 3)) if rng.random() < pos_fraction else []
+            rows.append(
+                {"MAT": ticker, "Seller": seller, "POS": ", ".join(pos), "Price/u": str(rng.randint(10, 90000))}
+            )
+    return rows
+
+
+def seller_sheet_csv(rows: list[dict[str, str]]) -> str:
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, SELLER_SHEET_FIELDS, lineterminator="\r\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return stream.getvalue()
+
+
+def fio_client(body: str, chunk_size: int = 65536) -> httpx.AsyncClient:
+    """Client for a stand-in FIO that streams body in chunk_size pieces, without touching the network"""
+    payload = body.encode()
+
+    async def chunks():
+        for i in range(0, len(payload), chunk_size):
+            yield payload[i : i + chunk_size]
+
+    return httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=chunks()))
+    )
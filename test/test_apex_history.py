@@ -0,0 +1,66 @@
+import csv
+import io
+
+from apex_history import InventoryHistory
+
+DAY = 86400
+
+
+def base_inventories(rat: int, dw: int | None = None) -> dict:
+    tickers = {"RAT": rat}
+    if dw is not None:
+        tickers["DW"] = dw
+    return {"UV-351a": {"name": "Katoa", "tickers": tickers}}
+
+
+def test_unchanged_scrapes_extend_interval(tmp_path):
+    history = InventoryHistory(str(tmp_path / "history.sqlite"))
+    for day in range(5):
+        history.record(base_inventories(1000), timestamp=day * DAY)
+
+    intervals = history.history("UV-351a", "RAT", since=0, until=10 * DAY)
+    assert intervals == [(0, 4 * DAY, 1000)]
+
+
+def test_consumption_rate(tmp_path):
+    history = InventoryHistory(str(tmp_path / "history.sqlite"))
+    history.record(base_inventories(1000, 50), timestamp=0)
+    history.record(base_inventories(900, 50), timestamp=1 * DAY)
+    history.record(base_inventories(2000, 50), timestamp=2 * DAY)  # restock is not consumption
+    history.record(base_inventories(1800), timestamp=3 * DAY)  # DW ran out
+
+    assert history.consumptionRate("Katoa", "RAT", since=0, until=3 * DAY) == (100 + 200) / 3
+    assert history.history("UV-351a", "DW", since=0, until=3 * DAY)[-1] == (3 * DAY, 3 * DAY, 0)
+    # only the interval active at the start of the range, and the ones after it
+    assert len(history.history("UV-351a", "RAT", since=1.5 * DAY, until=3 * DAY)) == 3
+
+
+def test_export_csv(tmp_path):
+    history = InventoryHistory(str(tmp_path / "history.sqlite"))
+    history.record(base_inventories(1000, 50), timestamp=0)
+    history.record(base_inventories(900), timestamp=DAY)
+
+    output = io.StringIO()
+    history.exportCSV(output, "Gilith")
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert rows == [
+        {"Username": "Gilith", "NaturalId": "Katoa", "Name": "UV-351a", "StorageType": "STORE", "Ticker": "RAT", "Amount": "900"}
+    ]
+
+
+def test_missing_base_closes_intervals(tmp_path):
+    history = InventoryHistory(str(tmp_path / "history.sqlite"))
+    other = {"OT-580b": {"name": "Montem", "tickers": {"RAT": 10}}}
+    history.record({**base_inventories(1000), **other}, timestamp=0)
+    history.record(other, timestamp=DAY)
+    history.record(other, timestamp=2 * DAY)
+
+    # the demolished base's stock ends at its last scrape and is no longer exported
+    assert history.history("UV-351a", "RAT", since=0, until=2 * DAY) == [(0, 0, 1000)]
+    output = io.StringIO()
+    history.exportCSV(output, "Gilith")
+    assert [row["Name"] for row in csv.DictReader(io.StringIO(output.getvalue()))] == ["OT-580b"]
+
+    # a base that comes back starts a new interval
+    history.record(base_inventories(1000), timestamp=3 * DAY)
+    assert history.history("UV-351a", "RAT", since=0, until=3 * DAY) == [(0, 0, 1000), (3 * DAY, 3 * DAY, 1000)]
@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import pytest
+
+from HAL9666.lib.auction_log import AuctionEventLog, LoggedUser, apply_event
+
+START = ["start", 1, "WCB ship", 7, "Kindling", 2000000, 50000, 48, 24, 2, 1000.0]
+
+
+def test_apply_event():
+    auctions: dict = {}
+    apply_event(auctions, START)
+    apply_event(auctions, ["bid", 1, 2000000, 8, "Felmer"])
+    apply_event(auctions, ["extend", 1, 2000.0])
+    state = auctions[1]
+    assert (state.name, state.creator, state.shipCount, state.endTime) == ("WCB ship", LoggedUser(7, "Kindling"), 2, 2000.0)
+    assert state.bids == [(2000000, LoggedUser(8, "Felmer"))]
+    assert LoggedUser(8, "Felmer").mention == "<@8>"
+
+    apply_event(auctions, ["finish", 1])
+    assert auctions == {}
+
+
+@pytest.mark.asyncio
+async def test_replay(tmp_path):
+    log = AuctionEventLog(str(tmp_path), flush_interval=0.001)
+    log.open()
+    log.append(START)
+    log.append(["start", 2, "Stopped", 7, "Kindling", 1, 1, 1, 1, 1, 1.0])
+    log.append(["bid", 1, 2000000, 8, "Felmer"])
+    log.append(["stop", 2])
+    await log.commit()
+
+    replayed = AuctionEventLog(str(tmp_path)).open()
+    assert list(replayed) == [1]
+    assert replayed[1] == log.auctions[1]
+
+    # a crash mid-write leaves half a line, which was never committed
+    with open(tmp_path / "auctions.log", "a") as f:
+        f.write('[5, "bid", 1, 30')
+    restarted = AuctionEventLog(str(tmp_path), flush_interval=0.001)
+    assert restarted.open()[1].bids == [(2000000, LoggedUser(8, "Felmer"))]
+    # the half line is gone, so a bid committed after the restart survives the next one
+    restarted.append(["bid", 1, 2500000, 9, "Zoë"])
+    await restarted.commit()
+    again = AuctionEventLog(str(tmp_path))
+    assert again.open()[1].bids == [(2000000, LoggedUser(8, "Felmer")), (2500000, LoggedUser(9, "Zoë"))]
+    await again.close()
+    await restarted.close()
+    await log.close()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_compacts_the_log(tmp_path):
+    log = AuctionEventLog(str(tmp_path), flush_interval=0.001, snapshot_every=10)
+    log.open()
+    log.append(START)
+    for value in range(25):
+        log.append(["bid", 1, 2000000 + value, 8, "Felmer"])
+        if value % 5 == 0:
+            await log.commit()
+    await log.commit()
+    assert os.path.exists(tmp_path / "auctions.snapshot")
+    with open(tmp_path / "auctions.log") as f:
+        assert len(f.read().splitlines()) < 10
+
+    replayed = AuctionEventLog(str(tmp_path))
+    auctions = replayed.open()
+    assert len(auctions[1].bids) == 25
+    assert replayed.seq == log.seq == 26
+    await log.close()
+    await replayed.close()
+
+
+@pytest.mark.asyncio
+async def test_appends_share_one_fsync(tmp_path, monkeypatch):
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+    log = AuctionEventLog(str(tmp_path), flush_interval=0.01)
+    log.open()
+    log.append(START)
+    await asyncio.gather(*(asyncio.sleep(0) for _ in range(3)))
+    for value in range(100):
+        log.append(["bid", 1, 2000000 + value, 8, "Felmer"])
+    await log.commit()
+    assert len(fsyncs) == 1
+    await log.close()
+
+
+@pytest.mark.asyncio
+async def test_commit_waits_for_a_write_in_flight(tmp_path):
+    log = AuctionEventLog(str(tmp_path))
+    log.open()
+    log.append(START)
+    # let the batch start writing, nothing new is queued after it
+    await asyncio.sleep(0)
+    await log.commit()
+    with open(tmp_path / "auctions.log") as f:
+        assert len(f.read().splitlines()) == 1
+    await log.close()
+
+
+@pytest.mark.asyncio
+async def test_close_writes_queued_events(tmp_path):
+    log = AuctionEventLog(str(tmp_path), flush_interval=0.01)
+    log.open()
+    log.append(START)
+    log.append(["finish", 1])
+    await log.close()
+    assert log._file is None
+
+    replayed = AuctionEventLog(str(tmp_path))
+    assert replayed.open() == {}
+    assert replayed.seq == 2
+    await replayed.close()
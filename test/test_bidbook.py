@@ -0,0 +1,51 @@
+import random
+
+from HAL9666.lib.bidbook import BidBook
+
+
+def test_single_item():
+    book = BidBook()
+    assert book.best() is None
+    assert book.min_bid(1000, 100) == 1000
+
+    book.add(1000, "Kindling")
+    assert book.outbid is None
+    assert book.min_bid(1000, 100) == 1100
+
+    book.add(1500, "Felmer")
+    assert book.outbid == (1000, "Kindling")
+    assert book.best() == (1500, "Felmer")
+    assert book.bids == [(1000, "Kindling"), (1500, "Felmer")]
+
+
+def test_winners():
+    book = BidBook(count=2)
+    book.add(1000, "Kindling")
+    assert book.min_bid(1000, 100) == 1000
+    book.add(1000, "Felmer")
+    assert book.outbid is None
+    assert book.min_bid(1000, 100) == 1100
+
+    book.add(3000, "Gilith")
+    assert book.outbid == (1000, "Kindling")
+    # equal bids keep the order they came in
+    book.add(3000, "Kindling")
+    assert book.outbid == (1000, "Felmer")
+    assert book.winners == [(3000, "Gilith"), (3000, "Kindling")]
+    assert book.min_bid(1000, 100) == 3100
+
+
+def test_matches_sorting_every_bid():
+    """Same answers as the sort on every bid it replaced"""
+    rng = random.Random(3)
+    for count in (1, 3, 10):
+        book = BidBook(count)
+        history: list = []
+        for n in range(500):
+            value = book.min_bid(1000, 100) + rng.choice([0, 0, 100, 5000])
+            book.add(value, n)
+            history = sorted(history + [(value, n)], key=lambda b: b[0])
+            assert book.bids == history
+            assert book.winners == history[-count:]
+            assert book.outbid == (history[-1 - count] if len(history) > count else None)
+            assert book.min_bid(1000, 100) == (history[-count][0] + 100 if len(history) >= count else 1000)
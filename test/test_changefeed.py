@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from HAL9666.lib.changefeed import ChangeLog, InventoryChange, diff_inventories
+from HAL9666.lib.inventory_store import InventoryStoreBuilder
+
+FIRST = [
+    ("Kindling", "C", "UV-351a", 200),
+    ("Felmer", "C", "UV-351a", 150),
+    ("Felmer", "WCB", "UV-351a", 1),
+    ("Gilith", "H2O", "KW-688c", 50),
+]
+SECOND = [
+    ("Kindling", "C", "UV-351a", 200),
+    ("Felmer", "C", "UV-351a", 100),
+    ("Felmer", "C", "KW-688c", 10),
+    ("Gilith", "H2O", "KW-688c", 50),
+]
+
+
+def build(rows, previous=None):
+    builder = InventoryStoreBuilder(previous)
+    for row in rows:
+        builder.add(*row)
+    return builder.build()
+
+
+def test_diff_with_shared_ids():
+    first = build(FIRST)
+    second = build(SECOND, first)
+
+    assert sorted(diff_inventories(first, second)) == [
+        ("Felmer", "C", "KW-688c", 0, 10),
+        ("Felmer", "C", "UV-351a", 150, 100),
+        ("Felmer", "WCB", "UV-351a", 1, 0),
+    ]
+    assert diff_inventories(second, build(SECOND, second)) == []
+
+
+def test_diff_without_shared_ids():
+    # e.g. a snapshot from another process, ids are compared by name
+    first = build(FIRST)
+    second = build(list(reversed(SECOND)))
+
+    assert sorted(diff_inventories(first, second)) == [
+        ("Felmer", "C", "KW-688c", 0, 10),
+        ("Felmer", "C", "UV-351a", 150, 100),
+        ("Felmer", "WCB", "UV-351a", 1, 0),
+    ]
+
+
+def test_diff_sums_duplicate_rows():
+    first = build([("Felmer", "C", "UV-351a", 100), ("Felmer", "C", "UV-351a", 50)])
+    assert diff_inventories(first, build([("Felmer", "C", "UV-351a", 150)], first)) == []
+
+
+def test_change_log_hooks():
+    log = ChangeLog(maxlen=3)
+    now = datetime.now()
+    seen = []
+    unsubscribe = log.subscribe(seen.append, tickers=["C"], min_delta=40)
+    log.publish(
+        [
+            InventoryChange("1", "Felmer", "C", "UV-351a", 150, 100, now),
+            InventoryChange("1", "Felmer", "C", "KW-688c", 10, 20, now),
+            InventoryChange("1", "Felmer", "C", "KW-688c", 0, 10, now),
+            InventoryChange("1", "Felmer", "WCB", "UV-351a", 1, 0, now),
+        ]
+    )
+
+    # changed by more than 40, and appeared; the small change and the unwatched ticker are left out
+    assert [(c.before, c.after) for c in seen[0]] == [(150, 100), (0, 10)]
+    # bounded
+    assert len(log.changes) == 3
+
+    unsubscribe()
+    log.publish([InventoryChange("1", "Felmer", "C", "UV-351a", 100, 0, now)])
+    assert len(seen) == 1
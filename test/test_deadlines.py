@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from HAL9666.lib.deadlines import DeadlineScheduler
+
+
+def after(ms: float) -> datetime:
+    return datetime.now() + timedelta(milliseconds=ms)
+
+
+def recording_scheduler(fired: "asyncio.Queue") -> DeadlineScheduler:
+    async def on_deadline(key):
+        fired.put_nowait((key, datetime.now()))
+
+    return DeadlineScheduler(on_deadline)
+
+
+async def next_fired(fired: "asyncio.Queue") -> str:
+    key, _ = await asyncio.wait_for(fired.get(), timeout=5)
+    return key
+
+
+@pytest.mark.asyncio
+async def test_deadlines_fire_in_order_and_never_early():
+    fired: asyncio.Queue = asyncio.Queue()
+    scheduler = recording_scheduler(fired)
+    scheduler.start()
+    deadlines = {"b": after(60), "a": after(30), "c": after(90)}
+    for key, deadline in deadlines.items():
+        scheduler.schedule(key, deadline)
+
+    results = [await asyncio.wait_for(fired.get(), timeout=5) for _ in deadlines]
+    await scheduler.stop()
+
+    assert [key for key, _ in results] == ["a", "b", "c"]
+    assert all(when >= deadlines[key] for key, when in results)
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_moved_and_cancelled_deadlines():
+    fired: asyncio.Queue = asyncio.Queue()
+    scheduler = recording_scheduler(fired)
+    scheduler.start()
+    scheduler.schedule("extended", after(20))
+    scheduler.schedule("stopped", after(20))
+    scheduler.schedule("extended", after(400))
+    scheduler.cancel("stopped")
+    assert scheduler.deadline("extended") is not None and "stopped" not in scheduler
+
+    # past the old deadlines, the scheduler now sleeps until the extended one
+    await asyncio.sleep(0.05)
+    assert fired.empty()
+    # an earlier deadline wakes it up
+    scheduler.schedule("new", after(5))
+    assert await next_fired(fired) == "new"
+    assert await next_fired(fired) == "extended"
+    await scheduler.stop()
+    assert fired.empty()
+
+
+@pytest.mark.asyncio
+async def test_failing_handler_keeps_the_scheduler_running():
+    fired: asyncio.Queue = asyncio.Queue()
+
+    async def on_deadline(key):
+        fired.put_nowait((key, datetime.now()))
+        if key == "first":
+            raise RuntimeError("boom")
+
+    scheduler = DeadlineScheduler(on_deadline)
+    scheduler.start()
+    scheduler.schedule("first", after(5))
+    scheduler.schedule("second", after(10))
+    assert [await next_fired(fired), await next_fired(fired)] == ["first", "second"]
+    await scheduler.stop()
@@ -1,16 +1,35 @@
+import asyncio
 import csv
 import io
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, AsyncMock, patch
 
+import httpx
 import pytest
 
-from HAL9666.lib.inventory import whohas, SellerData
+from HAL9666.lib import inventory, snapshot
+from HAL9666.lib.inventory import whohas, Freshness, GroupInventory, InventoryRegistry, SellerData
+from HAL9666.lib.ratelimit import RateLimiter
+from HAL9666.lib.registry import parse_inventory_config
+
+
+@pytest.fixture(autouse=True)
+def unthrottled_fio(monkeypatch):
+    monkeypatch.setattr(inventory, "FioRateLimiter", RateLimiter(rate=1000, capacity=1000))
+    monkeypatch.setattr(inventory, "RetryBaseDelay", 0.001)
+    monkeypatch.setattr(inventory, "MinRefreshInterval", 0)
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshot, "SnapshotDir", str(tmp_path))
+    return tmp_path
 
 
 @pytest.mark.asyncio
-@patch("HAL9666.lib.inventory.AsyncClient")
+@patch("HAL9666.lib.inventory.get_http_client")
 @patch("HAL9666.lib.inventory.CachedSellersData")
-async def test_inventory(mock_seller_data, async_client):
+async def test_inventory(mock_seller_data, get_http_client):
     general_csv_stream = create_csv(
         [
             {
@@ -30,12 +49,11 @@ async def test_inventory(mock_seller_data, async_client):
     fake_fio_response.status_code = 200
     fake_fio_response.text = general_csv_stream
 
-    http_client = MagicMock()
-    http_client.get = AsyncMock(return_value=fake_fio_response)
+    http_client = fake_fio_client(fake_fio_response)
 
-    async_client.return_value.__aenter__.return_value = http_client
+    get_http_client.return_value = http_client
 
-    mock_seller_data.update = AsyncMock()
+    mock_seller_data.refresh = AsyncMock()
     mock_seller_data.get_sellers_for_ticker = MagicMock(return_value={"Kindling": [], "Felmer": [], "Gilith": []})
 
     inv, last_updated = await whohas(AsyncMock(), "C", forceUpdate=True)
@@ -96,9 +114,9 @@ async def test_inventory(mock_seller_data, async_client):
 
 
 @pytest.mark.asyncio
-@patch("HAL9666.lib.inventory.AsyncClient")
+@patch("HAL9666.lib.inventory.get_http_client")
 @patch("HAL9666.lib.inventory.CachedSellersData")
-async def test_pos_filter(mock_seller_data, async_client):
+async def test_pos_filter(mock_seller_data, get_http_client):
     # when someone has set POS filter, we should only list the amounts from those locations
     seller_data = {
         "Kindling": ["UV-351a", "KW-688c"],
@@ -106,7 +124,7 @@ async def test_pos_filter(mock_seller_data, async_client):
         "Gilith": [],
     }
 
-    mock_seller_data.update = AsyncMock()
+    mock_seller_data.refresh = AsyncMock()
     mock_seller_data.get_sellers_for_ticker = MagicMock(return_value=seller_data)
 
     csv_stream = create_csv(
@@ -148,10 +166,9 @@ async def test_pos_filter(mock_seller_data, async_client):
     fio_response.status_code = 200
     fio_response.text = csv_stream
 
-    http_client = MagicMock()
-    http_client.get = AsyncMock(return_value=fio_response)
+    http_client = fake_fio_client(fio_response)
 
-    async_client.return_value.__aenter__.return_value = http_client
+    get_http_client.return_value = http_client
 
     inv, last_updated = await whohas(MagicMock(), "C", False, forceUpdate=True)
 
@@ -198,6 +215,475 @@ async def test_sellerdata():
     assert len(sellers) == 1
 
 
+@pytest.mark.asyncio
+async def test_sellerdata_malformed_rows(caplog):
+    csv_data = [
+        {"MAT": "C", "Seller": "Kindling", "POS": "KW-688c, UV-351a,", "Price/u": "300"},
+        {"MAT": "", "Seller": "Felmer", "POS": "", "Price/u": "300"},
+        {"MAT": "WCB", "Seller": "", "POS": "UV-351a", "Price/u": "300000"},
+    ]
+
+    fake_sheets_response = MagicMock()
+    fake_sheets_response.status_code = 200
+    fake_sheets_response.text = create_csv(csv_data)
+
+    client = MagicMock()
+    client.get = AsyncMock(return_value=fake_sheets_response)
+    seller_data = SellerData()
+    await seller_data.update(client)
+
+    assert seller_data.get_sellers_for_ticker("C") == {"KINDLING": ["KW-688c", "UV-351a"]}
+    assert seller_data.get_sellers_for_ticker("WCB") == {}
+    assert "Skipped 2 seller sheet rows" in caplog.text
+    assert "[3, 4]" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_find_in_inventory_return_all():
+    csv_stream = create_csv(
+        [
+            {"Username": "Kindling", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"},
+            {"Username": "Felmer", "Ticker": "C", "Amount": "150", "NaturalId": "UV-351a"},
+            {"Username": "Felmer", "Ticker": "C", "Amount": "150", "NaturalId": "KW-688c"},
+            {"Username": "Felmer", "Ticker": "WCB", "Amount": "1", "NaturalId": "UV-351a"},
+        ]
+    )
+    fio_response = MagicMock()
+    fio_response.status_code = 200
+    fio_response.text = csv_stream
+    client = fake_fio_client(fio_response)
+
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+    await group.update(client)
+
+    inv = group.findInInventory("C", SellerData(), shouldReturnAll=True)
+    assert [(x.user, x.getTotal()) for x in inv] == [("Felmer", 300), ("Kindling", 200)]
+    assert group.findInInventory("C", SellerData()) == []
+    assert group.findInInventory("H2O", SellerData(), shouldReturnAll=True) == []
+
+
+@pytest.mark.asyncio
+async def test_conditional_refresh():
+    csv_stream = create_csv(
+        [{"Username": "Kindling", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"}]
+    )
+    fio_response = MagicMock()
+    fio_response.status_code = 200
+    fio_response.text = csv_stream
+    fio_response.headers = {"ETag": '"v1"'}
+    client = fake_fio_client(fio_response)
+
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+    await group.update(client)
+    assert group.changed
+    first_update = group.last_updated
+
+    # upstream supports validators
+    fio_response.status_code = 304
+    await group.update(client)
+    assert client.requests[-1].headers["If-None-Match"] == '"v1"'
+    assert not group.changed
+    assert group.last_updated > first_update
+    assert group.last_changed == first_update
+    assert group.findInInventory("C", SellerData(), shouldReturnAll=True)[0].getTotal() == 200
+
+    # upstream ignores validators, the body hash catches it
+    fio_response.status_code = 200
+    fio_response.headers = {}
+    inventory = group.inventory
+    await group.update(client)
+    assert not group.changed
+    assert group.inventory is inventory
+
+    fio_response.text = create_csv(
+        [{"Username": "Kindling", "Ticker": "C", "Amount": "100", "NaturalId": "UV-351a"}]
+    )
+    await group.update(client)
+    assert group.changed
+    assert "If-None-Match" not in client.requests[-1].headers
+    assert group.findInInventory("C", SellerData(), shouldReturnAll=True)[0].getTotal() == 100
+
+
+@pytest.mark.asyncio
+async def test_streamed_update():
+    csv_bytes = create_csv(
+        [
+            {"Username": "Zoë", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"},
+            {"Username": "Zoë", "Ticker": "C", "Amount": "50", "NaturalId": "KW-688c"},
+            {"Username": "Felmer", "Ticker": "WCB", "Amount": "3", "NaturalId": "UV-351a"},
+        ]
+    ).encode()
+
+    async def chunks():
+        # small chunks, so rows and the multi-byte character get split between them
+        for i in range(0, len(csv_bytes), 7):
+            yield csv_bytes[i : i + 7]
+
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=chunks()))
+    )
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+    await group.update(client)
+
+    assert group.inventory.to_dict() == {
+        "Zoë": {"C": [("UV-351a", 200), ("KW-688c", 50)]},
+        "Felmer": {"WCB": [("UV-351a", 3)]},
+    }
+
+
+@pytest.mark.asyncio
+async def test_unchanged_body_not_parsed():
+    def body(amount):
+        async def chunks():
+            yield create_csv([{"Username": "Kindling", "Ticker": "C", "Amount": amount, "NaturalId": "UV-351a"}]).encode()
+
+        return chunks()
+
+    store, body_hash, _ = await inventory._read_inventory_csv(body("200"))
+    with patch.object(inventory.InventoryStoreBuilder, "add", side_effect=AssertionError("parsed")):
+        unchanged, same_hash, _ = await inventory._read_inventory_csv(body("200"), store, body_hash)
+    assert unchanged is None
+    assert same_hash == body_hash
+
+    changed, _, _ = await inventory._read_inventory_csv(body("100"), store, body_hash)
+    assert changed.to_dict() == {"Kindling": {"C": [("UV-351a", 100)]}}
+
+
+@pytest.mark.asyncio
+async def test_retry_after_throttling():
+    csv_text = create_csv(
+        [{"Username": "Kindling", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"}]
+    )
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0.01"}),
+        httpx.Response(429),
+        httpx.Response(200, text=csv_text),
+    ]
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))
+
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+    await group.update(client)
+
+    assert group.retries == 2
+    assert group.findInInventory("C", SellerData(), shouldReturnAll=True)[0].getTotal() == 200
+    assert inventory.FioRateLimiter.rate < 1000
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted(monkeypatch):
+    monkeypatch.setattr(inventory, "MaxFioRetries", 2)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(429)))
+
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+    with pytest.raises(Exception, match="Retries exhausted"):
+        await group.update(client)
+    assert group.retries == 3
+    assert not group.is_initialized()
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client():
+    async with inventory.inventory_http_client() as client:
+        assert inventory.get_http_client() is client
+    assert client.is_closed
+    assert inventory.http_client is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_coalesce(monkeypatch):
+    monkeypatch.setattr(inventory, "MinRefreshInterval", 60)
+    csv_text = create_csv(
+        [{"Username": "Kindling", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"}]
+    )
+    requests = []
+
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, text=csv_text)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+
+    results = await asyncio.gather(*(group.refresh(client) for _ in range(5)))
+    assert results == [True] * 5
+    assert len(requests) == 1
+    assert group.is_initialized()
+
+    # too soon after the last one, doesn't reach FIO
+    assert not await group.refresh(client)
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_publishes_changes(monkeypatch):
+    changes = inventory.ChangeLog()
+    monkeypatch.setattr(inventory, "InventoryChanges", changes)
+    seen = []
+    changes.subscribe(seen.append, tickers=["C"])
+    fake_response = MagicMock()
+    fake_response.status_code = 200
+    fake_response.text = create_csv([{"Username": "Kindling", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"}])
+    client = fake_fio_client(fake_response)
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+
+    # the first load is not a change
+    await group.update(client)
+    assert seen == []
+
+    fake_response.text = create_csv([{"Username": "Kindling", "Ticker": "H2O", "Amount": "5", "NaturalId": "UV-351a"}])
+    await group.update(client)
+    assert [(c.user, c.ticker, c.location, c.before, c.after, c.ran_out) for c in seen[0]] == [
+        ("Kindling", "C", "UV-351a", 200, 0, True)
+    ]
+    assert len(changes.changes) == 2
+
+
+@pytest.mark.asyncio
+async def test_warm_start_from_snapshot():
+    csv_text = create_csv(
+        [{"Username": "Kindling", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"}]
+    )
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, text=csv_text))
+    )
+    group = GroupInventory(group_id="1", group_name="test", api_key="")
+    await group.update(client)
+
+    # after a restart
+    restarted = GroupInventory(group_id="1", group_name="test", api_key="")
+    assert restarted.load_snapshot()
+    assert restarted.is_initialized()
+    assert restarted.stale
+    assert restarted.last_updated == group.last_updated
+    assert restarted.findInInventory("C", SellerData(), shouldReturnAll=True)[0].getTotal() == 200
+
+    # same body, so the refresh confirms the snapshot without rebuilding
+    await restarted.update(client)
+    assert not restarted.stale
+    assert not restarted.changed
+
+    # and the next restart knows the data was confirmed then
+    again = GroupInventory(group_id="1", group_name="test", api_key="")
+    assert again.load_snapshot()
+    assert again.last_updated == restarted.last_updated > group.last_updated
+    assert again.last_changed == group.last_updated
+
+    assert not GroupInventory(group_id="2", group_name="other", api_key="").load_snapshot()
+
+
+@pytest.mark.asyncio
+async def test_sellerdata_snapshot():
+    csv_data = [{"MAT": "C", "Seller": "Kindling", "POS": "KW-688c", "Price/u": "300"}]
+    fake_sheets_response = MagicMock()
+    fake_sheets_response.status_code = 200
+    fake_sheets_response.text = create_csv(csv_data)
+    client = MagicMock()
+    client.get = AsyncMock(return_value=fake_sheets_response)
+    await SellerData().update(client)
+
+    restarted = SellerData()
+    assert restarted.load_snapshot()
+    assert restarted.stale
+    assert restarted.get_sellers_for_ticker("C") == {"KINDLING": ["KW-688c"]}
+
+
+@pytest.mark.asyncio
+async def test_whohas_stale_while_revalidate(monkeypatch):
+    registry = InventoryRegistry(
+        parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True, "soft_ttl": 60, "hard_ttl": 600}]})
+    )
+    monkeypatch.setattr(inventory, "InventoryGroups", registry)
+    sellers = SellerData()
+    sellers.last_updated = datetime.now()
+    monkeypatch.setattr(inventory, "CachedSellersData", sellers)
+    amount = {"value": "200"}
+    fio_released = asyncio.Event()
+    fio_released.set()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await fio_released.wait()
+        return httpx.Response(
+            200, text=create_csv([{"Username": "Kindling", "Ticker": "C", "Amount": amount["value"], "NaturalId": "UV-351a"}])
+        )
+
+    monkeypatch.setattr(inventory, "get_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    group = registry.default
+
+    # nothing cached, has to wait for FIO
+    answer = await whohas(MagicMock(), "C", shouldReturnAll=True)
+    assert answer.freshness == Freshness.REFRESHED
+    assert answer[0][0].getTotal() == 200
+
+    answer = await whohas(MagicMock(), "C", shouldReturnAll=True)
+    assert answer.freshness == Freshness.FRESH
+
+    # past the soft TTL, the old data is served without waiting for the slow FIO
+    fio_released.clear()
+    amount["value"] = "300"
+    group.last_updated = datetime.now() - timedelta(seconds=120)
+    answer = await asyncio.wait_for(whohas(MagicMock(), "C", shouldReturnAll=True), 1)
+    assert answer.freshness == Freshness.REVALIDATING
+    assert answer[0][0].getTotal() == 200
+    fio_released.set()
+    await asyncio.gather(*inventory._background_refreshes)
+    assert group.findInInventory("C", sellers, shouldReturnAll=True)[0].getTotal() == 300
+
+    # past the hard TTL FIO is waited for, and its failure reported
+    group.last_updated = datetime.now() - timedelta(seconds=1200)
+    monkeypatch.setattr(
+        inventory, "get_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(500)))
+    )
+    answer = await whohas(MagicMock(), "C", shouldReturnAll=True)
+    assert answer.freshness == Freshness.REFRESH_FAILED
+    assert answer[0][0].getTotal() == 300
+
+    # snapshot data past the hard TTL is still served right away after a restart
+    group.stale = True
+    answer = await asyncio.wait_for(whohas(MagicMock(), "C", shouldReturnAll=True), 1)
+    assert answer.freshness == Freshness.REVALIDATING
+    assert answer.stale
+    await asyncio.gather(*inventory._background_refreshes, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_whohas_skipped_refresh_is_fresh(monkeypatch):
+    registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+    monkeypatch.setattr(inventory, "InventoryGroups", registry)
+    monkeypatch.setattr(inventory, "CachedSellersData", SellerData())
+    monkeypatch.setattr(inventory, "MinRefreshInterval", 60)
+    csv_text = create_csv([{"Username": "Kindling", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"}])
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return httpx.Response(200, text=csv_text)
+
+    monkeypatch.setattr(inventory, "get_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(respond)))
+    monkeypatch.setattr(registry.default, "_fio_url", "https://fio/csv/inventory")
+    assert (await whohas(MagicMock(), "C", forceUpdate=True)).freshness == Freshness.REFRESHED
+    # forced again right away, FIO isn't asked and the answer doesn't claim it was
+    assert (await whohas(MagicMock(), "C", forceUpdate=True)).freshness == Freshness.FRESH
+    assert [request.url.host for request in requests].count("fio") == 1
+
+
+@pytest.mark.asyncio
+async def test_whohas_query(monkeypatch):
+    registry = InventoryRegistry(
+        parse_inventory_config(
+            {
+                "categories": {"crew_quarters": ["CQS", "CQM"]},
+                "groups": [{"id": "1", "api_key": "", "default": True}],
+            }
+        )
+    )
+    monkeypatch.setattr(inventory, "InventoryGroups", registry)
+    sellers = SellerData()
+    # recent enough that whohas doesn't refresh it from the sheet
+    sellers.last_updated = datetime.now()
+    monkeypatch.setattr(inventory, "CachedSellersData", sellers)
+    csv_text = create_csv(
+        [
+            {"Username": "Kindling", "Ticker": "CQM", "Amount": "4", "NaturalId": "UV-351a"},
+            {"Username": "Felmer", "Ticker": "CQL", "Amount": "2", "NaturalId": "UV-351a"},
+            {"Username": "Felmer", "Ticker": "C", "Amount": "2", "NaturalId": "UV-351a"},
+        ]
+    )
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=csv_text)))
+    await registry.default.update(client)
+
+    assert registry.is_multi_ticker("cq*") and registry.is_multi_ticker("Crew_Quarters")
+    assert not registry.is_multi_ticker("CQM")
+    answers = await inventory.whohas_query(MagicMock(), "cq*", shouldReturnAll=True)
+    assert [(ticker, [u.user for u in result]) for ticker, (result, _) in answers] == [
+        ("CQL", ["Felmer"]),
+        ("CQM", ["Kindling"]),
+    ]
+    answers = await inventory.whohas_query(MagicMock(), "crew_quarters", shouldReturnAll=True)
+    assert [(ticker, len(result)) for ticker, (result, _) in answers] == [("CQS", 0), ("CQM", 1)]
+    # one revalidation per group and query, however many tickers it resolves to
+    assert registry.schedules["1"].queries == 2
+
+    # the index follows the inventory swapped in by a refresh
+    index = registry.ticker_index()
+    assert registry.ticker_index() is index
+    csv_text = create_csv([{"Username": "Felmer", "Ticker": "CQT", "Amount": "1", "NaturalId": "UV-351a"}])
+    await registry.default.update(client)
+    assert registry.resolve("CQ*") == ["CQT"]
+
+
+@pytest.mark.asyncio
+async def test_whohas_batch(monkeypatch):
+    registry = InventoryRegistry(
+        parse_inventory_config(
+            {
+                "categories": {"crew_quarters": ["CQS", "CQM"], "bridges": ["BR1"]},
+                "groups": [
+                    {"id": "1", "api_key": "", "categories": ["crew_quarters", "bridges"]},
+                    {"id": "2", "api_key": "", "default": True},
+                ],
+            }
+        )
+    )
+    monkeypatch.setattr(inventory, "InventoryGroups", registry)
+    sellers = SellerData()
+    sellers._sellers_by_ticker = {"CQM": {"KINDLING": ["KW-688c"]}, "C": {"FELMER": []}}
+    sellers.last_updated = datetime.now()
+    monkeypatch.setattr(inventory, "CachedSellersData", sellers)
+    csvs = {
+        "1": create_csv(
+            [
+                {"Username": "KINDLING", "Ticker": "CQM", "Amount": "4", "NaturalId": "UV-351a"},
+                {"Username": "KINDLING", "Ticker": "CQM", "Amount": "1", "NaturalId": "KW-688c"},
+                {"Username": "FELMER", "Ticker": "BR1", "Amount": "1", "NaturalId": "UV-351a"},
+            ]
+        ),
+        "2": create_csv([{"Username": "FELMER", "Ticker": "C", "Amount": "2000", "NaturalId": "UV-351a"}]),
+    }
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, text=csvs[request.url.params["group"]]))
+    )
+    monkeypatch.setattr(inventory, "get_http_client", lambda: client)
+
+    answer = await inventory.whohas_batch(MagicMock(), ["ship", "C"], shouldReturnAll=True)
+    assert answer.tickers == ["CQS", "CQM", "BR1", "C"]
+    assert answer.freshness == Freshness.REFRESHED
+    assert answer.holdings == {"KINDLING": {"CQM": 5}, "FELMER": {"BR1": 1, "C": 2000}}
+    assert answer.users() == ["FELMER", "KINDLING"]
+    assert answer.totals["CQM"] == 5
+    assert answer.top_locations["CQM"] == ("UV-351a", 4)
+    assert answer.format_matrix() == [
+        "```\n"
+        "         CQS CQM BR1    C\n"
+        "FELMER     .   .   1 2000\n"
+        "KINDLING   .   5   .    .\n"
+        "Total      .   5   1 2000\n"
+        "```"
+    ]
+
+    # sellers only, with their POS filter
+    answer = await inventory.whohas_batch(MagicMock(), ["CQ*", "C"])
+    assert answer.freshness == Freshness.FRESH
+    assert answer.holdings == {"KINDLING": {"CQM": 1}, "FELMER": {"C": 2000}}
+    # split by columns, then by rows to fit the message limit
+    blocks = answer.format_matrix(columns=1, limit=40)
+    assert len(blocks) == 4 and all(len(block) <= 40 for block in blocks)
+
+
+def fake_fio_client(fake_response: MagicMock) -> httpx.AsyncClient:
+    """httpx client that streams whatever status, text and headers fake_response holds at request time"""
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        headers = fake_response.headers if isinstance(fake_response.headers, dict) else {}
+        return httpx.Response(fake_response.status_code, headers=headers, text=fake_response.text)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.requests = requests  # type: ignore[attr-defined]
+    return client
+
+
 def create_csv(csv_data: list[dict[str, str]]) -> str:
     if len(csv_data) < 1:
         raise ValueError("List must have atleast 1 entry")
@@ -209,3 +695,81 @@ def create_csv(csv_data: list[dict[str, str]]) -> str:
         general_csv_writer.writerow(row)
 
     return csv_stream.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_worth(monkeypatch, snapshot_dir):
+    registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+    monkeypatch.setattr(inventory, "InventoryGroups", registry)
+    monkeypatch.setattr(inventory, "CachedPrices", inventory.CxPrices())
+    monkeypatch.setattr(inventory, "_valuations", {})
+    offers = [{"MaterialTicker": "C", "ExchangeCode": "AI1", "Bid": 100.0, "Ask": 120.0, "PriceAverage": 110.0}]
+    body = create_csv([{"Username": "KINDLING", "Ticker": "C", "Amount": "4", "NaturalId": "UV-351a"}])
+    requests = []
+
+    def respond(request):
+        requests.append(request.url.path)
+        if request.url.path == "/exchange/all":
+            return httpx.Response(200, json=offers)
+        return httpx.Response(200, text=body)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+    monkeypatch.setattr(inventory, "get_http_client", lambda: client)
+    await registry.default.update(client)
+
+    valuation = await inventory.worth(MagicMock())
+    assert (valuation.cx, valuation.kind) == ("AI1", "average")
+    assert valuation.by_user == {"KINDLING": 440.0}
+    assert requests.count("/exchange/all") == 1
+    # cached until the inventory or the prices are replaced
+    assert await inventory.worth(MagicMock()) is valuation
+    assert requests.count("/exchange/all") == 1
+    assert inventory.valuation("ai1", "bid").total == 400.0
+
+    await inventory.CachedPrices.update(client)
+    assert inventory.valuation() is not valuation
+
+    restarted = inventory.CxPrices()
+    assert restarted.load_snapshot()
+    assert restarted.stale
+    assert restarted.table.price_list("AI1", "ask") == {"C": 120.0}
+
+
+@pytest.mark.asyncio
+async def test_whohas_by_jumps(monkeypatch):
+    from HAL9666.lib.jumps import build_jump_table
+
+    systems = [
+        {"SystemId": "s1", "NaturalId": "UV-351", "Connections": [{"ConnectingId": "s2"}]},
+        {"SystemId": "s2", "NaturalId": "UV-796", "Connections": [{"ConnectingId": "s1"}, {"ConnectingId": "s3"}]},
+        {"SystemId": "s3", "NaturalId": "XK-745", "Connections": [{"ConnectingId": "s2"}]},
+    ]
+    planets = [{"PlanetNaturalId": p} for p in ("UV-351a", "UV-796b", "XK-745b")]
+    monkeypatch.setattr(inventory, "_jump_table", build_jump_table(systems, planets))
+    monkeypatch.setattr(inventory, "_jump_table_loaded", True)
+    registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+    monkeypatch.setattr(inventory, "InventoryGroups", registry)
+    body = create_csv(
+        [
+            {"Username": "KINDLING", "Ticker": "C", "Amount": "500", "NaturalId": "UV-351a"},
+            {"Username": "FELMER", "Ticker": "C", "Amount": "10", "NaturalId": "UV-796b"},
+            {"Username": "FELMER", "Ticker": "C", "Amount": "100", "NaturalId": "UV-351a"},
+            {"Username": "GILITH", "Ticker": "C", "Amount": "1", "NaturalId": "ZZ-001a"},
+        ]
+    )
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body)))
+    await registry.default.update(client)
+    sellers = SellerData()
+    sellers.last_updated = datetime.now()
+    monkeypatch.setattr(inventory, "CachedSellersData", sellers)
+
+    result, _ = await whohas(MagicMock(), "C", shouldReturnAll=True, destination="XK-745b")
+    assert [(userInv.user, userInv.inventory, userInv.nearestJumps()) for userInv in result] == [
+        ("FELMER", [("UV-796b", 10), ("UV-351a", 100)], 1),
+        ("KINDLING", [("UV-351a", 500)], 2),
+        ("GILITH", [("ZZ-001a", 1)], None),
+    ]
+    assert result[0].toStrSummed() == "FELMER has 110 C, nearest at UV-796b (1 jumps)"
+
+    with pytest.raises(ValueError):
+        await whohas(MagicMock(), "C", shouldReturnAll=True, destination="Somewhere")
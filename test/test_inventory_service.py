@@ -0,0 +1,86 @@
+import asyncio
+import csv
+import io
+from datetime import datetime
+
+import httpx
+import pytest
+
+from HAL9666.lib import inventory, inventory_client, snapshot
+from HAL9666.lib.inventory import InventoryRegistry, SellerData
+from HAL9666.lib.inventory_service import parse_address, start_inventory_service
+from HAL9666.lib.registry import parse_inventory_config
+
+ROWS = [
+    {"Username": "KINDLING", "Ticker": "C", "Amount": "200", "NaturalId": "UV-351a"},
+    {"Username": "FELMER", "Ticker": "C", "Amount": "100", "NaturalId": "KW-688c"},
+    {"Username": "FELMER", "Ticker": "CQM", "Amount": "2", "NaturalId": "KW-688c"},
+]
+
+
+async def cache_inventory(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshot, "SnapshotDir", str(tmp_path))
+    registry = InventoryRegistry(parse_inventory_config({"groups": [{"id": "1", "api_key": "", "default": True}]}))
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, list(ROWS[0]))
+    writer.writeheader()
+    writer.writerows(ROWS)
+    fio = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=stream.getvalue())))
+    await registry.default.update(fio)
+    sellers = SellerData()
+    sellers._sellers_by_ticker = {"C": {"FELMER": []}}
+    sellers.last_updated = datetime.now()
+    monkeypatch.setattr(inventory, "InventoryGroups", registry)
+    monkeypatch.setattr(inventory, "CachedSellersData", sellers)
+    monkeypatch.setattr(inventory, "print", lambda *args: None, raising=False)
+
+
+async def check_round_trip():
+    local = await inventory.whohas(None, "C", shouldReturnAll=True)
+    remote = await inventory_client.whohas(None, "C", shouldReturnAll=True)
+    assert remote == local
+    assert remote.freshness == local.freshness
+    assert remote.stale == local.stale
+
+    holders, _ = await inventory_client.whohas(None, "C")
+    assert [userInv.toStr() for userInv in holders] == ["FELMER has 100 C"]
+
+    answers = await inventory_client.whohas_query(None, "C*", shouldReturnAll=True)
+    assert [ticker for ticker, _ in answers] == ["C", "CQM"]
+
+    batch = await inventory_client.whohas_batch(None, ["C", "CQM"], shouldReturnAll=True)
+    assert batch == await inventory.whohas_batch(None, ["C", "CQM"], shouldReturnAll=True)
+
+    with pytest.raises(ValueError):
+        await inventory_client.whohas(None, "C", destination="Somewhere")
+
+
+@pytest.mark.asyncio
+async def test_service_over_http(monkeypatch, tmp_path):
+    await cache_inventory(monkeypatch, tmp_path)
+    monkeypatch.setattr(inventory_client, "service_client", None)
+    server = await start_inventory_service("http://127.0.0.1:0")
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        async with inventory_client.inventory_service_client(f"http://127.0.0.1:{port}"):
+            await check_round_trip()
+        # let the server see the client hang up
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_service_over_unix_socket(monkeypatch, tmp_path):
+    await cache_inventory(monkeypatch, tmp_path)
+    monkeypatch.setattr(inventory_client, "service_client", None)
+    address = f"unix://{tmp_path}/inventory.sock"
+    async with await start_inventory_service(address):
+        async with inventory_client.inventory_service_client(address):
+            await check_round_trip()
+        await asyncio.sleep(0.01)
+
+
+def test_parse_address():
+    assert parse_address("http://127.0.0.1:9467") == ("tcp", ("127.0.0.1", 9467))
+    assert parse_address("unix:///run/inventory.sock") == ("unix", "/run/inventory.sock")
+    with pytest.raises(ValueError):
+        parse_address("127.0.0.1:9467")
@@ -0,0 +1,86 @@
+import pickle
+
+from HAL9666.lib.inventory_store import InventoryStoreBuilder
+
+
+def build(rows):
+    builder = InventoryStoreBuilder()
+    for row in rows:
+        builder.add(*row)
+    return builder.build()
+
+
+def test_holders_largest_total_first():
+    store = build(
+        [
+            ("Kindling", "C", "UV-351a", 200),
+            ("Felmer", "C", "UV-351a", 150),
+            ("Felmer", "WCB", "UV-351a", 1),
+            ("Felmer", "C", "KW-688c", 150),
+        ]
+    )
+
+    assert list(store.holders("C")) == [
+        ("Felmer", [("UV-351a", 150), ("KW-688c", 150)], 300),
+        ("Kindling", [("UV-351a", 200)], 200),
+    ]
+    assert list(store.holders("H2O")) == []
+    assert sorted(store.tickers()) == ["C", "WCB"]
+    assert len(store) == 4
+
+
+def test_string_ids_stable_between_refreshes():
+    first = build([("Kindling", "C", "UV-351a", 200)])
+    builder = InventoryStoreBuilder(first)
+    builder.add("Felmer", "WCB", "KW-688c", 1)
+    builder.add("Kindling", "C", "UV-351a", 100)
+    second = builder.build()
+
+    for name in ("Kindling", "C", "UV-351a"):
+        assert second.ids[name] == first.ids[name]
+    # the previous store is left untouched
+    assert "Felmer" not in first.ids
+    assert list(first.holders("C")) == [("Kindling", [("UV-351a", 200)], 200)]
+
+
+def test_departed_strings_compacted():
+    store = build([("Kindling", "C", "UV-351a", 200), ("Felmer", "WCB", "KW-688c", 1)])
+    # Felmer, WCB and KW-688c are gone, half of the table is dead
+    builder = InventoryStoreBuilder(store)
+    builder.add("Kindling", "C", "UV-351a", 100)
+    builder.add("Zoë", "C", "UV-351a", 50)
+    compacted = builder.build()
+
+    # the live strings keep their order
+    assert store.strings == ["C", "Kindling", "UV-351a", "WCB", "Felmer", "KW-688c"]
+    assert compacted.strings == ["C", "Kindling", "UV-351a", "Zoë"]
+    assert compacted.ids == {"C": 0, "Kindling": 1, "UV-351a": 2, "Zoë": 3}
+    assert compacted.to_dict() == {"Kindling": {"C": [("UV-351a", 100)]}, "Zoë": {"C": [("UV-351a", 50)]}}
+    assert [compacted.strings[user] for user in compacted.row_user] == ["Kindling", "Zoë"]
+
+
+def test_pickle_roundtrip():
+    store = build([("Kindling", "C", "UV-351a", 200), ("Felmer", "C", "UV-351a", 150)])
+    restored = pickle.loads(pickle.dumps(store))
+    assert restored.to_dict() == store.to_dict()
+    assert restored.ids == store.ids
+
+
+def test_aggregates():
+    store = build(
+        [
+            ("Kindling", "C", "UV-351a", 200),
+            ("Felmer", "C", "UV-351a", 150),
+            ("Felmer", "C", "KW-688c", 400),
+            ("Felmer", "WCB", "UV-351a", 1),
+        ]
+    )
+
+    assert store.ticker_total("C") == 750
+    assert store.location_totals("C") == [("KW-688c", 400), ("UV-351a", 350)]
+    assert store.top_location("C") == ("KW-688c", 400)
+    assert store.user_totals("C") == {"Felmer": 550, "Kindling": 200}
+    assert store.ticker_total("H2O") == 0 and store.location_totals("H2O") == [] and store.top_location("H2O") is None
+    # derived data is rebuilt after unpickling instead of being stored
+    restored = pickle.loads(pickle.dumps(store))
+    assert restored.location_totals("C") == store.location_totals("C")
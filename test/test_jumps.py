@@ -0,0 +1,40 @@
+from HAL9666.lib.jumps import build_jump_table, load_jump_table, save_jump_table
+
+# Benten - Promitor's system - Katoa's system, and a system nothing connects to
+SYSTEMS = [
+    {"SystemId": "s1", "NaturalId": "UV-351", "Name": "Benten", "Connections": [{"ConnectingId": "s2"}]},
+    {"SystemId": "s2", "NaturalId": "UV-796", "Name": "", "Connections": [{"ConnectingId": "s1"}, {"ConnectingId": "s3"}]},
+    {"SystemId": "s3", "NaturalId": "XK-745", "Name": "Katoa", "Connections": [{"ConnectingId": "s2"}]},
+    {"SystemId": "s4", "NaturalId": "ZZ-001", "Name": "Nowhere", "Connections": []},
+]
+PLANETS = [
+    {"PlanetNaturalId": "UV-351a", "PlanetName": "Bioko"},
+    {"PlanetNaturalId": "XK-745b", "PlanetName": "Katoa", "SystemId": "s3"},
+]
+STATIONS = [{"NaturalId": "BEN", "Name": "Benten Station", "ComexCode": "NC1", "SystemNaturalId": "UV-351"}]
+
+
+def test_jump_table():
+    table = build_jump_table(SYSTEMS, PLANETS, STATIONS)
+    assert len(table) == 4
+
+    row = table.distances_to("katoa")
+    assert row is not None
+    assert table.jumps("XK-745b", row) == 0
+    assert table.jumps("UV-796", row) == 1
+    assert table.jumps("BEN", row) == 2
+    assert table.jumps("bioko", row) == 2
+    assert table.jumps("NC1", row) == 2
+    assert table.jumps("ZZ-001", row) is None
+    assert table.jumps("Somewhere", row) is None
+    assert table.distances_to("Somewhere") is None
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "jumps.pickle")
+    assert load_jump_table(path) is None
+
+    save_jump_table(build_jump_table(SYSTEMS, PLANETS, STATIONS), path)
+    table = load_jump_table(path)
+    assert table is not None
+    assert table.jumps("Benten", table.distances_to("UV-351a")) == 0
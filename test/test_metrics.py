@@ -0,0 +1,60 @@
+import httpx
+import pytest
+
+from HAL9666.lib import snapshot
+from HAL9666.lib.inventory import GroupInventory
+from HAL9666.lib.metrics import Counter, Gauge, Histogram, start_metrics_server
+
+
+def test_render():
+    counter = Counter("test_requests_total", "Requests", ("group",))
+    counter.labels('say "hi"').inc()
+    counter.labels('say "hi"').inc(2)
+    gauge = Gauge("test_age_seconds", "Age")
+    gauge.labels().set_function(lambda: 1.5)
+    histogram = Histogram("test_duration_seconds", "Duration", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.labels().observe(value)
+
+    assert counter.render() == (
+        "# HELP test_requests_total Requests\n"
+        "# TYPE test_requests_total counter\n"
+        'test_requests_total{group="say \\"hi\\""} 3\n'
+    )
+    assert gauge.render().endswith("test_age_seconds 1.5\n")
+    assert histogram.render().splitlines()[2:] == [
+        'test_duration_seconds_bucket{le="0.1"} 2',
+        'test_duration_seconds_bucket{le="1"} 3',
+        'test_duration_seconds_bucket{le="+Inf"} 4',
+        "test_duration_seconds_sum 3.65",
+        "test_duration_seconds_count 4",
+    ]
+    with pytest.raises(ValueError):
+        Counter("test_requests_total", "Requests")
+    with pytest.raises(ValueError):
+        counter.labels()
+
+
+@pytest.mark.asyncio
+async def test_endpoint_serves_refresh_metrics(monkeypatch, tmp_path):
+    monkeypatch.setattr(snapshot, "SnapshotDir", str(tmp_path))
+    csv_text = "Username,Ticker,Amount,NaturalId\r\nKindling,C,200,UV-351a\r\n"
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=csv_text)))
+    await GroupInventory(group_id="1", group_name="metrics test", api_key="").update(client)
+
+    server = await start_metrics_server(port="0")
+    port = server.sockets[0].getsockname()[1]
+    try:
+        async with httpx.AsyncClient() as http:
+            response = await http.get(f"http://127.0.0.1:{port}/metrics")
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE whohas_stage_duration_seconds histogram" in response.text
+    assert 'inventory_parsed_rows_total{group="metrics test"} 1' in response.text
+    assert f'inventory_parsed_bytes_total{{group="metrics test"}} {len(csv_text)}' in response.text
+    assert 'inventory_refreshes_total{group="metrics test",outcome="changed"} 1' in response.text
+    assert 'inventory_refresh_duration_seconds_count{group="metrics test"} 1' in response.text
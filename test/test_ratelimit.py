@@ -0,0 +1,57 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from HAL9666.lib.ratelimit import MaxRetryAfter, RateLimiter, backoff_delay, parse_retry_after
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=100, capacity=2)
+    start = time.monotonic()
+    for _ in range(6):
+        await limiter.acquire()
+    # 2 from the burst capacity, the other 4 at 100/s
+    assert time.monotonic() - start >= 0.035
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_backs_off_and_recovers():
+    limiter = RateLimiter(rate=8, capacity=1, min_rate=1)
+    limiter.throttled()
+    limiter.throttled()
+    assert limiter.rate == 2
+    for _ in range(10):
+        limiter.succeeded()
+    assert limiter.rate == 8
+
+    limiter.throttled(retry_after=0.05)
+    start = time.monotonic()
+    await limiter.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+def test_rate_limiter_spaces_out_after_pause():
+    limiter = RateLimiter(rate=10, capacity=4)
+    limiter.throttled(retry_after=1)
+    # the rate is halved to 5/s, so after the pause one request goes right away and the others every 0.2s
+    delays = [limiter._reserve() for _ in range(4)]
+    assert [round(delay, 1) for delay in delays] == [1.0, 1.2, 1.4, 1.6]
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("inf") is None
+    assert parse_retry_after("nan") is None
+    assert parse_retry_after("-5") == 0
+    assert parse_retry_after("86400") == MaxRetryAfter
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+
+
+def test_backoff_delay():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.2, cap=5) <= 5
+    assert backoff_delay(0, base=0.2, cap=5, retry_after=3) == 3
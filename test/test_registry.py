@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from HAL9666.lib import scheduler
+from HAL9666.lib.inventory import InventoryRegistry
+from HAL9666.lib.registry import load_inventory_config, parse_inventory_config
+from HAL9666.lib.scheduler import AdaptiveInterval, RefreshScheduler
+
+CONFIG = {
+    "categories": {"bridges": ["BR1", "BR2"], "Cargo_Bays": ["SCB", "WCB"]},
+    "groups": [
+        {"id": "1", "name": "Shipyard", "api_key": "key", "categories": ["bridges", "CARGO_BAYS"], "refresh_interval": 600},
+        {"id": "2", "name": "Consumables", "api_key_env": "TEST_FIO_KEY", "tickers": ["rat", "DW"]},
+        {"id": "3", "name": "Everything else", "api_key": "key", "default": True},
+    ],
+}
+
+
+def test_routing(monkeypatch):
+    monkeypatch.setenv("TEST_FIO_KEY", "secret")
+    registry = InventoryRegistry(parse_inventory_config(CONFIG))
+
+    assert registry.route("WCB").group_name == "Shipyard"
+    assert registry.route("RAT").group_name == "Consumables"
+    assert registry.route("C").group_name == "Everything else"
+    assert registry.resolve("cargo_bays") == registry.resolve("Cargo_Bays") == ["SCB", "WCB"]
+    assert registry.route("RAT").api_key == "secret"
+    assert registry.refresh_intervals == {"1": 600, "2": 300, "3": 300}
+    assert registry.ttls["1"] == (1200, 3600)
+    assert (registry.schedules["1"].min_interval, registry.schedules["1"].max_interval) == (150, 3600)
+
+
+def test_invalid_configs():
+    with pytest.raises(ValueError, match="unknown category"):
+        parse_inventory_config({"groups": [{"id": "1", "categories": ["nope"], "default": True}]})
+    with pytest.raises(ValueError, match="routed to both"):
+        parse_inventory_config(
+            {"groups": [{"id": "1", "tickers": ["C"], "default": True}, {"id": "2", "tickers": ["C"]}]}
+        )
+    with pytest.raises(ValueError, match="hard_ttl"):
+        parse_inventory_config({"groups": [{"id": "1", "default": True, "soft_ttl": 600, "hard_ttl": 60}]})
+    with pytest.raises(ValueError, match="min_refresh_interval"):
+        parse_inventory_config({"groups": [{"id": "1", "default": True, "min_refresh_interval": 600}]})
+    with pytest.raises(ValueError, match="default"):
+        parse_inventory_config({"groups": [{"id": "1"}]})
+
+
+def test_bundled_config():
+    config = load_inventory_config()
+    registry = InventoryRegistry(config)
+    assert registry.route("WCB").group_id == "41707164"
+    assert registry.route("C").group_id == "83373923"
+
+
+class VirtualSleep:
+    """Stands in for asyncio.sleep: every task keeps its own clock, moved on by the delays it sleeps"""
+
+    def __init__(self) -> None:
+        self.clocks: dict[asyncio.Task, float] = {}
+
+    async def __call__(self, delay: float) -> None:
+        task = asyncio.current_task()
+        self.clocks[task] = self.clocks.get(task, 0.0) + delay
+        await asyncio.sleep(0)
+
+    def time(self) -> float:
+        return self.clocks.get(asyncio.current_task(), 0.0)
+
+
+async def run_until(schedule: RefreshScheduler, runs: dict[str, list[float]], count: int) -> None:
+    schedule.start()
+    for _ in range(1000):
+        if all(len(times) >= count for times in runs.values()):
+            break
+        await asyncio.sleep(0)
+    await schedule.stop()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_staggers_jobs(monkeypatch):
+    monkeypatch.setattr(scheduler, "StartupStagger", 1)
+    sleep = VirtualSleep()
+    runs: dict[str, list[float]] = {"a": [], "b": [], "failing": []}
+
+    async def refresh(name):
+        runs[name].append(sleep.time())
+        if name == "failing":
+            raise RuntimeError("FIO is down")
+
+    schedule = RefreshScheduler(sleep)
+    for name in runs:
+        schedule.add(name, lambda name=name: refresh(name), interval=6)
+    await run_until(schedule, runs, 3)
+
+    # started one StartupStagger apart, then each job runs in its own third of the interval
+    assert runs["a"][:3] == [0, 6, 12]
+    assert runs["b"][:3] == [1, 8, 14]
+    # failures are logged, and the job keeps its timer
+    assert runs["failing"][:3] == [2, 10, 16]
+
+
+def test_adaptive_interval():
+    interval = AdaptiveInterval(300, min_interval=60, max_interval=1800, jitter=0.1)
+
+    # queried and changing: refresh more often, down to the minimum
+    for _ in range(5):
+        interval.record_query()
+        interval.record_refresh(changed=True)
+    assert interval.interval == 60
+    # queried but unchanged, or changed but idle, keeps drifting down slowly
+    interval.interval = 300
+    interval.record_query()
+    interval.record_refresh(changed=False)
+    assert interval.interval == 225
+    interval.record_refresh(changed=True)
+    assert interval.interval == 168.75
+    # idle and unchanged backs off, up to the maximum
+    for _ in range(10):
+        interval.record_refresh(changed=False)
+    assert interval.interval == 1800
+
+    delays = [interval.next() for _ in range(100)]
+    assert all(1620 <= delay <= 1800 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_adaptive_delay(monkeypatch):
+    monkeypatch.setattr(scheduler, "StartupStagger", 0)
+    sleep = VirtualSleep()
+    runs: dict[str, list[float]] = {"adaptive": []}
+
+    async def refresh():
+        runs["adaptive"].append(sleep.time())
+
+    schedule = RefreshScheduler(sleep)
+    # the first interval is the configured one, the delays after that come from next_interval
+    schedule.add("adaptive", refresh, interval=1, next_interval=lambda: 5)
+    await run_until(schedule, runs, 4)
+
+    assert runs["adaptive"][:4] == [0, 1, 6, 11]
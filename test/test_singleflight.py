@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from HAL9666.lib.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_is_shared_and_not_rate_limited():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing_refresh():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("FIO is down")
+
+    results = await asyncio.gather(
+        *(flight.run(failing_refresh, min_interval=60) for _ in range(3)), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # a failure doesn't count as a recent refresh
+    with pytest.raises(RuntimeError):
+        await flight.run(failing_refresh, min_interval=60)
+    assert calls == 2
+    assert not flight.in_flight()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_refresh():
+    flight = SingleFlight()
+    done = asyncio.Event()
+
+    async def refresh():
+        await asyncio.sleep(0.01)
+        done.set()
+
+    caller = asyncio.ensure_future(flight.run(refresh))
+    await asyncio.sleep(0)
+    caller.cancel()
+    await flight.run(refresh)
+    assert done.is_set()
@@ -0,0 +1,25 @@
+from HAL9666.lib.ticker_index import TickerIndex, is_pattern
+
+INDEX = TickerIndex(["CQT", "CQS", "CQM", "CQL", "SFE", "MFE", "LFE", "FFC", "C", "CF", "CQT"])
+
+
+def test_prefix_and_suffix():
+    assert INDEX.prefix("CQ") == ["CQL", "CQM", "CQS", "CQT"]
+    assert INDEX.suffix("FE") == ["LFE", "MFE", "SFE"]
+    assert INDEX.prefix("X") == []
+
+
+def test_match():
+    assert INDEX.match("CQ*") == ["CQL", "CQM", "CQS", "CQT"]
+    assert INDEX.match("*FE") == ["LFE", "MFE", "SFE"]
+    assert INDEX.match("C?") == ["CF"]
+    assert INDEX.match("C[QF]*") == ["CF", "CQL", "CQM", "CQS", "CQT"]
+    assert INDEX.match("[LM]FE") == ["LFE", "MFE"]
+    assert INDEX.match("*Q*") == ["CQL", "CQM", "CQS", "CQT"]
+    assert INDEX.match("C") == ["C"]
+    assert INDEX.match("H2O") == []
+
+
+def test_is_pattern():
+    assert is_pattern("CQ*") and is_pattern("C?") and is_pattern("[LM]FE")
+    assert not is_pattern("CQT")
@@ -0,0 +1,62 @@
+from HAL9666.lib.inventory_store import InventoryStoreBuilder
+from HAL9666.lib.valuation import PriceTable, value_inventories
+
+OFFERS = [
+    {"MaterialTicker": "C", "ExchangeCode": "AI1", "Bid": 100.0, "Ask": 120.0, "PriceAverage": 110.0},
+    {"MaterialTicker": "H2O", "ExchangeCode": "AI1", "Bid": None, "Ask": 50.0, "PriceAverage": 45.0},
+    {"MaterialTicker": "C", "ExchangeCode": "NC1", "Bid": 90.0, "Ask": 0, "PriceAverage": 95.0},
+    {"MaterialTicker": "", "ExchangeCode": "NC1", "Bid": 1.0},
+]
+
+
+def build(rows):
+    builder = InventoryStoreBuilder()
+    for row in rows:
+        builder.add(*row)
+    return builder.build()
+
+
+def test_price_table():
+    table = PriceTable(OFFERS)
+
+    assert table.exchanges() == ["AI1", "NC1"]
+    assert table.price_list("AI1", "bid") == {"C": 100.0}
+    assert table.price_list("AI1", "ask") == {"C": 120.0, "H2O": 50.0}
+    # a 0 ask means nobody is selling
+    assert table.price_list("NC1", "ask") == {}
+    assert table.price_list("CI1", "average") == {}
+
+
+def test_value_inventories():
+    first = build(
+        [
+            ("Kindling", "C", "UV-351a", 200),
+            ("Felmer", "C", "UV-351a", 150),
+            ("Felmer", "C", "KW-688c", 50),
+            ("Gilith", "H2O", "KW-688c", 10),
+            ("Gilith", "WCB", "KW-688c", 1),
+        ]
+    )
+    # Felmer is in both groups, so their C is listed in both
+    second = build([("Felmer", "C", "KW-688c", 50), ("Felmer", "H2O", "UV-351a", 5)])
+    prices = PriceTable(OFFERS).price_list("AI1", "ask")
+
+    # H2O is answered by the second group, everything else by the first
+    valuation = value_inventories(
+        [first, second], prices, "AI1", "ask", lambda ticker: second if ticker == "H2O" else first
+    )
+    assert valuation.by_ticker == {"C": 400 * 120.0, "H2O": 250.0}
+    assert valuation.by_user == {"Kindling": 24000.0, "Felmer": 200 * 120.0 + 250.0}
+    assert valuation.by_location == {"UV-351a": 350 * 120.0 + 250.0, "KW-688c": 50 * 120.0}
+    assert valuation.unpriced == ["WCB"]
+    assert valuation.total == 400 * 120.0 + 250.0
+    assert valuation.top(valuation.by_user, 1) == [("Felmer", 24250.0)]
+
+
+def test_lookup():
+    valuation = value_inventories([build([("Kindling", "C", "UV-351a", 2)])], {"C": 10.0}, "AI1", "bid")
+
+    assert valuation.lookup("kindling") == ("user", "Kindling", 20.0)
+    assert valuation.lookup("c") == ("ticker", "C", 20.0)
+    assert valuation.lookup("uv-351A") == ("location", "UV-351a", 20.0)
+    assert valuation.lookup("Felmer") is None